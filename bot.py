@@ -6,9 +6,13 @@ from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from aiogram.types import Message
 from aiogram.exceptions import TelegramNetworkError
-from config import BOT_TOKEN, CHANNEL_ID, TIMEZONE, DEEPSEEK_API_KEY
+from config import (
+    BOT_TOKEN, CHANNEL_ID, TIMEZONE, DEEPSEEK_API_KEY,
+    POST_BUFFER_ENABLED, POST_BUFFER_SIZE, POST_BUFFER_MAX_AGE_MINUTES, POST_BUFFER_PATH
+)
 from deepseek_client import DeepSeekClient
-from schedule_config import SCHEDULE_CONFIG
+from post_buffer import PostBuffer
+from schedule_config import SCHEDULE_CONFIG, upcoming_publication_times
 from prompt_template import DEEPSEEK_PROMPT
 from mode_config import (
     get_current_mode_config, 
@@ -51,6 +55,19 @@ tz = pytz.timezone(TIMEZONE)
 # Инициализация клиента DeepSeek
 deepseek_client = DeepSeekClient()
 
+def next_publication_slots(count):
+    """Время ближайших публикаций по расписанию (timestamp) для буфера постов."""
+    return [slot.timestamp() for slot in upcoming_publication_times(datetime.now(tz), count)]
+
+# Буфер готовых постов: слот публикации не ждет генерации
+post_buffer = PostBuffer(
+    deepseek_client,
+    path=POST_BUFFER_PATH,
+    size=POST_BUFFER_SIZE,
+    max_age_minutes=POST_BUFFER_MAX_AGE_MINUTES,
+    next_slots=next_publication_slots
+)
+
 def escape_markdown(text):
     """Экранирует все специальные символы MarkdownV2."""
     # Экранируем все специальные символы
@@ -110,14 +127,9 @@ async def cmd_publish_now(message: Message):
     status_msg = await message.answer("Генерирую и публикую пост в канал... Это может занять несколько секунд.")
     
     try:
-        # Генерируем новый пост
-        result = await deepseek_client.generate_hybrid_post()
-        if len(result) == 3:
-            post_text, prompt, keywords_list = result
-        else:
-            # Обратная совместимость со старым форматом
-            post_text, prompt = result[:2]
-            keywords_list = []
+        # Берем готовый пост из буфера (или генерируем, если готовых нет)
+        post = await post_buffer.take('publish_now')
+        post_text = post.text if post else None
         
         if not post_text:
             await status_msg.edit_text(
@@ -133,11 +145,19 @@ async def cmd_publish_now(message: Message):
         formatted_text = format_post(post_text)
         
         # Отправляем в канал с HTML форматированием
-        sent_message = await bot.send_message(
-            chat_id=CHANNEL_ID,
-            text=formatted_text,
-            parse_mode="HTML"
-        )
+        try:
+            sent_message = await bot.send_message(
+                chat_id=CHANNEL_ID,
+                text=formatted_text,
+                parse_mode="HTML"
+            )
+        except Exception:
+            # Неотправленный пост достанется следующей публикации
+            post_buffer.put_back(post)
+            raise
+        
+        # Новости этого поста не повторяем в следующих
+        deepseek_client.mark_published(post.items, post.commentary)
         
         # Сообщаем об успешной отправке
         await status_msg.edit_text(
@@ -167,13 +187,10 @@ async def cmd_publish_custom(message: Message):
     
     try:
         # Генерируем новый пост
-        result = await deepseek_client.generate_hybrid_post()
-        if len(result) == 3:
-            post_text, prompt, keywords_list = result
-        else:
-            # Обратная совместимость со старым форматом
-            post_text, prompt = result[:2]
-            keywords_list = []
+        headlines_section, commentary, prompt, keywords_list = await deepseek_client.generate_hybrid_parts(
+            command='publish_custom'
+        )
+        post_text = deepseek_client.compose_post(headlines_section, commentary) if headlines_section else None
         
         if not post_text:
             await status_msg.edit_text(
@@ -195,6 +212,9 @@ async def cmd_publish_custom(message: Message):
             parse_mode="HTML"
         )
         
+        # Новости этого поста не повторяем в следующих
+        deepseek_client.mark_published(keywords_list, commentary)
+        
         # Сообщаем об успешной отправке
         await status_msg.edit_text(
             f"✅ Пост успешно опубликован в канале {CHANNEL_ID}!\n\n"
@@ -257,7 +277,7 @@ async def cmd_debug_post(message: Message):
     try:
         logger.info(f"DEBUG: Начинаем генерацию поста с принудительным обновлением новостей")
         # Генерируем пост с помощью DeepSeek с принудительным обновлением кэша
-        result = await deepseek_client.generate_hybrid_post(force_refresh=True)
+        result = await deepseek_client.generate_hybrid_post(force_refresh=True, command='debug_post')
         logger.info(f"DEBUG: Пост сгенерирован, результат: {type(result)}, длина: {len(result) if result else 'None'}")
         
         if len(result) == 3:
@@ -364,11 +384,128 @@ async def cmd_schedule_status(message: Message):
         f"Состояние: {enabled}\n"
         f"Дни публикаций: {days}\n"
         f"Расписание: {schedule_info}\n\n"
-        f"Часовой пояс: {TIMEZONE}"
+        f"Часовой пояс: {TIMEZONE}\n"
+        f"Готовых постов в буфере: {len(post_buffer.posts)} из {post_buffer.size} "
+        f"(из буфера: {post_buffer.stats['hits']}, на месте: {post_buffer.stats['misses']}, "
+        f"устарело: {post_buffer.stats['stale']})"
     )
     
     await message.answer(status_message)
 
+@dp.message(Command("news_status"))
+async def cmd_news_status(message: Message):
+    """Показывает частоту опроса, свежесть и здоровье каждого источника новостей."""
+    user_info = f"user_id={message.from_user.id}, username=@{message.from_user.username}"
+    logger.debug(f"Получена команда /news_status от пользователя: {user_info}")
+    
+    collector = deepseek_client.news_collector
+    if not collector:
+        await message.answer("Новостная интеграция отключена.")
+        return
+    
+    def format_minutes(value):
+        return f"{value:.0f} мин назад" if value is not None else "—"
+    
+    def format_ms(value):
+        return f"{value:.0f} мс" if value is not None else "—"
+    
+    lines = []
+    poller = deepseek_client.news_poller
+    if poller and poller.is_running:
+        lines.append("📡 <b>Опрос источников новостей:</b>\n")
+        for source in poller.status():
+            lines.append(
+                f"<b>{source['source']}</b>: каждые {source['interval_minutes']:.0f} мин, "
+                f"опрос {format_minutes(source['last_poll_minutes_ago'])}, "
+                f"свежая новость {format_minutes(source['freshest_minutes_ago'])}, "
+                f"записей {source['items']}"
+            )
+    else:
+        lines.append("📡 Фоновый опрос новостей отключен.")
+    
+    state_icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+    lines.append("\n🩺 <b>Здоровье источников:</b>\n")
+    for health in collector.health_status():
+        lines.append(
+            f"{state_icons.get(health['state'], '⚪')} <b>{health['source']}</b>: "
+            f"p50 {format_ms(health['p50_ms'])}, p95 {format_ms(health['p95_ms'])}, "
+            f"ошибок {health['error_rate']:.0%} из {health['requests']}, "
+            f"пропусков {health['skipped']}"
+        )
+    
+    processor = deepseek_client.context_processor
+    if processor:
+        verdicts = processor.selection_engine.verdict_cache_info()
+        lines.append(
+            f"\n🗂 <b>Кэш классификации:</b> попаданий {verdicts['hits']}, "
+            f"промахов {verdicts['misses']}, записей {verdicts['size']}"
+        )
+    
+    refresh = deepseek_client.news_refresh_stats()
+    lines.append(
+        f"🔄 <b>Сбор новостей по запросу:</b> вызовов {refresh['calls']}, "
+        f"выполнено {refresh['executed']}, объединено {refresh['coalesced']}, "
+        f"ограничено по частоте {refresh['rate_limited']}"
+    )
+    
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+@dp.message(Command("usage"))
+async def cmd_usage(message: Message):
+    """Показывает расход токенов, стоимость и бюджет запросов к DeepSeek."""
+    user_info = f"user_id={message.from_user.id}, username=@{message.from_user.username}"
+    logger.debug(f"Получена команда /usage от пользователя: {user_info}")
+    
+    report = deepseek_client.usage_meter.report()
+    
+    def format_totals(totals):
+        cache_share = totals['cached_tokens'] / totals['prompt_tokens'] if totals['prompt_tokens'] else 0
+        avg_latency = totals['latency_ms'] / totals['calls'] if totals['calls'] else 0
+        return (
+            f"запросов {totals['calls']:.0f}, токенов {totals['prompt_tokens']:.0f} + "
+            f"{totals['completion_tokens']:.0f}, из кэша {cache_share:.0%}, "
+            f"в среднем {avg_latency:.0f} мс, ${totals['cost']:.4f}"
+        )
+    
+    def format_cache(totals):
+        hit_calls = totals['cache_hit_calls']
+        miss_calls = totals['calls'] - hit_calls
+        hit_latency = totals['cache_hit_latency_ms'] / hit_calls if hit_calls else 0
+        miss_latency = (totals['latency_ms'] - totals['cache_hit_latency_ms']) / miss_calls if miss_calls else 0
+        return (
+            f"с попаданием {hit_calls:.0f} запросов ({hit_latency:.0f} мс), "
+            f"без попадания {miss_calls:.0f} ({miss_latency:.0f} мс), "
+            f"сэкономлено ${deepseek_client.usage_meter.cache_savings(totals['cached_tokens']):.4f}"
+        )
+    
+    def format_budget(budget):
+        return f"${budget:.2f}" if budget else "без ограничения"
+    
+    level_names = {"ok": "🟢 обычный", "economy": "🟡 экономный", "exhausted": "🔴 бюджет исчерпан"}
+    lines = [
+        "💰 <b>Использование DeepSeek:</b>\n",
+        f"<b>Сегодня:</b> {format_totals(report['today'])}",
+        f"<b>За месяц:</b> {format_totals(report['month'])}",
+        f"<b>Кэш контекста за месяц:</b> {format_cache(report['month'])}\n",
+        f"Бюджет на день: {format_budget(report['daily_budget'])}, "
+        f"на месяц: {format_budget(report['monthly_budget'])}",
+        f"Режим: {level_names.get(report['budget_level'], report['budget_level'])}",
+    ]
+    
+    if report['commands']:
+        lines.append("\n<b>По командам за сегодня:</b>")
+        for command, counters in sorted(report['commands'].items(), key=lambda kv: -kv[1]['cost']):
+            estimated = f", оценено {counters['estimated_calls']:.0f}" if counters['estimated_calls'] else ""
+            lines.append(
+                f"{command}: {counters['calls']:.0f} запросов, "
+                f"{counters['prompt_tokens'] + counters['completion_tokens']:.0f} токенов, "
+                f"${counters['cost']:.4f}{estimated}"
+            )
+    
+    lines.append(f"\nПоправка локальной оценки токенов: ×{report['calibration']:.2f}")
+    
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
 @dp.message(Command("mode_info"))
 async def cmd_mode_info(message: Message):
     """Показывает информацию о текущем режиме работы."""
@@ -459,7 +596,9 @@ async def cmd_help(message: Message):
         "/help - Показать это сообщение\n"
         "/publish_now - Немедленно сгенерировать и опубликовать пост\n"
         "/publish_custom - Дополнительная команда для публикации поста\n"
-        "/schedule_status - Просмотр статуса автоматических публикаций\n\n"
+        "/schedule_status - Просмотр статуса автоматических публикаций\n"
+        "/news_status - Опрос, свежесть и здоровье источников новостей\n"
+        "/usage - Расход токенов, стоимость и бюджет DeepSeek\n\n"
         
         "<b>Режим работы:</b>\n"
         "/mode_info - Информация о текущем режиме\n"
@@ -540,35 +679,30 @@ async def publish_scheduled_post():
     max_retries = 3
     retry_delay = 5  # секунды
     
+    logger.info("Публикация поста по расписанию")
+    
+    try:
+        # Готовый пост из буфера проверяется на свежесть перед отправкой
+        post = await post_buffer.take('scheduled')
+    except Exception as e:
+        logger.error(f"Ошибка при подготовке поста по расписанию: {str(e)}")
+        return
+    if not post or not post.text:
+        logger.error("Не удалось сгенерировать пост для публикации по расписанию")
+        return
+    
     for attempt in range(max_retries):
         try:
-            logger.info("Генерация и публикация поста по расписанию")
-            
-            # Генерируем новый пост
-            result = await deepseek_client.generate_hybrid_post()
-            if len(result) == 3:
-                post_text, prompt, keywords_list = result
-            else:
-                # Обратная совместимость со старым форматом
-                post_text, prompt = result[:2]
-                keywords_list = []
+            # Добавляем форматирование HTML
+            formatted_text = format_post(post.text)
             
-            if post_text:
-                # Добавляем форматирование HTML
-                formatted_text = format_post(post_text)
-                
-                # Отправляем в канал с HTML форматированием
-                sent_message = await bot.send_message(
-                    chat_id=CHANNEL_ID,
-                    text=formatted_text,
-                    parse_mode="HTML"
-                )
-                
-                logger.info("Пост успешно опубликован по расписанию")
-                return
-            else:
-                logger.error("Не удалось сгенерировать пост для публикации по расписанию")
-                return
+            # Отправляем в канал с HTML форматированием
+            sent_message = await bot.send_message(
+                chat_id=CHANNEL_ID,
+                text=formatted_text,
+                parse_mode="HTML"
+            )
+            break
                 
         except TelegramNetworkError as e:
             logger.error(f"Ошибка сети при публикации поста по расписанию (попытка {attempt + 1}/{max_retries}): {str(e)}")
@@ -577,30 +711,48 @@ async def publish_scheduled_post():
                 continue
             else:
                 logger.error("Превышено максимальное количество попыток публикации поста")
+                # Пост не потерян: его опубликует следующий слот или /publish_now
+                post_buffer.put_back(post)
                 return
                 
         except Exception as e:
             logger.error(f"Ошибка при публикации поста по расписанию: {str(e)}")
+            post_buffer.put_back(post)
             return
+    
+    # Новости этого поста не повторяем в следующих
+    deepseek_client.mark_published(post.items, post.commentary)
+    logger.info("Пост успешно опубликован по расписанию")
 
 async def main():
     logger.info(f"Бот запущен. Часовой пояс: {TIMEZONE}")
     
+    # Открываем общие сетевые ресурсы клиента
+    await deepseek_client.start()
+    
+    # Готовим посты заранее, до слотов публикации
+    if POST_BUFFER_ENABLED:
+        await post_buffer.start()
+    
     # Запускаем планировщик публикаций
     asyncio.create_task(schedule_posts())
     
     # Запускаем бота с обработкой ошибок
-    while True:
-        try:
-            await dp.start_polling(bot)
-        except TelegramNetworkError as e:
-            logger.error(f"Ошибка подключения к Telegram API: {str(e)}")
-            logger.info("Повторная попытка подключения через 5 секунд...")
-            await asyncio.sleep(5)
-        except Exception as e:
-            logger.error(f"Неожиданная ошибка: {str(e)}")
-            logger.info("Повторная попытка подключения через 5 секунд...")
-            await asyncio.sleep(5)
+    try:
+        while True:
+            try:
+                await dp.start_polling(bot)
+            except TelegramNetworkError as e:
+                logger.error(f"Ошибка подключения к Telegram API: {str(e)}")
+                logger.info("Повторная попытка подключения через 5 секунд...")
+                await asyncio.sleep(5)
+            except Exception as e:
+                logger.error(f"Неожиданная ошибка: {str(e)}")
+                logger.info("Повторная попытка подключения через 5 секунд...")
+                await asyncio.sleep(5)
+    finally:
+        await post_buffer.stop()
+        await deepseek_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -9,6 +9,56 @@ CHANNEL_ID = os.getenv('CHANNEL_ID')
 TIMEZONE = os.getenv('TIMEZONE')
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
 
+# Подключение к DeepSeek API: адрес, тайм-ауты (секунды) и размер пула соединений
+DEEPSEEK_BASE_URL = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
+DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv('DEEPSEEK_CONNECT_TIMEOUT', '5'))
+DEEPSEEK_READ_TIMEOUT = float(os.getenv('DEEPSEEK_READ_TIMEOUT', '60'))
+DEEPSEEK_MAX_CONNECTIONS = int(os.getenv('DEEPSEEK_MAX_CONNECTIONS', '4'))
+
+# Потоковая генерация с остановкой на границе предложения после нужной длины
+DEEPSEEK_STREAMING = os.getenv('DEEPSEEK_STREAMING', 'true').lower() == 'true'
+
+# Сколько вариантов комментария генерировать параллельно (лучший выбирается локально)
+DEEPSEEK_CANDIDATES = int(os.getenv('DEEPSEEK_CANDIDATES', '3'))
+
+# Учет токенов и бюджеты на запросы к DeepSeek в USD (0 — без ограничения).
+# При 80% бюджета генерируется один вариант, при исчерпании API не вызывается
+DEEPSEEK_USAGE_PATH = os.getenv('DEEPSEEK_USAGE_PATH', 'data/usage.json')
+DEEPSEEK_DAILY_BUDGET_USD = float(os.getenv('DEEPSEEK_DAILY_BUDGET_USD', '0'))
+DEEPSEEK_MONTHLY_BUDGET_USD = float(os.getenv('DEEPSEEK_MONTHLY_BUDGET_USD', '0'))
+
 # Настройки новостной интеграции
 NEWS_ENABLED = os.getenv('NEWS_ENABLED', 'true').lower() == 'true'
-NEWS_CACHE_HOURS = int(os.getenv('NEWS_CACHE_HOURS', '2'))
\ No newline at end of file
+NEWS_CACHE_HOURS = int(os.getenv('NEWS_CACHE_HOURS', '2'))
+
+# Парсинг RSS фидов: inline (в event loop), thread или process
+NEWS_PARSE_MODE = os.getenv('NEWS_PARSE_MODE', 'thread').lower()
+NEWS_PARSE_WORKERS = int(os.getenv('NEWS_PARSE_WORKERS', '2'))
+NEWS_PARSE_QUEUE = int(os.getenv('NEWS_PARSE_QUEUE', '8'))
+
+# Фоновый опрос источников с адаптивным интервалом (в минутах)
+NEWS_POLL_ENABLED = os.getenv('NEWS_POLL_ENABLED', 'true').lower() == 'true'
+NEWS_POLL_MIN_MINUTES = int(os.getenv('NEWS_POLL_MIN_MINUTES', '5'))
+NEWS_POLL_MAX_MINUTES = int(os.getenv('NEWS_POLL_MAX_MINUTES', '60'))
+
+# Дублирующие запросы к обычно быстрым источникам при всплесках задержки
+NEWS_HEDGE_ENABLED = os.getenv('NEWS_HEDGE_ENABLED', 'false').lower() == 'true'
+
+# Сбор новостей по требованию: срок ожидания (секунды) и достаточное число новостей
+NEWS_COLLECT_DEADLINE_SECONDS = float(os.getenv('NEWS_COLLECT_DEADLINE_SECONDS', '4'))
+NEWS_COLLECT_TARGET_ITEMS = int(os.getenv('NEWS_COLLECT_TARGET_ITEMS', '20'))
+# Принудительное обновление новостей не чаще раза в N секунд (иначе берется последний сбор)
+NEWS_FORCE_REFRESH_MIN_SECONDS = float(os.getenv('NEWS_FORCE_REFRESH_MIN_SECONDS', '60'))
+
+# Срок хранения новостей в персистентном хранилище (в днях)
+NEWS_STORE_RETENTION_DAYS = int(os.getenv('NEWS_STORE_RETENTION_DAYS', '14'))
+# Файл с источниками и ключевыми словами фильтров (перечитывается на лету)
+NEWS_FILTERS_PATH = os.getenv('NEWS_FILTERS_PATH', 'data/filters.json')
+NEWS_FILTERS_CHECK_SECONDS = float(os.getenv('NEWS_FILTERS_CHECK_SECONDS', '30'))
+
+# Буфер заранее сгенерированных постов: сколько держать готовыми и
+# через сколько минут пост считается устаревшим и генерируется заново
+POST_BUFFER_ENABLED = os.getenv('POST_BUFFER_ENABLED', 'true').lower() == 'true'
+POST_BUFFER_SIZE = int(os.getenv('POST_BUFFER_SIZE', '2'))
+POST_BUFFER_MAX_AGE_MINUTES = float(os.getenv('POST_BUFFER_MAX_AGE_MINUTES', '120'))
+POST_BUFFER_PATH = os.getenv('POST_BUFFER_PATH', 'data/post_buffer.json')
@@ -4,11 +4,16 @@
 """
 
 import logging
-from typing import List
-import random
+from typing import List, Optional
 
 # Импортируем NewsItem для типизации
 from news_collector import NewsItem
+from near_duplicates import NearDuplicateIndex
+from keyword_matcher import KeywordMatcher
+from relevance_scorer import RelevanceScorer
+from topic_clusters import TopicClusterer
+from published_memory import PublishedMemory
+from selection_engine import NEUTRAL, POSITIVE, HeadlineItem, SelectionEngine, SelectionResult, SelectionRules
 
 logger = logging.getLogger('context_processor')
 
@@ -16,7 +21,7 @@ logger = logging.getLogger('context_processor')
 class ContextProcessor:
     """Класс для обработки и отбора новостных заголовков."""
 
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, published_memory: Optional[PublishedMemory] = None):
         # Военные ключевые слова для исключения
         self.military_keywords = [
             # Прямые военные термины
@@ -36,6 +41,8 @@ class ContextProcessor:
             # Военные операции
             'операция', 'мобилизация', 'призыв', 'резерв', 'батальон',
             'полк', 'дивизия', 'бригада', 'взвод', 'рота',
+            # Формы короткой основы: 'роты' не сводится к 'рота' (основа не короче 4 букв)
+            'роты', 'роту', 'ротой',
 
             # Международные конфликты и политика
             'нато', 'пентагон', 'генштаб', 'минобороны', 'разведка',
@@ -44,7 +51,14 @@ class ContextProcessor:
             'лавров', 'активы россии', 'санкции', 'одесса', 'взрывы',
             'подрыв', 'северных потоков', 'обвиняемый', 'долги украины',
             'конфискация', 'геополитика', 'дипломатия', 'посол',
-            'МИД', 'внешняя политика', 'международные отношения'
+            'МИД', 'МИДа', 'МИДе', 'внешняя политика', 'международные отношения',
+
+            # Прилагательные от топонимов (основа отличается от существительного)
+            'украинский', 'белгородский', 'херсонский', 'запорожский',
+            'крымский', 'одесский', 'донбасский',
+
+            # Производные слова с другой основой ('танк' не находит 'танкер')
+            'танковый', 'обстрелять'
         ]
 
         # Предпочтительные мирные темы
@@ -73,25 +87,141 @@ class ContextProcessor:
             'спорт', 'олимпиада', 'чемпионат', 'соревнование', 'турнир'
         ]
 
+        # Технические термины и реклама
+        self.skip_keywords = ['реклама', 'спонсор', 'партнер', 'pr', 'промо',
+                              'спонсорский', 'партнерский', 'промокод']
+
+        # Все списки один раз приводятся к основам слов в общем матчере
+        self.matcher = self._build_matcher()
+
+        # Память уже опубликованных новостей (не повторяем их в следующих постах)
+        self.published_memory = published_memory
+
+        # TF-IDF релевантность заголовков позитивным темам
+        self.relevance_scorer = RelevanceScorer(self.positive_keywords)
+
+        # Темы новостей: в дайджест попадает не больше одной новости темы
+        self.topic_clusterer = TopicClusterer(self.relevance_scorer)
+
+        # Единый отбор для новостей и заголовков; seed фиксирует случайность в тестах
+        self.selection_engine = SelectionEngine(
+            self.matcher,
+            scorer=self.relevance_scorer,
+            topic_assigner=self.topic_clusterer,
+            seed=seed
+        )
+
         logger.info("Инициализирован процессор заголовков с фильтрацией военных новостей")
 
+    def _build_matcher(self) -> KeywordMatcher:
+        """Компилирует текущие списки ключевых слов."""
+        return KeywordMatcher({
+            'military': self.military_keywords,
+            'positive': self.positive_keywords,
+            'skip': self.skip_keywords
+        })
+
+    def update_keywords(self, military: Optional[List[str]] = None, positive: Optional[List[str]] = None,
+                        skip: Optional[List[str]] = None, matcher: Optional[KeywordMatcher] = None,
+                        topic_profiles: Optional[dict] = None):
+        """
+        Заменяет списки ключевых слов и матчер.
+
+        Args:
+            matcher: Уже скомпилированный матчер для новых списков
+                     (если не передан, компилируется здесь же)
+            topic_profiles: Тематические профили для оценки релевантности
+
+        Кэш вердиктов отбора сбрасывается автоматически, только если у нового
+        матчера другой отпечаток списков.
+        """
+        if military is not None:
+            self.military_keywords = list(military)
+        if positive is not None:
+            self.positive_keywords = list(positive)
+        if skip is not None:
+            self.skip_keywords = list(skip)
+
+        self.matcher = matcher or self._build_matcher()
+        self.selection_engine.matcher = self.matcher
+        if positive is not None or topic_profiles is not None:
+            self.relevance_scorer.set_profile(self.positive_keywords, topic_profiles)
+        logger.info("Списки ключевых слов обновлены")
+
+    def _classify(self, headline) -> dict:
+        """
+        Возвращает найденные в заголовке ключевые слова по категориям.
+
+        Args:
+            headline: Текст заголовка или его основы (NewsItem.title_stems)
+        """
+        return self.matcher.match(headline)
+
     def _is_military_news(self, headline: str) -> bool:
         """Проверяет, относится ли заголовок к военной тематике."""
-        headline_lower = headline.lower()
-
-        for keyword in self.military_keywords:
-            if keyword in headline_lower:
-                return True
-        return False
+        return 'military' in self._classify(headline)
 
     def _has_positive_content(self, headline: str) -> bool:
         """Проверяет, содержит ли заголовок позитивные темы."""
-        headline_lower = headline.lower()
+        return 'positive' in self._classify(headline)
+
+    def _skip_published(self, items: list) -> list:
+        """
+        Убирает уже опубликованные новости (O(1) проверка на новость).
 
-        for keyword in self.positive_keywords:
-            if keyword in headline_lower:
-                return True
-        return False
+        Если опубликовано все, возвращает исходный список: лучше повтор,
+        чем пост без новостей.
+        """
+        if not self.published_memory:
+            return items
+
+        fresh = [item for item in items if not self.published_memory.contains(item)]
+        if len(fresh) < len(items):
+            logger.info(f"Пропущено {len(items) - len(fresh)} уже опубликованных новостей")
+        if not fresh:
+            logger.warning("Все новости уже публиковались, отбираем из полного списка")
+            return items
+        return fresh
+
+    def _collapse_duplicates(self, news_items: List[NewsItem]) -> List[NewsItem]:
+        """
+        Оставляет по одной новости из каждого кластера почти одинаковых заголовков.
+
+        Кластеры назначаются хранилищем при добавлении; для новостей без кластера
+        (например, собранных без хранилища) он вычисляется здесь же.
+        Представителем кластера становится самая ранняя новость с описанием.
+        """
+        local_index = None
+        best = {}
+
+        for item in news_items:
+            cluster_id = item.cluster_id
+            if cluster_id is None:
+                if local_index is None:
+                    local_index = NearDuplicateIndex()
+                cluster_id = local_index.add(item.link or item.title, item.title)
+
+            current = best.get(cluster_id)
+            if current is None or (not current.summary, current.published) > (not item.summary, item.published):
+                best[cluster_id] = item
+
+        if len(best) < len(news_items):
+            logger.info(f"Схлопнуто {len(news_items) - len(best)} почти одинаковых новостей")
+
+        # Сохраняем исходный порядок новостей
+        representatives = {id(item) for item in best.values()}
+        return [item for item in news_items if id(item) in representatives]
+
+    def _log_selection(self, result: SelectionResult, noun: str):
+        """Пишет в лог статистику отбора."""
+        positive = sum(1 for c in result.candidates if c.category == POSITIVE)
+        logger.info(f"Отфильтровано {result.military_filtered} военных новостей")
+        logger.info(f"Найдено {positive} позитивных и {len(result.candidates) - positive} нейтральных новостей")
+        logger.info(f"Отобрано {len(result.selected)} {noun}: "
+                    f"{result.selected_counts.get(POSITIVE, 0)} позитивных, "
+                    f"{result.selected_counts.get(NEUTRAL, 0)} нейтральных")
+        if result.source_count:
+            logger.info(f"Распределение по источникам: {result.source_count}")
 
     async def select_top_news_items(self, news_items: List[NewsItem], limit: int = 5) -> List[NewsItem]:
         """
@@ -108,95 +238,17 @@ class ContextProcessor:
             logger.warning("Нет новостей для отбора")
             return []
 
-        # Фильтруем новости поэтапно
-        military_filtered = 0
-        positive_items = []
-        neutral_items = []
+        # Одна новость от каждого кластера почти одинаковых заголовков
+        news_items = self._collapse_duplicates(news_items)
 
-        for item in news_items:
-            headline = item.title.strip()
-
-            # Пропускаем слишком короткие заголовки
-            if len(headline) < 20:
-                continue
-
-            # Пропускаем заголовки с техническими терминами или рекламой
-            skip_words = ['реклама', 'спонсор', 'партнер', 'pr', 'промо']
-            if any(word in headline.lower() for word in skip_words):
-                continue
-
-            # ГЛАВНЫЙ ФИЛЬТР: исключаем военные новости
-            if self._is_military_news(headline):
-                military_filtered += 1
-                logger.debug(f"Отфильтрована военная новость: {headline[:50]}...")
-                continue
-
-            # Разделяем на позитивные и нейтральные
-            if self._has_positive_content(headline):
-                positive_items.append(item)
-            else:
-                neutral_items.append(item)
-
-        # Приоритизация: сначала позитивные, затем нейтральные
-        filtered_items = positive_items + neutral_items
-
-        logger.info(f"Отфильтровано {military_filtered} военных новостей")
-        logger.info(f"Найдено {len(positive_items)} позитивных и {len(neutral_items)} нейтральных новостей")
-
-        # Выбираем новости с приоритетом позитивных и балансировкой источников
-        selected = self._balance_sources_selection(filtered_items, positive_items, neutral_items, limit)
-
-        return selected
-
-    def _balance_sources_selection(self, all_items: List[NewsItem], positive_items: List[NewsItem],
-                                 neutral_items: List[NewsItem], limit: int) -> List[NewsItem]:
-        """Выбирает новости с балансировкой источников."""
-        if len(all_items) <= limit:
-            logger.info(f"Используем все {len(all_items)} доступных новости (после фильтрации военных)")
-            return all_items
-
-        # Максимум 2 новости от одного источника
-        max_per_source = 2
-        selected = []
-        source_count = {}
-
-        # Первый проход: приоритет позитивным новостям
-        remaining_positive = positive_items.copy()
-        remaining_neutral = neutral_items.copy()
-
-        # Балансируем источники для позитивных новостей
-        random.shuffle(remaining_positive)
-        for item in remaining_positive:
-            if len(selected) >= limit:
-                break
-            if source_count.get(item.source, 0) < max_per_source:
-                selected.append(item)
-                source_count[item.source] = source_count.get(item.source, 0) + 1
-
-        # Добираем нейтральными новостями, если места еще есть
-        random.shuffle(remaining_neutral)
-        for item in remaining_neutral:
-            if len(selected) >= limit:
-                break
-            if source_count.get(item.source, 0) < max_per_source:
-                selected.append(item)
-                source_count[item.source] = source_count.get(item.source, 0) + 1
-
-        # Если все еще не набрали limit, берем любые оставшиеся (игнорируя лимит источников)
-        if len(selected) < limit:
-            all_remaining = [item for item in all_items if item not in selected]
-            needed = limit - len(selected)
-            if all_remaining:
-                selected.extend(random.sample(all_remaining, min(needed, len(all_remaining))))
-
-        # Логирование статистики
-        positive_count = len([item for item in selected if item in positive_items])
-        neutral_count = len([item for item in selected if item in neutral_items])
-
-        logger.info(f"Отобрано {len(selected)} новостей: {positive_count} позитивных, {neutral_count} нейтральных")
-        logger.info(f"Распределение по источникам: {dict(source_count)}")
-
-        return selected
+        # Не повторяем новости из предыдущих постов
+        news_items = self._skip_published(news_items)
+
+        # Приоритет позитивным новостям, максимум 2 новости от источника и 1 от темы
+        result = self.selection_engine.select(news_items, limit, SelectionRules(max_per_source=2, max_per_topic=1))
+        self._log_selection(result, "новостей")
+
+        return result.selected
 
     async def select_top_headlines(self, headlines: List[str], limit: int = 5) -> List[str]:
         """
@@ -213,66 +265,15 @@ class ContextProcessor:
             logger.warning("Нет заголовков для отбора")
             return []
 
-        # Фильтруем заголовки поэтапно
-        filtered_headlines = []
-        military_filtered = 0
-        positive_headlines = []
-        neutral_headlines = []
-
-        for headline in headlines:
-            headline = headline.strip()
-
-            # Пропускаем слишком короткие заголовки
-            if len(headline) < 20:
-                continue
+        # У заголовков нет источника; минимум 3 позитивных, остальное — нейтральные
+        rules = SelectionRules(max_per_source=None, positive_slots=max(3, limit - 2))
+        result = self.selection_engine.select(
+            self._skip_published([HeadlineItem(headline.strip()) for headline in headlines]), limit, rules
+        )
 
-            # Пропускаем заголовки с техническими терминами или рекламой
-            skip_words = ['реклама', 'спонсор', 'партнер', 'pr', 'промо']
-            if any(word in headline.lower() for word in skip_words):
-                continue
-
-            # ГЛАВНЫЙ ФИЛЬТР: исключаем военные новости
-            if self._is_military_news(headline):
-                military_filtered += 1
-                logger.debug(f"Отфильтрована военная новость: {headline[:50]}...")
-                continue
-
-            # Разделяем на позитивные и нейтральные
-            if self._has_positive_content(headline):
-                positive_headlines.append(headline)
-            else:
-                neutral_headlines.append(headline)
-
-        # Приоритизация: сначала позитивные, затем нейтральные
-        filtered_headlines = positive_headlines + neutral_headlines
-
-        logger.info(f"Отфильтровано {military_filtered} военных новостей")
-        logger.info(f"Найдено {len(positive_headlines)} позитивных и {len(neutral_headlines)} нейтральных новостей")
-
-        if not filtered_headlines:
+        if not result.candidates:
             logger.warning("После фильтрации не осталось заголовков")
-            return headlines[:limit] if headlines else []
-
-        # Выбираем заголовки с приоритетом позитивных
-        if len(filtered_headlines) > limit:
-            # Стараемся взять больше позитивных новостей
-            positive_limit = min(len(positive_headlines), max(3, limit - 2))  # Минимум 3 позитивных
-            neutral_limit = limit - positive_limit
-
-            selected_positive = random.sample(positive_headlines, min(positive_limit, len(positive_headlines)))
-            selected_neutral = random.sample(neutral_headlines, min(neutral_limit, len(neutral_headlines)))
-
-            selected = selected_positive + selected_neutral
-
-            # Если не хватает, добираем из оставшихся
-            if len(selected) < limit and len(filtered_headlines) > len(selected):
-                remaining = [h for h in filtered_headlines if h not in selected]
-                needed = limit - len(selected)
-                selected.extend(random.sample(remaining, min(needed, len(remaining))))
-
-            logger.info(f"Отобрано {len(selected)} заголовков: {len(selected_positive)} позитивных, {len(selected_neutral)} нейтральных")
-        else:
-            selected = filtered_headlines
-            logger.info(f"Используем все {len(selected)} доступных заголовка (после фильтрации военных)")
+            return headlines[:limit]
 
-        return selected
\ No newline at end of file
+        self._log_selection(result, "заголовков")
+        return [item.title for item in result.selected]
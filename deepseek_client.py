@@ -3,28 +3,76 @@
 Поддерживает только классические посты с системой случайных ключевых слов.
 """
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI
 import json
 import logging
 import random
+import re
 import os
 import asyncio
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List
-
-from config import DEEPSEEK_API_KEY, NEWS_ENABLED, NEWS_CACHE_HOURS
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+from config import (
+    DEEPSEEK_API_KEY,
+    DEEPSEEK_BASE_URL,
+    DEEPSEEK_CONNECT_TIMEOUT,
+    DEEPSEEK_READ_TIMEOUT,
+    DEEPSEEK_MAX_CONNECTIONS,
+    DEEPSEEK_STREAMING,
+    DEEPSEEK_CANDIDATES,
+    DEEPSEEK_DAILY_BUDGET_USD,
+    DEEPSEEK_MONTHLY_BUDGET_USD,
+    DEEPSEEK_USAGE_PATH,
+    NEWS_ENABLED,
+    NEWS_CACHE_HOURS,
+    NEWS_POLL_ENABLED,
+    NEWS_POLL_MIN_MINUTES,
+    NEWS_POLL_MAX_MINUTES,
+    NEWS_COLLECT_DEADLINE_SECONDS,
+    NEWS_COLLECT_TARGET_ITEMS,
+    NEWS_FORCE_REFRESH_MIN_SECONDS,
+    NEWS_STORE_RETENTION_DAYS,
+    NEWS_FILTERS_PATH,
+    NEWS_FILTERS_CHECK_SECONDS
+)
 from prompt_template import (
     DEEPSEEK_PROMPT,
+    HYBRID_PROMPT,
+    ECONOMY_PROMPT,
     DEEPSEEK_API_PARAMS,
-    DEEPSEEK_API_PARAM_RANGES
+    DEEPSEEK_API_PARAM_RANGES,
+    messages_text
 )
 from news_collector import NewsCollector
+from news_poller import NewsPoller
+from news_store import NewsStore
 from context_processor import ContextProcessor
+from filters_config import FiltersWatcher
+from published_memory import PublishedMemory
+from post_ranker import CandidateRanker
+from usage_meter import UsageMeter, BUDGET_OK, BUDGET_EXHAUSTED
+from single_flight import SingleFlight
 
 # Настройка логирования
 logger = logging.getLogger('deepseek_client')
 logger.setLevel(logging.INFO)
 
+# Длина комментария гибридного поста: целевая и жесткий предел (символы)
+COMMENTARY_TARGET_CHARS = 600
+COMMENTARY_MAX_CHARS = 700
+
+# Комментарий в экономном режиме (бюджет почти израсходован)
+ECONOMY_TARGET_CHARS = 300
+ECONOMY_MAX_TOKENS = 100
+
+# Конец предложения, за которым уже пришел пробел (значит, это не "3.5")
+SENTENCE_END_RE = re.compile(r'[.!?…](?=\s)')
+
+
 class DeepSeekClient:
     """Клиент для работы с DeepSeek API."""
 
@@ -38,10 +86,7 @@ class DeepSeekClient:
             logger.error("DeepSeek API ключ не настроен. Пожалуйста, добавьте его в .env файл.")
             raise ValueError("DeepSeek API ключ не настроен")
 
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url="https://api.deepseek.com"
-        )
+        self.client = self._create_api_client(DEEPSEEK_BASE_URL)
 
         # Ключевые слова больше не нужны в новом формате
 
@@ -49,20 +94,281 @@ class DeepSeekClient:
         self.news_enabled = NEWS_ENABLED
         if self.news_enabled:
             self.news_collector = NewsCollector()
-            self.context_processor = ContextProcessor()
+            self.published_memory = PublishedMemory()
+            self.context_processor = ContextProcessor(published_memory=self.published_memory)
+            self.news_store = NewsStore()
+            self.filters_watcher = FiltersWatcher(
+                self.news_collector,
+                self.context_processor,
+                path=NEWS_FILTERS_PATH,
+                check_interval=NEWS_FILTERS_CHECK_SECONDS
+            )
+            if NEWS_POLL_ENABLED:
+                self.news_poller = NewsPoller(
+                    self.news_collector,
+                    self.news_store,
+                    min_interval_minutes=NEWS_POLL_MIN_MINUTES,
+                    max_interval_minutes=NEWS_POLL_MAX_MINUTES,
+                    retention_days=NEWS_STORE_RETENTION_DAYS
+                )
+            else:
+                self.news_poller = None
             logger.info("Новостная интеграция включена")
         else:
             self.news_collector = None
+            self.published_memory = None
             self.context_processor = None
+            self.news_store = None
+            self.filters_watcher = None
+            self.news_poller = None
             logger.info("Новостная интеграция отключена")
 
         # Кэш для новостей
         self._news_cache = None
         self._news_cache_time = None
-    
+
+        # Одновременные запросы свежих новостей объединяются в один сбор
+        self._news_refresh = SingleFlight()
+        self._force_refresh_limited = 0
+
+        # Статистика последней генерации (для гибридного поста — выбранного варианта)
+        self.last_generation_stats: Optional[dict] = None
+
+        # Выбор лучшего из нескольких вариантов комментария
+        self.candidate_ranker = CandidateRanker(max_chars=COMMENTARY_MAX_CHARS)
+
+        # Учет токенов и бюджета запросов к API
+        self.usage_meter = UsageMeter(
+            path=DEEPSEEK_USAGE_PATH,
+            daily_budget=DEEPSEEK_DAILY_BUDGET_USD,
+            monthly_budget=DEEPSEEK_MONTHLY_BUDGET_USD
+        )
+
+        # Недавно отобранные новости (заголовок -> новость), чтобы после
+        # успешной отправки отметить опубликованными именно их
+        self.last_selected_items: OrderedDict = OrderedDict()
+
+    def _create_api_client(self, base_url: str) -> AsyncOpenAI:
+        """
+        Создает асинхронный клиент API с общим пулом соединений.
+
+        Запрос к модели не блокирует цикл событий: пока идет генерация,
+        бот продолжает отвечать на команды и работает планировщик.
+        """
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=DEEPSEEK_MAX_CONNECTIONS,
+                max_keepalive_connections=DEEPSEEK_MAX_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(
+                connect=DEEPSEEK_CONNECT_TIMEOUT,
+                read=DEEPSEEK_READ_TIMEOUT,
+                write=DEEPSEEK_CONNECT_TIMEOUT,
+                pool=DEEPSEEK_CONNECT_TIMEOUT
+            )
+        )
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=base_url,
+            http_client=http_client
+        )
+
+    async def start(self):
+        """Подготавливает долгоживущие ресурсы клиента (HTTP-сессию новостей)."""
+        if self.filters_watcher:
+            # Источники и фильтры из файла применяются до первого опроса
+            await self.filters_watcher.start()
+        if self.news_collector:
+            await self.news_collector.start()
+        if self.news_store:
+            # Документные частоты TF-IDF набираются по уже сохраненным новостям
+            stored = await asyncio.to_thread(
+                self.news_store.fresh, NEWS_STORE_RETENTION_DAYS * 24, 5000
+            )
+            fitted = await asyncio.to_thread(self.context_processor.relevance_scorer.partial_fit, stored)
+            await asyncio.to_thread(self.context_processor.topic_clusterer.partial_fit, stored)
+            logger.info(f"Оценка релевантности и темы обучены на {fitted} сохраненных новостях")
+        if self.news_poller:
+            await self.news_poller.start()
+
+    async def close(self):
+        """Освобождает ресурсы клиента при остановке бота."""
+        await self.client.close()
+        if self.filters_watcher:
+            await self.filters_watcher.stop()
+        if self.news_poller:
+            await self.news_poller.stop()
+        if self.news_collector:
+            await self.news_collector.close()
+        if self.news_store:
+            self.news_store.close()
+
+    def _get_polled_news_items(self, limit: int = 20) -> List:
+        """Возвращает новости из фонового хранилища без обращения к сети."""
+        if not self.news_poller or not self.news_poller.is_running:
+            return []
+        return self.news_poller.get_news_items(limit=limit)
     
 
     
+    def _remember_selection(self, selected: List) -> List:
+        """Запоминает отобранные новости или заголовки до их публикации."""
+        for item in selected:
+            title = item if isinstance(item, str) else item.title
+            self.last_selected_items[title] = item
+            self.last_selected_items.move_to_end(title)
+        while len(self.last_selected_items) > 50:
+            self.last_selected_items.popitem(last=False)
+        return selected
+
+    def selected_items(self, headlines: List) -> List:
+        """Возвращает отобранные новости по заголовкам (новости передаются как есть)."""
+        return [
+            self.last_selected_items.get(headline, headline) if isinstance(headline, str) else headline
+            for headline in headlines or []
+        ]
+
+    def mark_published(self, headlines: List, commentary: Optional[str] = None):
+        """
+        Отмечает новости поста опубликованными (вызывается после успешной отправки).
+
+        Args:
+            headlines: Заголовки из результата генерации поста или сами новости
+            commentary: Комментарий поста (None — пост без комментария); с ним
+                        сравниваются варианты следующих постов
+        """
+        if not self.published_memory or not headlines:
+            return
+        items = self.selected_items(headlines)
+        try:
+            self.published_memory.mark_published(items, commentary)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении памяти публикаций: {str(e)}")
+
+    @staticmethod
+    def _cut_at_sentence(text: str, target_chars: int, max_chars: int) -> Tuple[str, bool]:
+        """
+        Ищет место остановки: первый конец предложения после target_chars.
+
+        Returns:
+            (текст до места остановки, нужно ли остановиться)
+        """
+        for match in SENTENCE_END_RE.finditer(text, max(0, target_chars - 1)):
+            if match.end() <= max_chars:
+                return text[:match.end()], True
+            break
+
+        if len(text) > max_chars:
+            # Конца предложения в пределах лимита нет — режем по последнему
+            cut = text[:max_chars].rsplit('.', 1)[0] + '.'
+            return cut, True
+        return text, False
+
+    @staticmethod
+    def _read_usage(usage, stats: dict):
+        """Переносит статистику токенов из ответа API (включая попадания в кэш контекста)."""
+        stats['prompt_tokens'] = usage.prompt_tokens
+        stats['completion_tokens'] = usage.completion_tokens
+        # DeepSeek сообщает prompt_cache_hit_tokens, OpenAI — prompt_tokens_details.cached_tokens
+        cached = getattr(usage, 'prompt_cache_hit_tokens', None)
+        if cached is None:
+            details = getattr(usage, 'prompt_tokens_details', None)
+            cached = getattr(details, 'cached_tokens', None) if details else None
+        stats['cached_tokens'] = cached or 0
+
+    async def _complete(self, messages: List[dict], api_params: dict, target_chars: Optional[int] = None,
+                        max_chars: Optional[int] = None, command: str = 'generate') -> Tuple[str, dict]:
+        """
+        Запрашивает ответ модели и возвращает текст и статистику запроса.
+
+        messages строятся шаблоном промпта: системный префикс одинаков во всех
+        запросах и берется из кэша контекста DeepSeek.
+
+        В потоковом режиме токены обрабатываются по мере поступления; если
+        задана target_chars, запрос прерывается на первой границе предложения
+        после этой длины, и лишние токены не генерируются. Время до первого
+        токена и число токенов возвращаются в статистике и учитываются в
+        счетчиках использования под именем command.
+
+        Returns:
+            (текст ответа, статистика запроса)
+        """
+        request = dict(
+            model=api_params["model"],
+            messages=messages,
+            max_tokens=api_params["max_tokens"],
+            temperature=api_params.get("temperature", 0.7),
+            top_p=api_params.get("top_p", 0.9),
+            presence_penalty=api_params.get("presence_penalty", 0.5),
+            frequency_penalty=api_params.get("frequency_penalty", 0.6)
+        )
+        start = time.perf_counter()
+        stats = {'streaming': DEEPSEEK_STREAMING and api_params.get('stream', True),
+                 'ttft_ms': None, 'completion_tokens': 0, 'prompt_tokens': None, 'cached_tokens': 0,
+                 'stopped_early': False}
+
+        if not stats['streaming']:
+            response = await self.client.chat.completions.create(stream=False, **request)
+            text = response.choices[0].message.content.strip() if response.choices else ""
+            if response.usage:
+                self._read_usage(response.usage, stats)
+        else:
+            stream = await self.client.chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **request
+            )
+            parts = []
+            length = 0
+            try:
+                async for chunk in stream:
+                    if chunk.usage:
+                        self._read_usage(chunk.usage, stats)
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    if stats['ttft_ms'] is None:
+                        stats['ttft_ms'] = (time.perf_counter() - start) * 1000
+                    # Без usage (при досрочной остановке) считаем фрагменты: ~1 токен каждый
+                    if stats['prompt_tokens'] is None:
+                        stats['completion_tokens'] += 1
+                    parts.append(chunk.choices[0].delta.content)
+                    length += len(parts[-1])
+
+                    if target_chars and length > target_chars:
+                        text, stop = self._cut_at_sentence(''.join(parts), target_chars,
+                                                           max_chars or target_chars)
+                        if stop:
+                            parts = [text]
+                            stats['stopped_early'] = True
+                            break
+            finally:
+                # Закрытие потока обрывает генерацию на стороне API
+                await stream.close()
+            text = ''.join(parts).strip()
+
+        if max_chars and len(text) > max_chars:
+            text, _ = self._cut_at_sentence(text, target_chars or max_chars, max_chars)
+
+        stats['total_ms'] = (time.perf_counter() - start) * 1000
+        stats['chars'] = len(text)
+
+        # Без статистики API (поток остановлен досрочно) токены запроса оцениваются локально
+        prompt = messages_text(messages)
+        estimated = stats['prompt_tokens'] is None
+        self.usage_meter.record(
+            command,
+            stats['prompt_tokens'] if not estimated else self.usage_meter.estimate_tokens(prompt),
+            stats['completion_tokens'], stats['cached_tokens'], stats['total_ms'],
+            estimated=estimated, prompt=prompt
+        )
+        cache_info = ""
+        if stats['cached_tokens']:
+            cache_info = f", из кэша контекста {stats['cached_tokens']} из {stats['prompt_tokens']} токенов запроса"
+        logger.info(
+            f"Генерация: {stats['chars']} символов, {stats['completion_tokens']} токенов, "
+            f"первый токен {stats['ttft_ms'] or 0:.0f} мс, всего {stats['total_ms']:.0f} мс"
+            f"{', остановлена досрочно' if stats['stopped_early'] else ''}{cache_info}"
+        )
+        return text, stats
+
     def _get_random_api_params(self):
         """Генерирует случайные параметры API из заданных диапазонов."""
         params = self.api_params.copy()
@@ -71,6 +377,37 @@ class DeepSeekClient:
         return params
     
 
+    def news_refresh_stats(self) -> dict:
+        """Счетчики сбора новостей по требованию: выполнено, объединено, ограничено."""
+        return {**self._news_refresh.stats, 'rate_limited': self._force_refresh_limited}
+
+    async def _collect_fresh_news(self) -> List:
+        """Собирает свежие новости, обновляет кэш и хранилище."""
+        logger.info("Сбор свежих новостей")
+        news_items = await self.news_collector.get_recent_news_items(
+            limit=NEWS_COLLECT_TARGET_ITEMS,
+            deadline=NEWS_COLLECT_DEADLINE_SECONDS
+        )
+        if news_items:
+            self._news_cache = news_items
+            self._news_cache_time = datetime.now()
+            self.news_store.upsert_many(news_items)
+        return news_items
+
+    async def _refresh_news(self, force_refresh: bool = False) -> List:
+        """
+        Собирает свежие новости; одновременные вызовы ждут одного общего сбора.
+
+        Принудительное обновление чаще раза в NEWS_FORCE_REFRESH_MIN_SECONDS
+        возвращает новости последнего сбора, не обращаясь к источникам.
+        """
+        if (force_refresh and self._news_cache and self._news_cache_time and
+                (datetime.now() - self._news_cache_time).total_seconds() < NEWS_FORCE_REFRESH_MIN_SECONDS):
+            self._force_refresh_limited += 1
+            logger.info("Новости обновлялись недавно, используем результат последнего сбора")
+            return self._news_cache
+        return await self._news_refresh.do('news', self._collect_fresh_news)
+
     async def _get_headlines(self, force_refresh: bool = False) -> List[str]:
         """Получает 5 заголовков новостей с кэшированием."""
         if not self.news_enabled or not self.news_collector:
@@ -87,16 +424,29 @@ class DeepSeekClient:
             now = datetime.now()
             cache_hours = NEWS_CACHE_HOURS if 'NEWS_CACHE_HOURS' in globals() else 1
 
+            if not force_refresh:
+                polled_items = self._get_polled_news_items(limit=20)
+                if polled_items:
+                    logger.debug("Используем новости из фонового хранилища")
+                    headlines = [item.title for item in polled_items]
+                    return self._remember_selection(
+                        await self.context_processor.select_top_headlines(headlines, limit=5)
+                    )
+
             if (not force_refresh and
                     self._news_cache_time and
                     self._news_cache and
                     (now - self._news_cache_time).total_seconds() < cache_hours * 3600):
                 logger.debug("Используем кэшированные новости")
-                return await self.context_processor.select_top_headlines(self._news_cache, limit=5)
+                return self._remember_selection(
+                    await self.context_processor.select_top_headlines(
+                        [item.title for item in self._news_cache], limit=5
+                    )
+                )
 
-            # Собираем свежие новости
-            logger.info("Сбор свежих новостей")
-            headlines = await self.news_collector.get_recent_headlines(limit=20)
+            # Собираем свежие новости (один общий сбор на одновременные вызовы)
+            news_items = await self._refresh_news(force_refresh)
+            headlines = [item.title for item in news_items]
 
             if not headlines:
                 logger.warning("Новости не получены, используем fallback")
@@ -109,12 +459,10 @@ class DeepSeekClient:
                 ]
                 return fallback_headlines
 
-            # Обновляем кэш
-            self._news_cache = headlines
-            self._news_cache_time = now
-
             # Используем context_processor для отбора лучших заголовков
-            selected_headlines = await self.context_processor.select_top_headlines(headlines, limit=5)
+            selected_headlines = self._remember_selection(
+                await self.context_processor.select_top_headlines(headlines, limit=5)
+            )
 
             logger.info(f"Выбрано {len(selected_headlines)} заголовков из {len(headlines)} доступных")
             return selected_headlines
@@ -139,27 +487,34 @@ class DeepSeekClient:
             now = datetime.now()
             cache_hours = NEWS_CACHE_HOURS if 'NEWS_CACHE_HOURS' in globals() else 1
 
+            if not force_refresh:
+                polled_items = self._get_polled_news_items(limit=20)
+                if polled_items:
+                    logger.debug("Используем новости из фонового хранилища")
+                    return self._remember_selection(
+                        await self.context_processor.select_top_news_items(polled_items, limit=5)
+                    )
+
             if (not force_refresh and
                     self._news_cache_time and
                     self._news_cache and
                     (now - self._news_cache_time).total_seconds() < cache_hours * 3600):
                 logger.debug("Используем кэшированные новости")
-                return await self.context_processor.select_top_news_items(self._news_cache, limit=5)
+                return self._remember_selection(
+                    await self.context_processor.select_top_news_items(self._news_cache, limit=5)
+                )
 
-            # Собираем свежие новости
-            logger.info("Сбор свежих новостей")
-            news_items = await self.news_collector.get_recent_news_items(limit=20)
+            # Собираем свежие новости (один общий сбор на одновременные вызовы)
+            news_items = await self._refresh_news(force_refresh)
 
             if not news_items:
                 logger.warning("Новости не получены, используем fallback")
                 return []
 
-            # Обновляем кэш
-            self._news_cache = news_items
-            self._news_cache_time = now
-
             # Используем context_processor для отбора лучших новостей
-            selected_items = await self.context_processor.select_top_news_items(news_items, limit=5)
+            selected_items = self._remember_selection(
+                await self.context_processor.select_top_news_items(news_items, limit=5)
+            )
 
             logger.info(f"Выбрано {len(selected_items)} новостей из {len(news_items)} доступных")
             return selected_items
@@ -185,25 +540,23 @@ class DeepSeekClient:
         return "\n".join(headlines_lines)
 
     async def generate_prompt_with_context(self):
-        """Генерирует промпт с новостными заголовками."""
+        """Генерирует сообщения промпта с новостными заголовками."""
         # Получаем 5 новостных заголовков
         headlines_list = await self._get_headlines()
         headlines_string = "\n".join([f"• {headline}" for headline in headlines_list])
 
-        # Заполняем шаблон промпта
-        prompt = self.prompt_template.format(
-            headlines=headlines_string
-        )
+        # Заполняем переменную часть шаблона (системная часть неизменна)
+        messages = self.prompt_template.messages(headlines=headlines_string)
 
         logger.debug(f"Сгенерирован промпт с {len(headlines_list)} заголовками")
-        return prompt, headlines_list
+        return messages, headlines_list
     
-    async def generate_post(self):
+    async def generate_post(self, command: str = 'generate_post'):
         """Генерирует пост с контекстом времени, используя DeepSeek API."""
         try:
             # Генерируем промпт с новостями
             if self.news_enabled:
-                prompt, headlines_list = await self.generate_prompt_with_context()
+                messages, headlines_list = await self.generate_prompt_with_context()
                 logger.info(f"Используем {len(headlines_list)} новостных заголовков")
             else:
                 # Fallback без новостей
@@ -215,26 +568,21 @@ class DeepSeekClient:
                     "Работа сервиса продолжается в штатном режиме"
                 ]
                 headlines_string = "\n".join([f"• {headline}" for headline in headlines_list])
-                prompt = self.prompt_template.format(headlines=headlines_string)
+                messages = self.prompt_template.messages(headlines=headlines_string)
                 logger.info("Генерация без новостного контекста (fallback режим)")
+            prompt = messages_text(messages)
 
             # Получаем случайные параметры API
             api_params = self._get_random_api_params()
 
-            # Отправляем запрос через OpenAI SDK
-            response = self.client.chat.completions.create(
-                model=api_params["model"],
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=api_params["max_tokens"],
-                temperature=api_params.get("temperature", 0.7),
-                top_p=api_params.get("top_p", 0.9),
-                presence_penalty=api_params.get("presence_penalty", 0.5),
-                frequency_penalty=api_params.get("frequency_penalty", 0.6),
-                stream=False
-            )
+            if self.usage_meter.preflight(prompt, api_params["max_tokens"]) == BUDGET_EXHAUSTED:
+                logger.warning("Бюджет на DeepSeek исчерпан, пост не генерируется")
+                return None, None, None
 
-            if response.choices and len(response.choices) > 0:
-                post_text = response.choices[0].message.content.strip()
+            # Отправляем запрос через асинхронный OpenAI SDK (отмена задачи прерывает запрос)
+            post_text, self.last_generation_stats = await self._complete(messages, api_params, command=command)
+
+            if post_text:
                 logger.info(f"Пост сгенерирован на основе {len(headlines_list)} новостных заголовков")
                 return post_text, prompt, headlines_list
             else:
@@ -245,15 +593,42 @@ class DeepSeekClient:
             logger.error(f"Ошибка при генерации поста: {str(e)}")
             return None, None, None
 
-    async def generate_hybrid_post(self, force_refresh: bool = False):
-        """Генерирует пост гибридно: заголовки в коде, комментарий через LLM."""
+    @staticmethod
+    def compose_post(headlines_section: str, commentary: Optional[str]) -> str:
+        """Склеивает пост: заголовки (код) + комментарий (LLM), если он есть."""
+        return f"{headlines_section}\n\n{commentary}" if commentary else headlines_section
+
+    async def generate_hybrid_post(self, force_refresh: bool = False, command: str = 'hybrid_post'):
+        """
+        Генерирует пост гибридно: заголовки в коде, комментарий через LLM.
+
+        Returns:
+            (текст поста, промпт, заголовки) или (None, None, None)
+        """
+        headlines_section, commentary, prompt, headlines = await self.generate_hybrid_parts(
+            force_refresh=force_refresh, command=command
+        )
+        if not headlines_section:
+            return None, None, None
+        return self.compose_post(headlines_section, commentary), prompt, headlines
+
+    async def generate_hybrid_parts(self, force_refresh: bool = False, command: str = 'hybrid_post'):
+        """
+        Генерирует части гибридного поста: секцию заголовков и комментарий LLM.
+
+        При приближении к бюджету генерируется один короткий вариант комментария,
+        а при исчерпании бюджета комментарий не генерируется (None).
+
+        Returns:
+            (секция заголовков, комментарий, промпт, заголовки) или четыре None
+        """
         try:
             # Получаем новостные объекты
             news_items = await self._get_news_items(force_refresh=force_refresh)
 
             if not news_items:
                 logger.warning("Нет новостей для генерации поста")
-                return None, None, None
+                return None, None, None, None
 
             # Форматируем заголовки программно
             headlines_section = self._format_headlines_section(news_items)
@@ -279,44 +654,65 @@ class DeepSeekClient:
             headlines_for_prompt = [item.title for item in news_items]
             headlines_list = '\n'.join([f"• {headline}" for headline in headlines_for_prompt])
 
-            # Создаем промпт с полными заголовками
-            prompt = f"""Вот 5 новостей:
-{headlines_list}
-
-В 2-3 предложениях (максимум 600 символов) найди общую нить между этими событиями. {random_question} НЕ ПОВТОРЯЙ заголовки, БЕЗ форматирования, КРАТКО."""
+            # Создаем промпт: неизменные инструкции, затем заголовки и вопрос
+            messages = HYBRID_PROMPT.messages(headlines=headlines_list, question=random_question)
+            prompt = messages_text(messages)
 
             # Получаем случайные параметры API
             api_params = self._get_random_api_params()
-
-            # Генерируем только комментарий через LLM
-            response = self.client.chat.completions.create(
-                model=api_params["model"],
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=api_params["max_tokens"],
-                temperature=api_params.get("temperature", 0.7),
-                top_p=api_params.get("top_p", 0.9),
-                presence_penalty=api_params.get("presence_penalty", 0.5),
-                frequency_penalty=api_params.get("frequency_penalty", 0.6),
-                stream=False
-            )
-
-            if response.choices and len(response.choices) > 0:
-                commentary = response.choices[0].message.content.strip()
-
-                # Ограничиваем длину комментария
-                if len(commentary) > 700:
-                    commentary = commentary[:700].rsplit('.', 1)[0] + '.'
-                    logger.info(f"Комментарий обрезан до {len(commentary)} символов")
-
-                # Склеиваем пост: заголовки (код) + комментарий (LLM)
-                final_post = f"{headlines_section}\n\n{commentary}"
-
+            num_candidates = max(1, DEEPSEEK_CANDIDATES)
+            target_chars = COMMENTARY_TARGET_CHARS
+
+            # Проверка бюджета до отправки по локальной оценке токенов
+            budget = self.usage_meter.preflight(prompt, api_params["max_tokens"], num_candidates)
+            if budget != BUDGET_OK:
+                # Экономный режим: один вариант, короткий промпт и ответ
+                num_candidates = 1
+                target_chars = ECONOMY_TARGET_CHARS
+                api_params["max_tokens"] = min(api_params["max_tokens"], ECONOMY_MAX_TOKENS)
+                messages = ECONOMY_PROMPT.messages(headlines=headlines_list)
+                prompt = messages_text(messages)
+                budget = self.usage_meter.preflight(prompt, api_params["max_tokens"])
+                logger.info(f"Бюджет на DeepSeek почти израсходован, экономный режим ({budget})")
+
+            if budget == BUDGET_EXHAUSTED:
+                logger.warning("Бюджет на DeepSeek исчерпан, публикуем заголовки без комментария")
+                return headlines_section, None, prompt, [item.title for item in news_items]
+
+            # Генерируем только комментарий через LLM: несколько вариантов параллельно,
+            # каждый со своими случайными параметрами; генерация останавливается
+            # на конце предложения после целевой длины
+            results = await asyncio.gather(*(
+                self._complete(
+                    messages, api_params if i == 0 else self._get_random_api_params(),
+                    target_chars=target_chars,
+                    max_chars=COMMENTARY_MAX_CHARS,
+                    command=command
+                )
+                for i in range(num_candidates)
+            ), return_exceptions=True)
+
+            # Вариант -> статистика его запроса (время до первого токена, токены)
+            candidates = {}
+            for result in results:
+                if isinstance(result, BaseException):
+                    logger.warning(f"Вариант комментария не сгенерирован: {str(result)}")
+                elif result[0]:
+                    candidates[result[0]] = result[1]
+            if not candidates and isinstance(results[0], BaseException):
+                raise results[0]
+
+            # Лучший вариант выбирается локально, без повторных запросов
+            recent_posts = self.published_memory.recent_posts if self.published_memory else ()
+            commentary = self.candidate_ranker.best(candidates, headlines_for_prompt, recent_posts)
+            if commentary:
+                self.last_generation_stats = candidates[commentary]
                 logger.info(f"Гибридный пост сгенерирован на основе {len(news_items)} новостей")
-                return final_post, prompt, [item.title for item in news_items]
+                return headlines_section, commentary, prompt, [item.title for item in news_items]
             else:
                 logger.error("API вернул пустой ответ")
-                return None, None, None
+                return None, None, None, None
 
         except Exception as e:
             logger.error(f"Ошибка при гибридной генерации поста: {str(e)}")
-            return None, None, None
+            return None, None, None, None
@@ -0,0 +1,91 @@
+"""
+Модуль для хранения валидаторов RSS фидов (ETag / Last-Modified).
+Сохраняет разобранные записи каждого источника, чтобы не скачивать
+и не парсить заново фид, который не изменился с прошлого опроса.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('feed_cache')
+
+
+class FeedCache:
+    """Персистентное хранилище валидаторов и разобранных записей фидов."""
+
+    def __init__(self, path: str = 'data/feed_cache.json'):
+        self.path = path
+        self._entries: Dict[str, dict] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        """Загружает хранилище с диска, если файл существует."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+            logger.info(f"Загружены валидаторы для {len(self._entries)} фидов из {self.path}")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки кэша фидов {self.path}: {str(e)}")
+            self._entries = {}
+
+    def save(self):
+        """Атомарно сохраняет хранилище на диск, если были изменения."""
+        if not self._dirty:
+            return
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"Ошибка сохранения кэша фидов {self.path}: {str(e)}")
+
+    def request_headers(self, source_name: str) -> Dict[str, str]:
+        """Возвращает заголовки условного запроса для источника."""
+        entry = self._entries.get(source_name)
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def has_content_hash(self, source_name: str, content_hash: str) -> bool:
+        """Проверяет, совпадает ли тело фида с сохраненным."""
+        entry = self._entries.get(source_name)
+        return bool(entry) and entry.get('content_hash') == content_hash
+
+    def get_items(self, source_name: str) -> List[dict]:
+        """Возвращает сохраненные разобранные записи источника (в виде словарей)."""
+        entry = self._entries.get(source_name)
+        if not entry:
+            return []
+        return list(entry.get('items', []))
+
+    def update(self, source_name: str, items: List[dict], etag: Optional[str] = None,
+               last_modified: Optional[str] = None, content_hash: Optional[str] = None):
+        """Запоминает валидаторы и разобранные записи источника."""
+        self._entries[source_name] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash,
+            'items': items,
+            'updated_at': datetime.now().isoformat()
+        }
+        self._dirty = True
@@ -0,0 +1,357 @@
+"""
+Модуль для разбора RSS фидов вне event loop.
+Парсинг и очистка HTML выполняются в пуле потоков или процессов,
+чтобы не задерживать обработку команд бота. Фиды разбираются потоково
+с ранней остановкой; feedparser используется для некорректных фидов.
+"""
+
+import asyncio
+import hashlib
+import html
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import feedparser
+
+logger = logging.getLogger('feed_parser')
+
+# Поддерживаемые режимы выполнения парсинга
+PARSE_MODES = ('inline', 'thread', 'process')
+
+# Теги записей RSS (<item>) и Atom (<entry>)
+ENTRY_TAGS = ('item', 'entry')
+
+# Закрывающий тег записи внутри CDATA или комментария — это текст, а не
+# граница записи, поэтому такие секции при поиске пропускаются целиком
+_ENTRY_SCAN_RE = re.compile(rb'<!\[CDATA\[|<!--|</(?:[\w-]+:)?(?:item|entry)\s*>')
+_SECTION_ENDS = {b'<![CDATA[': b']]>', b'<!--': b'-->'}
+
+# Сколько байт в конце буфера просматривается повторно: тег может оказаться
+# разрезан между частями фида
+ENTRY_SCAN_OVERLAP = 32
+
+# Размер блока, которым байты фида подаются потоковому парсеру
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Сколько устаревших записей подряд означает, что дальше только старые
+STALE_STREAK_LIMIT = 3
+
+# Регулярные выражения для очистки HTML
+_TAG_RE = re.compile(r'<(?:/?[a-zA-Z][^>]*|![^>]*|\?[^>]*)>')
+_BLOCK_TAG_RE = re.compile(
+    r'<(?:br|/?(?:p|div|li|ul|ol|h[1-6]|tr|td|blockquote|figure|figcaption))\b[^>]*>',
+    re.IGNORECASE
+)
+_INVISIBLE_RE = re.compile(
+    r'<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+
+# LRU-кэш очищенных строк: ключ — хэш входа, т.к. одни и те же записи
+# приходят при каждом опросе, а описания бывают длинными
+CLEAN_CACHE_SIZE = 4096
+_clean_cache: 'OrderedDict[bytes, str]' = OrderedDict()
+_clean_cache_stats = {'hits': 0, 'misses': 0}
+_clean_cache_lock = threading.Lock()
+
+
+def _strip_tags(html_text: str) -> str:
+    """Удаляет теги, комментарии и содержимое script/style, декодирует сущности."""
+    text = _INVISIBLE_RE.sub('', html_text)
+    # Блочные теги превращаем в пробел, чтобы не склеивать соседние слова
+    text = _BLOCK_TAG_RE.sub(' ', text)
+    text = _TAG_RE.sub('', text)
+    if '&' in text:
+        text = html.unescape(text)
+    return text
+
+
+def clean_html(html_text: str) -> str:
+    """Очищает HTML теги и лишние символы из текста."""
+    if not html_text:
+        return ""
+
+    # Быстрый путь: в большинстве заголовков нет ни тегов, ни сущностей
+    if '<' not in html_text and '&' not in html_text:
+        return ' '.join(html_text.split())
+
+    key = hashlib.blake2b(html_text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    with _clean_cache_lock:
+        cached = _clean_cache.get(key)
+        if cached is not None:
+            _clean_cache.move_to_end(key)
+            _clean_cache_stats['hits'] += 1
+            return cached
+        _clean_cache_stats['misses'] += 1
+
+    # Удаляем HTML теги и очищаем лишние пробелы и переносы строк
+    text = ' '.join(_strip_tags(html_text).split())
+
+    with _clean_cache_lock:
+        _clean_cache[key] = text
+        if len(_clean_cache) > CLEAN_CACHE_SIZE:
+            _clean_cache.popitem(last=False)
+
+    return text
+
+
+def clean_html_cache_info() -> dict:
+    """Возвращает статистику LRU-кэша очистки HTML (в текущем процессе)."""
+    with _clean_cache_lock:
+        return {
+            'hits': _clean_cache_stats['hits'],
+            'misses': _clean_cache_stats['misses'],
+            'size': len(_clean_cache)
+        }
+
+
+def _local_name(tag: str) -> str:
+    """Возвращает имя тега без пространства имен."""
+    return tag.rsplit('}', 1)[-1] if '}' in tag else tag
+
+
+def _parse_entry_date(date_string: Optional[str]) -> datetime:
+    """Парсит дату записи (RFC 822 или ISO 8601) в наивное время UTC."""
+    if not date_string:
+        return datetime.now()
+
+    date_string = date_string.strip()
+    try:
+        published = parsedate_to_datetime(date_string)
+    except (TypeError, ValueError, IndexError):
+        try:
+            published = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+        except ValueError:
+            parsed = feedparser._parse_date(date_string)
+            return datetime(*parsed[:6]) if parsed else datetime.now()
+
+    if published.tzinfo is not None:
+        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+    return published
+
+
+def _entry_to_dict(entry: ElementTree.Element, source_name: str) -> dict:
+    """Извлекает поля новости из элемента <item> (RSS) или <entry> (Atom)."""
+    fields = {}
+    link = ''
+
+    for child in entry:
+        name = _local_name(child.tag)
+        if name == 'link':
+            # В Atom ссылка лежит в атрибуте href, в RSS — в тексте
+            if not link or child.get('rel', 'alternate') == 'alternate':
+                link = (child.get('href') or child.text or '').strip()
+        elif name not in fields:
+            fields[name] = child.text or ''
+
+    summary = fields.get('description') or fields.get('summary') or fields.get('content', '')
+    date_string = fields.get('pubDate') or fields.get('published') or fields.get('updated')
+
+    return {
+        'title': clean_html(fields.get('title', '')),
+        'summary': clean_html(summary),
+        'link': link,
+        'published': _parse_entry_date(date_string).isoformat(),
+        'source': source_name
+    }
+
+
+def _parse_streaming(content: bytes, source_name: str, max_items: int,
+                     max_age_hours: Optional[int], news_items: List[dict]) -> int:
+    """
+    Потоково разбирает фид, добавляя записи в news_items по мере их закрытия.
+
+    Разобранные элементы сразу удаляются из дерева, поэтому память
+    не растет с размером фида. Разбор прекращается, когда набрано
+    max_items записей или подряд встретились устаревшие записи.
+    Возвращает количество встреченных записей (включая устаревшие).
+    """
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    cutoff_time = datetime.now() - timedelta(hours=max_age_hours) if max_age_hours else None
+    stack = []
+    seen = 0
+    stale_streak = 0
+
+    view = memoryview(content)
+    for offset in range(0, len(view), STREAM_BLOCK_SIZE):
+        parser.feed(view[offset:offset + STREAM_BLOCK_SIZE])
+
+        for event, element in parser.read_events():
+            if event == 'start':
+                stack.append(element)
+                continue
+
+            stack.pop()
+            if _local_name(element.tag) not in ENTRY_TAGS:
+                continue
+
+            # Освобождаем память: запись больше не нужна в дереве
+            if stack:
+                stack[-1].remove(element)
+            seen += 1
+
+            try:
+                item = _entry_to_dict(element, source_name)
+            except Exception as e:
+                logger.error(f"Ошибка обработки записи от {source_name}: {str(e)}")
+                continue
+
+            if cutoff_time and datetime.fromisoformat(item['published']) <= cutoff_time:
+                stale_streak += 1
+                if stale_streak >= STALE_STREAK_LIMIT:
+                    return seen
+                continue
+
+            stale_streak = 0
+            news_items.append(item)
+            if len(news_items) >= max_items:
+                return seen
+
+    return seen
+
+
+def _parse_with_feedparser(content: bytes, source_name: str, max_items: int) -> List[dict]:
+    """Разбирает фид через feedparser (медленно, но терпимо к ошибкам разметки)."""
+    news_items = []
+
+    feed = feedparser.parse(content)
+
+    if not feed.entries:
+        logger.warning(f"Пустой фид от {source_name}")
+        return news_items
+
+    # Обрабатываем записи
+    for entry in feed.entries[:max_items]:
+        try:
+            # Парсим дату публикации
+            published_raw = entry.get('published_parsed') or entry.get('updated_parsed')
+            if published_raw:
+                published = datetime(*published_raw[:6])
+            else:
+                published = datetime.now()
+
+            news_items.append({
+                'title': clean_html(entry.get('title', '')),
+                'summary': clean_html(entry.get('summary', '')),
+                'link': entry.get('link', ''),
+                'published': published.isoformat(),
+                'source': source_name
+            })
+
+        except Exception as e:
+            logger.error(f"Ошибка обработки записи от {source_name}: {str(e)}")
+            continue
+
+    return news_items
+
+
+def parse_feed(content: bytes, source_name: str, max_items: int,
+               max_age_hours: Optional[int] = None) -> List[dict]:
+    """
+    Парсит тело RSS/Atom фида в список словарей новостей.
+
+    Сначала используется потоковый парсер с ранней остановкой; если фид
+    некорректен и записей не набралось, разбор повторяется через feedparser.
+    Функция не зависит от состояния сборщика, поэтому может выполняться
+    в отдельном процессе. Результат совместим с NewsItem.from_dict.
+    """
+    news_items = []
+
+    try:
+        if _parse_streaming(content, source_name, max_items, max_age_hours, news_items):
+            return news_items
+    except ElementTree.ParseError as e:
+        if len(news_items) >= max_items:
+            return news_items
+        logger.debug(f"Потоковый парсер не справился с фидом {source_name}: {str(e)}")
+
+    return _parse_with_feedparser(content, source_name, max_items)
+
+
+def find_entries_end(buffer: bytearray, start: int, needed: int) -> Tuple[int, int, int]:
+    """
+    Ищет закрывающие теги записей в буфере, начиная с позиции start.
+
+    Теги внутри секций CDATA и комментариев не считаются. Возвращает
+    (количество найденных тегов, позицию сразу после последнего найденного
+    тега, позицию для продолжения поиска после дочитывания буфера). Поиск
+    останавливается, когда найдено needed тегов.
+    """
+    found = 0
+    end = start
+    pos = start
+    while found < needed:
+        match = _ENTRY_SCAN_RE.search(buffer, pos)
+        if not match:
+            break
+
+        section_end = _SECTION_ENDS.get(match.group())
+        if section_end is None:
+            found += 1
+            end = pos = match.end()
+            continue
+
+        close = buffer.find(section_end, match.end())
+        if close < 0:
+            # Секция еще не дочитана — продолжим поиск с ее начала
+            return found, end, match.start()
+        pos = close + len(section_end)
+
+    return found, end, max(pos, len(buffer) - ENTRY_SCAN_OVERLAP)
+
+
+class ParserPool:
+    """Исполнитель задач парсинга с ограниченной очередью."""
+
+    def __init__(self, mode: str = 'thread', workers: int = 2, max_pending: int = 8):
+        if mode not in PARSE_MODES:
+            logger.warning(f"Неизвестный режим парсинга '{mode}', используем 'thread'")
+            mode = 'thread'
+
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        logger.info(f"Парсинг фидов: режим {self.mode}, воркеров {self.workers}, "
+                    f"очередь {self.max_pending}")
+
+    def _get_executor(self) -> Optional[Executor]:
+        """Создает пул при первом обращении (для режима inline пул не нужен)."""
+        if self.mode == 'inline':
+            return None
+
+        if self._executor is None:
+            if self.mode == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='feed_parser')
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        """Выполняет функцию в пуле; ожидает, если очередь заполнена."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        async with self._semaphore:
+            executor = self._get_executor()
+            if executor is None:
+                return func(*args)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, func, *args)
+
+    def shutdown(self):
+        """Останавливает пул воркеров."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
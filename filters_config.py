@@ -0,0 +1,259 @@
+"""
+Модуль внешней конфигурации источников и фильтров новостей.
+Источники RSS и списки ключевых слов хранятся в data/filters.json
+и перечитываются на лету: наблюдатель следит за временем изменения
+файла, компилирует новый снимок в отдельном потоке и атомарно
+подменяет его в сборщике и процессоре заголовков.
+Встроенные значения, из которых создан файл, запоминаются рядом
+(filters.defaults.json): если в новой версии кода они изменились,
+добавленные и удаленные ключевые слова и источники переносятся в файл,
+а правки, сделанные в файле вручную, сохраняются.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger('filters_config')
+
+KEYWORD_LISTS = ('military_keywords', 'positive_keywords', 'skip_keywords')
+
+
+def _write_json(path: str, data: dict):
+    """Атомарно записывает JSON-файл."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def merge_defaults(data: dict, previous: Optional[dict], defaults: dict) -> List[str]:
+    """
+    Переносит в конфигурацию изменения встроенных значений.
+
+    Args:
+        data: Содержимое filters.json (изменяется на месте)
+        previous: Встроенные значения, из которых файл создан или обновлен
+                  (None — неизвестны: только добавляются недостающие)
+        defaults: Текущие встроенные значения
+
+    Returns:
+        Описание изменений для лога
+    """
+    changes = []
+    for key in KEYWORD_LISTS:
+        values = data.setdefault(key, [])
+        old = set(previous[key]) if previous else set()
+        added = [k for k in defaults[key] if k not in old and k not in values]
+        removed = [k for k in old - set(defaults[key]) if k in values] if previous else []
+        values.extend(added)
+        for keyword in removed:
+            values.remove(keyword)
+        if added:
+            changes.append(f"{key}: +{', '.join(added)}")
+        if removed:
+            changes.append(f"{key}: -{', '.join(sorted(removed))}")
+
+    sources = data.setdefault('sources', {})
+    old_sources = previous['sources'] if previous else {}
+    for name, url in defaults['sources'].items():
+        if name not in old_sources and name not in sources:
+            sources[name] = url
+            changes.append(f"sources: +{name}")
+    if previous:
+        for name, url in old_sources.items():
+            # Удаляется только источник, который в файле не меняли
+            if name not in defaults['sources'] and sources.get(name) == url:
+                del sources[name]
+                changes.append(f"sources: -{name}")
+    return changes
+
+
+class FiltersSnapshot:
+    """Неизменяемый снимок конфигурации с уже скомпилированным матчером."""
+
+    def __init__(self, sources: Dict[str, str], keywords: Dict[str, List[str]], mtime: float,
+                 topic_profiles: Optional[Dict[str, Tuple[float, List[str]]]] = None):
+        self.sources = sources
+        self.keywords = keywords
+        self.mtime = mtime
+        self.topic_profiles = topic_profiles
+        self.matcher = KeywordMatcher({
+            'military': keywords['military_keywords'],
+            'positive': keywords['positive_keywords'],
+            'skip': keywords['skip_keywords']
+        })
+
+
+def load_snapshot(path: str) -> FiltersSnapshot:
+    """Читает и проверяет файл конфигурации, компилирует матчер."""
+    mtime = os.path.getmtime(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    sources = data.get('sources')
+    if not isinstance(sources, dict) or not sources:
+        raise ValueError("'sources' должен быть непустым словарем имя -> URL")
+    for name, url in sources.items():
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            raise ValueError(f"Некорректный URL источника {name}: {url}")
+
+    keywords = {}
+    for key in KEYWORD_LISTS:
+        values = data.get(key)
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"'{key}' должен быть списком строк")
+        keywords[key] = values
+
+    # Необязательные тематические профили: {"тема": {"weight": 1.5, "keywords": [...]}}
+    topic_profiles = None
+    if 'topic_profiles' in data:
+        topic_profiles = {}
+        for topic, profile in data['topic_profiles'].items():
+            if not isinstance(profile, dict) or not isinstance(profile.get('keywords'), list):
+                raise ValueError(f"Некорректный тематический профиль {topic}")
+            topic_profiles[topic] = (float(profile.get('weight', 1.0)), profile['keywords'])
+
+    return FiltersSnapshot(dict(sources), keywords, mtime, topic_profiles)
+
+
+class FiltersWatcher:
+    """Следит за файлом конфигурации и применяет изменения без перезапуска."""
+
+    def __init__(self, news_collector, context_processor, path: str = 'data/filters.json',
+                 check_interval: float = 30.0):
+        self.news_collector = news_collector
+        self.context_processor = context_processor
+        self.path = path
+        self.check_interval = check_interval
+
+        # Встроенные значения этой версии кода (до применения файла)
+        self.defaults = {
+            'sources': dict(news_collector.sources),
+            **{key: list(getattr(context_processor, key)) for key in KEYWORD_LISTS}
+        }
+        self.defaults_path = f"{os.path.splitext(path)[0]}.defaults.json"
+
+        self.snapshot: Optional[FiltersSnapshot] = None
+        self._seen_mtime: Optional[float] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def export_defaults(self):
+        """
+        Создает файл из встроенных источников и списков, если его еще нет,
+        иначе переносит в него изменения встроенных значений новой версии кода.
+        """
+        if not os.path.exists(self.path):
+            _write_json(self.path, self.defaults)
+            _write_json(self.defaults_path, self.defaults)
+            logger.info(f"Создан файл конфигурации фильтров {self.path}")
+            return
+
+        previous = None
+        if os.path.exists(self.defaults_path):
+            try:
+                with open(self.defaults_path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+            except Exception as e:
+                logger.error(f"Ошибка чтения {self.defaults_path}: {str(e)}")
+        if previous == self.defaults:
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            # Ошибку файла сообщит загрузка снимка; встроенные значения перенесем позже
+            logger.error(f"Не удалось обновить {self.path} встроенными значениями: {str(e)}")
+            return
+
+        changes = merge_defaults(data, previous, self.defaults)
+        if changes:
+            _write_json(self.path, data)
+            logger.warning(
+                f"Встроенные фильтры изменились, в {self.path} перенесено: {'; '.join(changes)}"
+                + ("" if previous else " (файл создан до учета встроенных значений: только добавлены недостающие)")
+            )
+        _write_json(self.defaults_path, self.defaults)
+
+    def apply(self, snapshot: FiltersSnapshot):
+        """
+        Подменяет источники и матчер новым снимком.
+
+        Подмена — это присваивание готовых объектов, поэтому отбор, который
+        уже идет, дорабатывает со старым матчером. Кэши фидов, здоровье
+        источников и вердикты (при тех же ключевых словах) сохраняются.
+        """
+        self.news_collector.sources = snapshot.sources
+        self.context_processor.update_keywords(
+            military=snapshot.keywords['military_keywords'],
+            positive=snapshot.keywords['positive_keywords'],
+            skip=snapshot.keywords['skip_keywords'],
+            matcher=snapshot.matcher,
+            topic_profiles=snapshot.topic_profiles
+        )
+        self.snapshot = snapshot
+        self.reloads += 1
+        logger.info(f"Применена конфигурация фильтров: {len(snapshot.sources)} источников, "
+                    f"{sum(len(v) for v in snapshot.keywords.values())} ключевых слов")
+
+    async def reload_if_changed(self) -> bool:
+        """Перечитывает файл, если он изменился; возвращает True при подмене."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+
+        if mtime == self._seen_mtime:
+            return False
+        self._seen_mtime = mtime
+
+        try:
+            # Разбор и компиляция ключевых слов — в отдельном потоке
+            snapshot = await asyncio.to_thread(load_snapshot, self.path)
+        except Exception as e:
+            # Ошибочный файл не ломает работу: остается прежний снимок
+            self.last_error = str(e)
+            logger.error(f"Не удалось загрузить {self.path}: {str(e)}")
+            return False
+
+        self.last_error = None
+        self.apply(snapshot)
+        return True
+
+    async def start(self):
+        """Загружает конфигурацию и запускает наблюдение за файлом."""
+        if self._task and not self._task.done():
+            return
+        await asyncio.to_thread(self.export_defaults)
+        await self.reload_if_changed()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает наблюдение за файлом."""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        """Периодически проверяет время изменения файла."""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Ошибка наблюдения за {self.path}: {str(e)}")
@@ -0,0 +1,77 @@
+"""
+Модуль для быстрого поиска ключевых слов в заголовках.
+Ключевые слова один раз приводятся к основам (text_normalizer), поэтому
+'ракета' находит 'ракетой', а 'рота' не находится внутри 'работа'.
+Поиск — это проверка основ заголовка по множеству, а фразы из нескольких
+слов ищутся как последовательности основ. Производные слова с другой
+основой ('танковый', 'промокод') перечисляются в списках отдельно, поэтому
+'танк' не находится в 'танкер', а 'рота' — в 'ротация'.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, Union
+
+from text_normalizer import normalize_text
+
+logger = logging.getLogger('keyword_matcher')
+
+
+class KeywordMatcher:
+    """Однопроходный классификатор текста по категориям ключевых слов."""
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.categories: Dict[str, List[str]] = {}
+
+        # основа -> [(категория, ключевое слово)] для однословных ключевых слов
+        self._single: Dict[str, List[Tuple[str, str]]] = {}
+        # первая основа фразы -> [(основы фразы, категория, ключевое слово)]
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], str, str]]] = {}
+
+        for category, keywords in categories.items():
+            normalized = [keyword.lower().strip() for keyword in keywords if keyword.strip()]
+            self.categories[category] = normalized
+            for keyword in normalized:
+                stems = normalize_text(keyword)
+                if not stems:
+                    continue
+                if len(stems) == 1:
+                    self._single.setdefault(stems[0], []).append((category, keyword))
+                else:
+                    self._phrases.setdefault(stems[0], []).append((stems, category, keyword))
+
+        # Отпечаток списков: меняется при любом изменении ключевых слов
+        self.fingerprint = hashlib.sha1(
+            json.dumps(self.categories, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+        logger.debug(f"Скомпилировано {len(self._single)} основ и "
+                     f"{sum(len(p) for p in self._phrases.values())} фраз "
+                     f"в {len(self.categories)} категориях")
+
+    def match(self, text: Union[str, Sequence[str]]) -> Dict[str, List[str]]:
+        """
+        Возвращает найденные ключевые слова, сгруппированные по категориям.
+
+        Args:
+            text: Текст или уже нормализованные основы (normalize_text)
+        """
+        matches: Dict[str, List[str]] = {}
+        if not text:
+            return matches
+
+        stems = normalize_text(text) if isinstance(text, str) else text
+        found: Set[Tuple[str, str]] = set()
+
+        for position, token_stem in enumerate(stems):
+            for category, keyword in self._single.get(token_stem, ()):
+                found.add((category, keyword))
+            for phrase, category, keyword in self._phrases.get(token_stem, ()):
+                if tuple(stems[position:position + len(phrase)]) == phrase:
+                    found.add((category, keyword))
+
+        for category, keyword in sorted(found):
+            matches.setdefault(category, []).append(keyword)
+
+        return matches
@@ -0,0 +1,166 @@
+"""
+Модуль для поиска почти одинаковых заголовков из разных источников.
+РИА, Интерфакс, Коммерсантъ и РБК часто публикуют одну и ту же новость
+с немного разными заголовками. Заголовки сравниваются по MinHash-подписям
+символьных шинглов, а кандидаты ищутся через LSH-корзины, поэтому
+добавление новой новости не требует сравнения со всеми остальными.
+"""
+
+import hashlib
+import logging
+import operator
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger('near_duplicates')
+
+# Параметры MinHash/LSH: подпись из 32 корзин = 8 полос по 4 строки.
+# Порог срабатывания LSH около (1/8)^(1/4) ≈ 0.6 по Жаккару.
+NUM_HASHES = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_HASHES // BANDS
+SHINGLE_SIZE = 4
+
+# Сколько последних заголовков хранится в одной LSH-корзине. Заголовки
+# одной истории попадают в одни корзины, и без ограничения добавление
+# становится квадратичным; для поиска дубликата хватает последних.
+MAX_BUCKET_SIZE = 16
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize_headline(headline: str) -> str:
+    """Приводит заголовок к виду для сравнения: нижний регистр, без пунктуации."""
+    text = headline.lower().replace('ё', 'е')
+    return ' '.join(_NON_WORD_RE.sub(' ', text).split())
+
+
+def headline_shingles(headline: str) -> Set[int]:
+    """Возвращает множество хэшей символьных шинглов заголовка."""
+    text = normalize_headline(headline)
+    if len(text) <= SHINGLE_SIZE:
+        grams = {text} if text else set()
+    else:
+        grams = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+        for gram in grams
+    }
+
+
+def minhash_signature(headline: str) -> Optional[Tuple[int, ...]]:
+    """
+    Вычисляет MinHash-подпись заголовка (None для пустого заголовка).
+
+    Используется one-permutation hashing: каждый шингл хэшируется один раз
+    и попадает в одну из NUM_HASHES корзин, где хранится минимум. Пустые
+    корзины заполняются из ближайшей непустой справа (densification),
+    поэтому стоимость линейна по числу шинглов.
+    """
+    shingles = headline_shingles(headline)
+    if not shingles:
+        return None
+
+    bins: List[Optional[int]] = [None] * NUM_HASHES
+    for value in shingles:
+        index = value % NUM_HASHES
+        value //= NUM_HASHES
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+
+    signature = []
+    for index in range(NUM_HASHES):
+        offset = 0
+        while bins[(index + offset) % NUM_HASHES] is None:
+            offset += 1
+        # Смещение отличает заимствованное значение от собственного
+        signature.append(bins[(index + offset) % NUM_HASHES] + offset * (1 << 60))
+    return tuple(signature)
+
+
+def signature_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Оценивает сходство Жаккара по доле совпавших MinHash-значений."""
+    return sum(map(operator.eq, first, second)) / NUM_HASHES
+
+
+class NearDuplicateIndex:
+    """Инкрементальный LSH-индекс кластеров почти одинаковых заголовков."""
+
+    def __init__(self, threshold: float = 0.6, max_items: int = 20000):
+        self.threshold = threshold
+        self.max_items = max_items
+
+        # ключ новости -> (подпись, кластер); порядок — для вытеснения старых
+        self._items: 'OrderedDict[str, Tuple[Tuple[int, ...], str]]' = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _bands(self, signature: Tuple[int, ...]):
+        """Разбивает подпись на LSH-полосы."""
+        for band in range(BANDS):
+            start = band * ROWS_PER_BAND
+            yield band, signature[start:start + ROWS_PER_BAND]
+
+    def cluster_of(self, key: str) -> Optional[str]:
+        """Возвращает кластер ранее добавленной новости."""
+        entry = self._items.get(key)
+        return entry[1] if entry else None
+
+    def add(self, key: str, headline: str, cluster_id: Optional[str] = None) -> str:
+        """
+        Добавляет заголовок в индекс и возвращает идентификатор его кластера.
+
+        Если cluster_id передан (восстановление из хранилища), он используется
+        как есть; иначе кластер определяется по самому похожему заголовку.
+        """
+        if key in self._items:
+            return self._items[key][1]
+
+        signature = minhash_signature(headline)
+        if signature is None:
+            return cluster_id or key
+
+        if cluster_id is None:
+            best_similarity = 0.0
+            cluster_id = key
+            checked = set()
+            for band in self._bands(signature):
+                for candidate in self._buckets.get(band, ()):
+                    if candidate in checked:
+                        continue
+                    checked.add(candidate)
+                    candidate_signature, candidate_cluster = self._items[candidate]
+                    similarity = signature_similarity(signature, candidate_signature)
+                    if similarity >= self.threshold and similarity > best_similarity:
+                        best_similarity = similarity
+                        cluster_id = candidate_cluster
+
+            if cluster_id != key:
+                logger.debug(f"Почти дубликат ({best_similarity:.2f}): {headline[:50]}...")
+
+        self._items[key] = (signature, cluster_id)
+        for band in self._bands(signature):
+            bucket = self._buckets.setdefault(band, [])
+            bucket.append(key)
+            if len(bucket) > MAX_BUCKET_SIZE:
+                del bucket[0]
+
+        while len(self._items) > self.max_items:
+            self._evict_oldest()
+
+        return cluster_id
+
+    def _evict_oldest(self):
+        """Удаляет самый старый заголовок из индекса."""
+        key, (signature, _) = self._items.popitem(last=False)
+        for band in self._bands(signature):
+            bucket = self._buckets.get(band)
+            if bucket and key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[band]
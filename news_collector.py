@@ -6,12 +6,24 @@
 import feedparser
 import asyncio
 import aiohttp
+import hashlib
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import pytz
-from bs4 import BeautifulSoup
-import re
+
+from config import NEWS_PARSE_MODE, NEWS_PARSE_WORKERS, NEWS_PARSE_QUEUE, NEWS_HEDGE_ENABLED
+from feed_cache import FeedCache
+from feed_parser import ParserPool, find_entries_end, parse_feed
+from source_health import SourceHealth
+from text_normalizer import normalize_text
+
+try:
+    import brotli  # noqa: F401 — нужен aiohttp для распаковки br
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
 
 logger = logging.getLogger('news_collector')
 
@@ -19,16 +31,50 @@ logger = logging.getLogger('news_collector')
 class NewsItem:
     """Класс для хранения информации о новости."""
 
-    def __init__(self, title: str, summary: str, link: str, published: datetime, source: str):
+    def __init__(self, title: str, summary: str, link: str, published: datetime, source: str,
+                 cluster_id: Optional[str] = None):
         self.title = title
         self.summary = summary
         self.link = link
         self.published = published
         self.source = source
+        # Кластер почти одинаковых заголовков (заполняется хранилищем новостей)
+        self.cluster_id = cluster_id
+        self._title_stems: Optional[Tuple[str, ...]] = None
+
+    @property
+    def title_stems(self) -> Tuple[str, ...]:
+        """Основы слов заголовка (вычисляются один раз для новости)."""
+        if self._title_stems is None:
+            self._title_stems = normalize_text(self.title)
+        return self._title_stems
 
     def __repr__(self):
         return f"NewsItem(title='{self.title[:50]}...', source='{self.source}')"
 
+    def to_dict(self) -> dict:
+        """Сериализует новость в словарь для хранения на диске."""
+        return {
+            'title': self.title,
+            'summary': self.summary,
+            'link': self.link,
+            'published': self.published.isoformat(),
+            'source': self.source,
+            'cluster_id': self.cluster_id
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'NewsItem':
+        """Восстанавливает новость из словаря."""
+        return cls(
+            title=data['title'],
+            summary=data.get('summary', ''),
+            link=data.get('link', ''),
+            published=datetime.fromisoformat(data['published']),
+            source=data['source'],
+            cluster_id=data.get('cluster_id')
+        )
+
 
 class NewsCollector:
     """Класс для сбора новостей из различных RSS источников."""
@@ -58,21 +104,69 @@ class NewsCollector:
         self.max_items_per_source = 5
         self.max_age_hours = 24
 
-        logger.info(f"Инициализирован сборщик новостей с {len(self.sources)} источниками")
+        # Ограничения чтения тела фида: читаем по частям и не больше лимита
+        self.chunk_size = 64 * 1024
+        self.max_feed_bytes = 2 * 1024 * 1024
 
-    def _clean_html(self, html_text: str) -> str:
-        """Очищает HTML теги и лишние символы из текста."""
-        if not html_text:
-            return ""
+        # Настройки пула соединений (общая сессия на все источники)
+        self.connection_limit = 20
+        self.connection_limit_per_host = 2
+        self.dns_cache_ttl = 300  # секунды
+        self.keepalive_timeout = 60  # секунды
+        self._session: Optional[aiohttp.ClientSession] = None
 
-        # Удаляем HTML теги
-        soup = BeautifulSoup(html_text, 'html.parser')
-        text = soup.get_text()
+        # Валидаторы фидов и разобранные записи (переживают перезапуск)
+        self.feed_cache = FeedCache()
 
-        # Очищаем лишние пробелы и переносы строк
-        text = re.sub(r'\s+', ' ', text).strip()
+        # Здоровье источников: задержки, ошибки, автоматический выключатель
+        self.health: Dict[str, SourceHealth] = {}
+        self.hedge_enabled = NEWS_HEDGE_ENABLED
 
-        return text
+        # Источники, дорабатывающие в фоне после досрочного возврата collect_news
+        self._background_tasks = set()
+        self.on_late_result: Optional[Callable[[str, List[NewsItem]], None]] = None
+
+        # Пул для парсинга фидов вне event loop
+        self.parser_pool = ParserPool(
+            mode=NEWS_PARSE_MODE,
+            workers=NEWS_PARSE_WORKERS,
+            max_pending=NEWS_PARSE_QUEUE
+        )
+
+        logger.info(f"Инициализирован сборщик новостей с {len(self.sources)} источниками")
+
+    async def start(self):
+        """Открывает общую HTTP-сессию. Вызывается при запуске бота."""
+        await self._get_session()
+
+    async def close(self):
+        """Закрывает общую HTTP-сессию. Вызывается при остановке бота."""
+        for task in list(self._background_tasks):
+            task.cancel()
+        self._background_tasks.clear()
+
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP-сессия сборщика новостей закрыта")
+        self._session = None
+        self.parser_pool.shutdown()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую HTTP-сессию, создавая её при первом обращении."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': ACCEPT_ENCODING}
+            )
+            logger.info(f"Открыта HTTP-сессия сборщика новостей (Accept-Encoding: {ACCEPT_ENCODING})")
+        return self._session
 
     def _parse_date(self, date_string: str) -> Optional[datetime]:
         """Парсит дату из RSS фида."""
@@ -92,109 +186,272 @@ class NewsCollector:
         cutoff_time = datetime.now() - timedelta(hours=self.max_age_hours)
         return published_date > cutoff_time
 
-    async def _fetch_feed(self, source_name: str, url: str) -> List[NewsItem]:
-        """Получает и парсит RSS фид от одного источника."""
+    async def _read_feed_body(self, source_name: str, response: aiohttp.ClientResponse) -> bytes:
+        """
+        Читает тело фида по частям и прекращает чтение, как только
+        в нем набралось max_items_per_source закрытых записей (теги
+        внутри CDATA и комментариев не считаются).
+        """
+        buffer = bytearray()
+        found = 0
+        scan_from = 0
+
+        async for chunk in response.content.iter_chunked(self.chunk_size):
+            buffer.extend(chunk)
+
+            new_found, end, scan_from = find_entries_end(
+                buffer, scan_from, self.max_items_per_source - found
+            )
+            found += new_found
+            if found >= self.max_items_per_source:
+                logger.debug(f"Фид {source_name}: прочитано {end} байт, записей достаточно")
+                return bytes(buffer[:end])
+
+            if len(buffer) >= self.max_feed_bytes:
+                logger.warning(f"Фид {source_name} превысил {self.max_feed_bytes} байт, читаем только начало")
+                return bytes(buffer[:self.max_feed_bytes])
+
+        return bytes(buffer)
+
+    def _filter_recent(self, source_name: str, news_items: List[NewsItem]) -> List[NewsItem]:
+        """Оставляет только достаточно свежие новости."""
+        recent_items = []
+
+        for news_item in news_items:
+            if not self._is_recent(news_item.published):
+                logger.debug(f"Пропуск старой новости: {news_item.title[:50]}...")
+                continue
+
+            recent_items.append(news_item)
+            logger.debug(f"Добавлена новость от {source_name}: {news_item.title[:50]}...")
+
+        return recent_items
+
+    def _cached_items(self, source_name: str) -> List[NewsItem]:
+        """Восстанавливает разобранные записи источника из кэша фидов."""
         news_items = []
+        for data in self.feed_cache.get_items(source_name):
+            try:
+                news_items.append(NewsItem.from_dict(data))
+            except Exception as e:
+                logger.error(f"Повреждена запись кэша фида {source_name}: {str(e)}")
+        return news_items
+
+    def _get_health(self, source_name: str) -> SourceHealth:
+        """Возвращает статистику здоровья источника, создавая ее при необходимости."""
+        if source_name not in self.health:
+            self.health[source_name] = SourceHealth(source_name)
+        return self.health[source_name]
+
+    async def _download(self, source_name: str, url: str,
+                        headers: Dict[str, str]) -> Tuple[int, bytes, Optional[str], Optional[str]]:
+        """Выполняет один GET запрос фида: (статус, тело, ETag, Last-Modified)."""
+        session = await self._get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status != 200:
+                return response.status, b'', None, None
+
+            content = await self._read_feed_body(source_name, response)
+            return (response.status, content,
+                    response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    async def _download_hedged(self, source_name: str, url: str, headers: Dict[str, str],
+                               health: SourceHealth) -> Tuple[int, bytes, Optional[str], Optional[str]]:
+        """
+        Выполняет запрос фида, дублируя его, если обычно быстрый источник
+        отвечает дольше своего p95. Возвращается первый успешный ответ.
+        """
+        hedge_delay = health.hedge_delay(self.timeout) if self.hedge_enabled else None
+        if hedge_delay is None:
+            return await self._download(source_name, url, headers)
+
+        primary = asyncio.create_task(self._download(source_name, url, headers))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        health.hedged += 1
+        logger.debug(f"Источник {source_name} отвечает дольше {hedge_delay:.2f} с, дублируем запрос")
+        pending = {primary, asyncio.create_task(self._download(source_name, url, headers))}
+        error = None
 
         try:
-            logger.debug(f"Получение фида от {source_name}: {url}")
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
 
-            # Получаем RSS фид
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        logger.warning(f"Ошибка получения фида {source_name}: HTTP {response.status}")
-                        return news_items
+    async def _fetch_feed(self, source_name: str, url: str) -> List[NewsItem]:
+        """Получает и парсит RSS фид от одного источника (с условным GET)."""
+        news_items = []
 
-                    content = await response.text()
+        health = self._get_health(source_name)
+        if not health.allow_request():
+            logger.debug(f"Источник {source_name} временно отключен, пропускаем")
+            return news_items
 
-            # Парсим RSS фид
-            feed = feedparser.parse(content)
+        start = time.monotonic()
+        try:
+            logger.debug(f"Получение фида от {source_name}: {url}")
 
-            if not feed.entries:
-                logger.warning(f"Пустой фид от {source_name}")
+            # Получаем RSS фид через общую сессию, передавая сохраненные валидаторы
+            headers = self.feed_cache.request_headers(source_name)
+            status, content, etag, last_modified = await self._download_hedged(
+                source_name, url, headers, health
+            )
+
+            if status == 304:
+                health.record_success(time.monotonic() - start)
+                news_items = self._filter_recent(source_name, self._cached_items(source_name))
+                logger.info(f"Фид {source_name} не изменился (HTTP 304), "
+                            f"используем {len(news_items)} новостей из кэша")
                 return news_items
 
-            # Обрабатываем записи
-            for entry in feed.entries[:self.max_items_per_source]:
-                try:
-                    # Извлекаем данные
-                    title = self._clean_html(entry.get('title', ''))
-                    summary = self._clean_html(entry.get('summary', ''))
-                    link = entry.get('link', '')
-
-                    # Парсим дату публикации
-                    published_raw = entry.get('published_parsed') or entry.get('updated_parsed')
-                    if published_raw:
-                        published = datetime(*published_raw[:6])
-                    else:
-                        published = datetime.now()
-
-                    # Проверяем свежесть новости
-                    if not self._is_recent(published):
-                        logger.debug(f"Пропуск старой новости: {title[:50]}...")
-                        continue
+            if status != 200:
+                health.record_failure(time.monotonic() - start, f"HTTP {status}")
+                logger.warning(f"Ошибка получения фида {source_name}: HTTP {status}")
+                return news_items
 
-                    # Создаем объект новости
-                    news_item = NewsItem(
-                        title=title,
-                        summary=summary,
-                        link=link,
-                        published=published,
-                        source=source_name
-                    )
+            health.record_success(time.monotonic() - start)
 
-                    news_items.append(news_item)
-                    logger.debug(f"Добавлена новость от {source_name}: {title[:50]}...")
+            # Если сервер не прислал валидаторы, сравниваем хэш тела
+            content_hash = hashlib.sha1(content).hexdigest()
+            if self.feed_cache.has_content_hash(source_name, content_hash):
+                news_items = self._filter_recent(source_name, self._cached_items(source_name))
+                logger.info(f"Фид {source_name} не изменился (совпал хэш), "
+                            f"используем {len(news_items)} новостей из кэша")
+                return news_items
 
-                except Exception as e:
-                    logger.error(f"Ошибка обработки записи от {source_name}: {str(e)}")
-                    continue
+            # Парсим RSS фид в пуле и запоминаем результат вместе с валидаторами
+            parsed = await self.parser_pool.run(
+                parse_feed, content, source_name, self.max_items_per_source, self.max_age_hours
+            )
+            self.feed_cache.update(
+                source_name,
+                parsed,
+                etag=etag,
+                last_modified=last_modified,
+                content_hash=content_hash
+            )
+
+            parsed_items = [NewsItem.from_dict(data) for data in parsed]
+            news_items = self._filter_recent(source_name, parsed_items)
 
             logger.info(f"Получено {len(news_items)} новостей от {source_name}")
             return news_items
 
         except asyncio.TimeoutError:
+            health.record_failure(time.monotonic() - start, "тайм-аут")
             logger.warning(f"Тайм-аут при получении фида {source_name}")
+        except asyncio.CancelledError:
+            # Не оставляем выключатель в состоянии пробного запроса
+            health.record_failure(time.monotonic() - start, "запрос отменен")
+            raise
         except Exception as e:
+            health.record_failure(time.monotonic() - start, str(e))
             logger.error(f"Ошибка получения фида {source_name}: {str(e)}")
 
         return news_items
 
-    async def collect_news(self) -> List[NewsItem]:
-        """Собирает новости от всех источников."""
+    def health_status(self) -> List[dict]:
+        """Возвращает сводку здоровья всех источников."""
+        return [self._get_health(source_name).status() for source_name in self.sources]
+
+    def _on_straggler_done(self, source_name: str, task: asyncio.Task):
+        """Обрабатывает источник, ответивший уже после возврата collect_news."""
+        self._background_tasks.discard(task)
+        if task.cancelled():
+            return
+
+        error = task.exception()
+        if error:
+            logger.error(f"Ошибка от источника {source_name} (в фоне): {error}")
+            return
+
+        items = task.result()
+        logger.info(f"Источник {source_name} ответил в фоне: {len(items)} новостей")
+        self.feed_cache.save()
+        if self.on_late_result:
+            self.on_late_result(source_name, items)
+
+    async def collect_news(self, deadline: Optional[float] = None,
+                           target_items: Optional[int] = None,
+                           min_sources: int = 3) -> List[NewsItem]:
+        """
+        Собирает новости от всех источников.
+
+        Args:
+            deadline: Максимальное время ожидания в секундах (None — ждать всех)
+            target_items: Сколько новостей достаточно для досрочного возврата
+            min_sources: Минимум разных источников среди набранных новостей
+
+        Источники, не успевшие ответить, продолжают работу в фоне
+        и пополняют кэш фидов к следующему вызову.
+        """
         logger.info("Начало сбора новостей от всех источников")
 
         all_news = []
+        responded_sources = set()
 
         # Создаем задачи для параллельного получения фидов
-        tasks = []
+        pending = {}
         for source_name, url in self.sources.items():
             task = asyncio.create_task(self._fetch_feed(source_name, url))
-            tasks.append(task)
+            pending[task] = source_name
 
-        # Ждем выполнения всех задач
-        try:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + deadline if deadline is not None else None
 
-            # Обрабатываем результаты
-            for i, result in enumerate(results):
-                source_name = list(self.sources.keys())[i]
+        # Принимаем результаты по мере готовности
+        try:
+            while pending:
+                timeout = max(0.0, deadline_at - loop.time()) if deadline_at is not None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"Истек срок сбора новостей ({deadline} с), "
+                                f"не ответили: {', '.join(sorted(pending.values()))}")
+                    break
+
+                for task in done:
+                    source_name = pending.pop(task)
+
+                    if task.exception() is not None:
+                        logger.error(f"Ошибка от источника {source_name}: {task.exception()}")
+                        continue
 
-                if isinstance(result, Exception):
-                    logger.error(f"Ошибка от источника {source_name}: {result}")
-                    continue
+                    result = task.result()
+                    if result:
+                        all_news.extend(result)
+                        responded_sources.add(source_name)
 
-                if isinstance(result, list):
-                    all_news.extend(result)
+                if (target_items and pending and len(all_news) >= target_items
+                        and len(responded_sources) >= min(min_sources, len(self.sources))):
+                    logger.info(f"Набрано {len(all_news)} новостей от {len(responded_sources)} "
+                                f"источников, остальные источники дозагрузятся в фоне")
+                    break
 
         except Exception as e:
             logger.error(f"Критическая ошибка при сборе новостей: {str(e)}")
 
+        # Оставшиеся источники дорабатывают в фоне
+        for task, source_name in pending.items():
+            self._background_tasks.add(task)
+            task.add_done_callback(lambda t, name=source_name: self._on_straggler_done(name, t))
+
+        # Сохраняем обновленные валидаторы фидов
+        self.feed_cache.save()
+
         # Сортируем новости по дате публикации (новые первыми)
         all_news.sort(key=lambda x: x.published, reverse=True)
 
-        logger.info(f"Собрано {len(all_news)} новостей от {len(self.sources)} источников")
+        logger.info(f"Собрано {len(all_news)} новостей от {len(responded_sources)} из {len(self.sources)} источников")
 
         # Логируем статистику по источникам
         source_stats = {}
@@ -206,17 +463,18 @@ class NewsCollector:
 
         return all_news
 
-    async def get_recent_headlines(self, limit: int = 20) -> List[str]:
+    async def get_recent_headlines(self, limit: int = 20, deadline: Optional[float] = None) -> List[str]:
         """Получает заголовки недавних новостей для анализа."""
-        news_items = await self.collect_news()
+        news_items = await self.collect_news(deadline=deadline, target_items=limit)
         headlines = [item.title for item in news_items[:limit] if item.title]
 
         logger.info(f"Возвращено {len(headlines)} заголовков для анализа")
         return headlines
 
-    async def get_recent_news_items(self, limit: int = 20) -> List['NewsItem']:
+    async def get_recent_news_items(self, limit: int = 20,
+                                    deadline: Optional[float] = None) -> List['NewsItem']:
         """Получает объекты новостей с заголовками и ссылками."""
-        news_items = await self.collect_news()
+        news_items = await self.collect_news(deadline=deadline, target_items=limit)
         filtered_items = [item for item in news_items[:limit] if item.title and item.link]
 
         logger.info(f"Возвращено {len(filtered_items)} новостных объектов для анализа")
@@ -0,0 +1,196 @@
+"""
+Модуль фонового опроса RSS источников.
+Поддерживает хранилище новостей теплым, чтобы генерация постов
+не ждала сети. Интервал опроса подбирается для каждого источника
+по тому, как часто в нем появляются новые записи.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from news_collector import NewsCollector, NewsItem
+from news_store import NewsStore
+
+logger = logging.getLogger('news_poller')
+
+
+class SourceSchedule:
+    """Состояние опроса одного источника."""
+
+    def __init__(self, source_name: str, interval: float):
+        self.source_name = source_name
+        self.interval = interval
+        self.next_poll = 0.0  # time.monotonic(); 0 — опросить сразу
+        self.last_poll_time: Optional[datetime] = None
+        self.last_new_time: Optional[datetime] = None
+        self.avg_new_gap: Optional[float] = None  # секунды между появлениями новых записей
+        self.polls = 0
+        self.new_items_total = 0
+
+
+class NewsPoller:
+    """Фоновый опрос источников с адаптивными интервалами."""
+
+    def __init__(self, collector: NewsCollector, news_store: NewsStore,
+                 min_interval_minutes: int = 5, max_interval_minutes: int = 60,
+                 retention_days: int = 14):
+        self.collector = collector
+        self.news_store = news_store
+        self.min_interval = min_interval_minutes * 60
+        self.max_interval = max(max_interval_minutes * 60, self.min_interval)
+
+        # Срок хранения новостей и периодичность очистки хранилища
+        self.retention_days = retention_days
+        self.prune_interval = 3600
+        self._next_prune = 0.0
+
+        self.schedules: Dict[str, SourceSchedule] = {}
+
+        self._task: Optional[asyncio.Task] = None
+
+        # Источники, дозагруженные в фоне после collect_news, тоже попадают в хранилище
+        self.collector.on_late_result = self.ingest
+
+        logger.info(f"Инициализирован фоновый опрос новостей "
+                    f"(интервал {min_interval_minutes}-{max_interval_minutes} минут)")
+
+    @property
+    def is_running(self) -> bool:
+        """Запущен ли фоновый опрос."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Запускает фоновую задачу опроса."""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Фоновый опрос новостей запущен")
+
+    async def stop(self):
+        """Останавливает фоновую задачу опроса."""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Фоновый опрос новостей остановлен")
+
+    def _sync_schedules(self):
+        """Приводит расписания в соответствие с текущим списком источников."""
+        for source_name in self.collector.sources:
+            if source_name not in self.schedules:
+                self.schedules[source_name] = SourceSchedule(source_name, self.min_interval)
+
+        for source_name in list(self.schedules):
+            if source_name not in self.collector.sources:
+                del self.schedules[source_name]
+
+    def _update_interval(self, schedule: SourceSchedule, new_count: int):
+        """Подстраивает интервал источника под частоту появления новых записей."""
+        now = datetime.now()
+
+        if new_count > 0:
+            if schedule.last_new_time:
+                gap = (now - schedule.last_new_time).total_seconds()
+                if schedule.avg_new_gap is None:
+                    schedule.avg_new_gap = gap
+                else:
+                    schedule.avg_new_gap = 0.3 * gap + 0.7 * schedule.avg_new_gap
+            schedule.last_new_time = now
+            schedule.new_items_total += new_count
+
+            # Опрашиваем примерно вдвое чаще, чем появляются новости
+            target = schedule.avg_new_gap / 2 if schedule.avg_new_gap else schedule.interval
+        else:
+            # Новостей нет — постепенно замедляемся
+            target = schedule.interval * 1.5
+
+        schedule.interval = min(self.max_interval, max(self.min_interval, target))
+
+    async def _poll_source(self, schedule: SourceSchedule):
+        """Опрашивает один источник и обновляет его записи в хранилище."""
+        source_name = schedule.source_name
+        url = self.collector.sources.get(source_name)
+        if not url:
+            return
+
+        items = await self.collector._fetch_feed(source_name, url)
+
+        schedule.polls += 1
+        schedule.last_poll_time = datetime.now()
+        new_count = self.ingest(source_name, items)
+
+        self._update_interval(schedule, new_count)
+        schedule.next_poll = time.monotonic() + schedule.interval
+
+        logger.debug(f"Опрос {source_name}: новых {new_count}, "
+                     f"следующий через {schedule.interval / 60:.1f} мин")
+
+    def ingest(self, source_name: str, items: List[NewsItem]) -> int:
+        """Сохраняет записи источника в хранилище и возвращает число новых."""
+        if not items:
+            # При ошибке или пустом ответе в хранилище остаются прежние записи
+            return 0
+        return self.news_store.upsert_many(items)
+
+    async def poll_due(self, force: bool = False):
+        """Опрашивает источники, у которых подошло время (или все при force)."""
+        self._sync_schedules()
+        now = time.monotonic()
+        due = [s for s in self.schedules.values() if force or s.next_poll <= now]
+        if not due:
+            return
+
+        await asyncio.gather(*(self._poll_source(s) for s in due), return_exceptions=True)
+        self.collector.feed_cache.save()
+
+        # Периодически удаляем новости старше срока хранения
+        if time.monotonic() >= self._next_prune:
+            self.news_store.prune(self.retention_days)
+            self._next_prune = time.monotonic() + self.prune_interval
+
+    async def _run(self):
+        """Основной цикл фонового опроса."""
+        while True:
+            try:
+                await self.poll_due()
+            except Exception as e:
+                logger.error(f"Ошибка фонового опроса новостей: {str(e)}")
+
+            if self.schedules:
+                delay = min(s.next_poll for s in self.schedules.values()) - time.monotonic()
+            else:
+                delay = self.min_interval
+            await asyncio.sleep(min(max(delay, 1.0), self.max_interval))
+
+    def get_news_items(self, limit: int = 20) -> List[NewsItem]:
+        """Мгновенно возвращает свежие новости из хранилища (новые первыми)."""
+        return self.news_store.fresh(self.collector.max_age_hours, limit=limit)
+
+    def status(self) -> List[dict]:
+        """Возвращает состояние опроса каждого источника."""
+        now = datetime.now()
+        stats = self.news_store.source_stats(max_age_hours=self.collector.max_age_hours)
+        result = []
+
+        for source_name, schedule in sorted(self.schedules.items()):
+            source_stats = stats.get(source_name, {})
+            freshest = source_stats.get('freshest')
+            result.append({
+                'source': source_name,
+                'interval_minutes': schedule.interval / 60,
+                'last_poll_minutes_ago': (now - schedule.last_poll_time).total_seconds() / 60
+                if schedule.last_poll_time else None,
+                'freshest_minutes_ago': (now - freshest).total_seconds() / 60 if freshest else None,
+                'items': source_stats.get('count', 0),
+                'polls': schedule.polls,
+                'new_items_total': schedule.new_items_total
+            })
+
+        return result
@@ -0,0 +1,222 @@
+"""
+Модуль персистентного хранилища новостей на SQLite.
+Новости хранятся под data/ и переживают перезапуск контейнера.
+Дубликаты отсекаются по хэшу нормализованной ссылки, а выборка
+свежих новостей идет по индексу на дате публикации. При добавлении
+новости ей назначается кластер почти одинаковых заголовков.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from near_duplicates import NearDuplicateIndex
+from news_collector import NewsItem
+
+logger = logging.getLogger('news_store')
+
+# Параметры ссылок, которые не влияют на содержимое страницы
+TRACKING_PARAMS = {'yclid', 'gclid', 'fbclid', 'from', 'ref'}
+
+
+def normalize_link(link: str) -> str:
+    """Нормализует ссылку: схема и хост в нижнем регистре, без якоря и меток."""
+    parts = urlsplit(link.strip())
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def link_hash(link: str) -> str:
+    """Возвращает ключ новости — хэш нормализованной ссылки."""
+    return hashlib.sha1(normalize_link(link).encode('utf-8')).hexdigest()
+
+
+class NewsStore:
+    """Хранилище собранных новостей в SQLite (режим WAL)."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS news (
+            link_hash TEXT PRIMARY KEY,
+            link TEXT NOT NULL,
+            title TEXT NOT NULL,
+            summary TEXT NOT NULL DEFAULT '',
+            published_ts REAL NOT NULL,
+            source TEXT NOT NULL,
+            collected_ts REAL NOT NULL,
+            cluster_id TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_news_published ON news (published_ts);
+        CREATE INDEX IF NOT EXISTS idx_news_source_published ON news (source, published_ts);
+    """
+
+    def __init__(self, path: str = 'data/news.db', dedup_window_days: int = 3):
+        self.path = path
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        self._conn.commit()
+
+        # Индекс почти одинаковых заголовков восстанавливается из недавних новостей
+        self.dedup_window_days = dedup_window_days
+        self.dedup_index = NearDuplicateIndex()
+        self._rebuild_dedup_index()
+
+        logger.info(f"Открыто хранилище новостей {self.path}: {self.count()} записей")
+
+    def _migrate(self):
+        """Добавляет колонки, появившиеся в более новых версиях схемы."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(news)")}
+        if 'cluster_id' not in columns:
+            self._conn.execute("ALTER TABLE news ADD COLUMN cluster_id TEXT")
+
+    def _rebuild_dedup_index(self):
+        """Заполняет индекс дубликатов новостями за последние dedup_window_days."""
+        cutoff = (datetime.now() - timedelta(days=self.dedup_window_days)).timestamp()
+        rows = self._conn.execute(
+            "SELECT link_hash, title, cluster_id FROM news WHERE collected_ts > ? ORDER BY collected_ts",
+            (cutoff,)
+        ).fetchall()
+
+        missing = []
+        for key, title, cluster_id in rows:
+            assigned = self.dedup_index.add(key, title, cluster_id)
+            if cluster_id is None:
+                missing.append((assigned, key))
+
+        if missing:
+            with self._conn:
+                self._conn.executemany("UPDATE news SET cluster_id = ? WHERE link_hash = ?", missing)
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._conn.close()
+
+    def count(self) -> int:
+        """Возвращает общее количество новостей в хранилище."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+    def upsert_many(self, items: List[NewsItem]) -> int:
+        """
+        Добавляет или обновляет новости одной транзакцией.
+
+        Returns:
+            Количество новостей, которых раньше не было в хранилище
+        """
+        rows = {}
+        items_by_key = {}
+        now = datetime.now().timestamp()
+        for item in items:
+            if not item.link or not item.title:
+                continue
+            key = link_hash(item.link)
+            items_by_key[key] = item
+            rows[key] = (
+                key, item.link, item.title, item.summary or '',
+                item.published.timestamp(), item.source, now
+            )
+
+        if not rows:
+            return 0
+
+        with self._lock:
+            placeholders = ','.join('?' * len(rows))
+            existing = {
+                row[0] for row in self._conn.execute(
+                    f"SELECT link_hash FROM news WHERE link_hash IN ({placeholders})", list(rows)
+                )
+            }
+
+            # Новым новостям назначаем кластер почти одинаковых заголовков
+            new_rows = [
+                row + (self.dedup_index.add(key, row[2]),)
+                for key, row in rows.items() if key not in existing
+            ]
+            updated_rows = [row[2:5] + (key,) for key, row in rows.items() if key in existing]
+
+            with self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT INTO news (link_hash, link, title, summary, published_ts, source,
+                                      collected_ts, cluster_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    new_rows
+                )
+                self._conn.executemany(
+                    "UPDATE news SET title = ?, summary = ?, published_ts = ? WHERE link_hash = ?",
+                    updated_rows
+                )
+
+            for key, item in items_by_key.items():
+                item.cluster_id = self.dedup_index.cluster_of(key) or item.cluster_id
+
+        return len(new_rows)
+
+    def fresh(self, max_age_hours: int, limit: int = 20) -> List[NewsItem]:
+        """Возвращает новости не старше max_age_hours (новые первыми)."""
+        cutoff = (datetime.now() - timedelta(hours=max_age_hours)).timestamp()
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT title, summary, link, published_ts, source, cluster_id FROM news
+                WHERE published_ts > ?
+                ORDER BY published_ts DESC
+                LIMIT ?
+                """,
+                (cutoff, limit)
+            ).fetchall()
+
+        return [
+            NewsItem(title=title, summary=summary, link=link,
+                     published=datetime.fromtimestamp(published_ts), source=source,
+                     cluster_id=cluster_id)
+            for title, summary, link, published_ts, source, cluster_id in rows
+        ]
+
+    def source_stats(self, max_age_hours: Optional[int] = None) -> Dict[str, dict]:
+        """Возвращает количество новостей и время самой свежей по каждому источнику."""
+        query = "SELECT source, COUNT(*), MAX(published_ts) FROM news"
+        params = ()
+        if max_age_hours is not None:
+            query += " WHERE published_ts > ?"
+            params = ((datetime.now() - timedelta(hours=max_age_hours)).timestamp(),)
+        query += " GROUP BY source"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return {
+            source: {'count': count, 'freshest': datetime.fromtimestamp(freshest_ts)}
+            for source, count, freshest_ts in rows
+        }
+
+    def prune(self, retention_days: int) -> int:
+        """Удаляет новости старше срока хранения и возвращает их количество."""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).timestamp()
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM news WHERE published_ts < ?", (cutoff,)
+                ).rowcount
+
+        if deleted:
+            logger.info(f"Удалено {deleted} новостей старше {retention_days} дней")
+        return deleted
@@ -0,0 +1,281 @@
+"""
+Модуль буфера заранее сгенерированных постов.
+Фоновый производитель готовит несколько следующих постов до наступления
+слота публикации и сохраняет их на диск вместе с новостями, на которых они
+основаны. Перед отправкой пост проверяется на свежесть и при необходимости
+генерируется заново, поэтому публикация по расписанию не ждет DeepSeek.
+Посты готовятся только к слотам расписания, до которых осталось меньше
+max_age_minutes: иначе они устареют раньше, чем будут опубликованы.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from news_collector import NewsItem
+
+logger = logging.getLogger('post_buffer')
+
+# Как часто производитель проверяет буфер, если его не разбудили
+REFILL_CHECK_SECONDS = 60
+
+# Пауза после неудачной генерации (API или новости недоступны)
+REFILL_RETRY_SECONDS = 300
+
+# Запас до предельного возраста: пост к слоту готовится не раньше, чем за
+# max_age_minutes минус этот запас, чтобы не устареть к моменту отправки
+SLOT_MARGIN_SECONDS = 600
+
+# Функция расписания: по числу слотов возвращает время ближайших публикаций (timestamp)
+SlotProvider = Callable[[int], List[float]]
+
+
+class BufferedPost:
+    """Готовый пост и снимок новостей, на которых он основан."""
+
+    def __init__(self, text: str, prompt: str, items: List, created_at: Optional[float] = None,
+                 commentary: Optional[str] = None):
+        self.text = text
+        self.prompt = prompt
+        # Комментарий LLM (None — пост только из заголовков)
+        self.commentary = commentary
+        # Новости поста (NewsItem) или заголовки-строки, если новость не найдена
+        self.items = items
+        self.created_at = created_at if created_at is not None else time.time()
+
+    @property
+    def headlines(self) -> List[str]:
+        return [item if isinstance(item, str) else item.title for item in self.items]
+
+    @property
+    def age_minutes(self) -> float:
+        return (time.time() - self.created_at) / 60
+
+    def to_dict(self) -> dict:
+        return {
+            'text': self.text,
+            'prompt': self.prompt,
+            'items': [{'title': item} if isinstance(item, str) else item.to_dict() for item in self.items],
+            'created_at': self.created_at,
+            'commentary': self.commentary
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BufferedPost':
+        items = [
+            NewsItem.from_dict(item) if 'published' in item else item['title']
+            for item in data.get('items', [])
+        ]
+        return cls(data['text'], data.get('prompt', ''), items, data.get('created_at'), data.get('commentary'))
+
+
+class PostBuffer:
+    """Очередь готовых постов с фоновым пополнением."""
+
+    def __init__(self, deepseek_client, path: str = 'data/post_buffer.json',
+                 size: int = 2, max_age_minutes: float = 120,
+                 next_slots: Optional[SlotProvider] = None):
+        self.client = deepseek_client
+        self.path = path
+        self.size = size
+        self.max_age_minutes = max_age_minutes
+        # Без расписания буфер всегда держит size постов
+        self.next_slots = next_slots
+
+        self.posts: 'deque[BufferedPost]' = deque()
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0}
+
+        # Одна генерация за раз: публикация по требованию дожидается
+        # поста, который производитель уже генерирует, а не выбирает те же новости
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def memory(self):
+        return getattr(self.client, 'published_memory', None)
+
+    def _load(self):
+        """Загружает сохраненные посты и резервирует их новости."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.posts = deque(BufferedPost.from_dict(post) for post in data.get('posts', []))
+            if self.memory:
+                for post in self.posts:
+                    self.memory.reserve(post.items)
+            logger.info(f"Загружено {len(self.posts)} готовых постов из {self.path}")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки буфера постов {self.path}: {str(e)}")
+
+    def save(self):
+        """Атомарно сохраняет буфер на диск."""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'posts': [post.to_dict() for post in self.posts]}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения буфера постов {self.path}: {str(e)}")
+
+    def stale_reason(self, post: BufferedPost) -> Optional[str]:
+        """Возвращает причину, по которой пост устарел, или None для свежего поста."""
+        if post.age_minutes > self.max_age_minutes:
+            return f"сгенерирован {post.age_minutes:.0f} мин назад"
+        if self.memory:
+            published = [item for item in post.items if self.memory.contains(item, include_reserved=False)]
+            if published:
+                return f"{len(published)} новостей уже опубликованы"
+        return None
+
+    def _drop_stale(self) -> int:
+        """Убирает из буфера устаревшие посты и освобождает их новости."""
+        fresh = deque()
+        for post in self.posts:
+            reason = self.stale_reason(post)
+            if reason:
+                logger.info(f"Готовый пост устарел: {reason}")
+                self.stats['stale'] += 1
+                if self.memory:
+                    self.memory.release(post.items)
+            else:
+                fresh.append(post)
+        dropped = len(self.posts) - len(fresh)
+        self.posts = fresh
+        return dropped
+
+    def due_posts(self) -> int:
+        """Сколько постов нужно держать готовыми сейчас (по ближайшим слотам расписания)."""
+        if self.next_slots is None:
+            return self.size
+        horizon = time.time() + max(self.max_age_minutes * 60 - SLOT_MARGIN_SECONDS, 0)
+        return sum(1 for slot in self.next_slots(self.size) if slot <= horizon)
+
+    def _pop_fresh(self) -> Optional[BufferedPost]:
+        """Достает первый свежий пост из буфера."""
+        if self._drop_stale():
+            self.save()
+        if not self.posts:
+            return None
+        post = self.posts.popleft()
+        if self.memory:
+            self.memory.release(post.items)
+        self.save()
+        return post
+
+    async def _generate(self, command: str) -> Optional[BufferedPost]:
+        """Генерирует пост и запоминает новости, на которых он основан."""
+        start = time.perf_counter()
+        headlines_section, commentary, prompt, headlines = await self.client.generate_hybrid_parts(command=command)
+        if not headlines_section:
+            return None
+        post = BufferedPost(self.client.compose_post(headlines_section, commentary), prompt,
+                            self.client.selected_items(headlines), commentary=commentary)
+        logger.info(f"Пост сгенерирован за {time.perf_counter() - start:.1f} с")
+        return post
+
+    async def take(self, command: str = 'publish') -> Optional[BufferedPost]:
+        """
+        Возвращает пост для немедленной публикации.
+
+        Свежий пост из буфера отдается сразу; если буфер пуст или все посты
+        устарели, пост генерируется на месте (запросы учитываются под command).
+        Производитель будится, чтобы восполнить буфер к следующему слоту.
+        """
+        post = self._pop_fresh()
+        if post is None:
+            async with self._lock:
+                post = self._pop_fresh()
+                if post is None:
+                    self.stats['misses'] += 1
+                    logger.info("Готовых постов нет, генерируем на месте")
+                    post = await self._generate(command)
+                else:
+                    self.stats['hits'] += 1
+        else:
+            self.stats['hits'] += 1
+        self._wake.set()
+        return post
+
+    def put_back(self, post: BufferedPost):
+        """Возвращает в начало буфера пост, который не удалось отправить."""
+        if self.memory:
+            self.memory.reserve(post.items)
+        self.posts.appendleft(post)
+        self.save()
+        logger.info("Неотправленный пост возвращен в буфер")
+
+    async def fill(self) -> int:
+        """
+        Догенерирует посты к ближайшим слотам расписания (не больше размера буфера).
+
+        Returns:
+            Количество новых постов
+        """
+        added = 0
+        while len(self.posts) < self.due_posts():
+            async with self._lock:
+                if len(self.posts) >= self.due_posts():
+                    break
+                post = await self._generate('buffer')
+                if post is None:
+                    break
+                # Новости поста не попадут в следующие посты буфера
+                if self.memory:
+                    self.memory.reserve(post.items)
+                self.posts.append(post)
+                self.save()
+                added += 1
+        if added:
+            logger.info(f"В буфере {len(self.posts)} из {self.size} готовых постов")
+        return added
+
+    async def start(self):
+        """Загружает буфер с диска и запускает фоновое пополнение."""
+        if self._task and not self._task.done():
+            return
+        await asyncio.to_thread(self._load)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновое пополнение."""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        """Держит буфер заполненным свежими постами."""
+        while True:
+            timeout = REFILL_CHECK_SECONDS
+            try:
+                if self._drop_stale():
+                    self.save()
+                await self.fill()
+                if len(self.posts) < self.due_posts():
+                    timeout = REFILL_RETRY_SECONDS
+            except Exception as e:
+                logger.error(f"Ошибка пополнения буфера постов: {str(e)}")
+                timeout = REFILL_RETRY_SECONDS
+
+            # asyncio.wait, а не wait_for: отмена не теряется, если событие
+            # выставлено одновременно с остановкой
+            self._wake.clear()
+            waiter = asyncio.ensure_future(self._wake.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=timeout)
+            finally:
+                waiter.cancel()
@@ -0,0 +1,121 @@
+"""
+Модуль локального ранжирования вариантов комментария.
+Несколько вариантов, сгенерированных параллельно, оцениваются дешевыми
+проверками без обращения к API: длина, пересказ заголовков, повторы,
+запрещенное форматирование и сходство с недавними постами. Публикуется
+вариант с наименьшим штрафом.
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from text_normalizer import normalize_text
+
+logger = logging.getLogger('post_ranker')
+
+# Допустимая длина комментария (символы)
+MIN_COMMENTARY_CHARS = 200
+MAX_COMMENTARY_CHARS = 700
+
+# Доля слов комментария из заголовков, которая еще не считается пересказом
+MAX_HEADLINE_OVERLAP = 0.3
+
+# Форматирование, которого не должно быть в комментарии: HTML, Markdown, списки
+BANNED_FORMATTING_RE = re.compile(r'</?[a-zA-Z][^>]*>|\*\*|__|`|^\s*#|^\s*[•*-]\s', re.MULTILINE)
+EMOJI_RE = re.compile('[\U0001F300-\U0001FAFF☀-➿]')
+
+# Веса штрафов
+PENALTY_WEIGHTS = {
+    'length': 2.0,
+    'headline_overlap': 2.0,
+    'repetition': 1.5,
+    'formatting': 3.0,
+    'recent_similarity': 2.0
+}
+
+
+class RankedCandidate:
+    """Вариант комментария со штрафами по каждой проверке."""
+
+    __slots__ = ('text', 'penalties', 'total')
+
+    def __init__(self, text: str, penalties: Dict[str, float]):
+        self.text = text
+        self.penalties = penalties
+        self.total = sum(PENALTY_WEIGHTS[name] * value for name, value in penalties.items())
+
+    def __repr__(self):
+        details = ', '.join(f"{name}={value:.2f}" for name, value in self.penalties.items() if value)
+        return f"RankedCandidate(total={self.total:.2f}, {details or 'без штрафов'})"
+
+
+def jaccard(first: set, second: set) -> float:
+    """Коэффициент Жаккара двух множеств."""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class CandidateRanker:
+    """Выбирает лучший из нескольких вариантов комментария."""
+
+    def __init__(self, min_chars: int = MIN_COMMENTARY_CHARS, max_chars: int = MAX_COMMENTARY_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+
+    def _length_penalty(self, text: str) -> float:
+        if len(text) < self.min_chars:
+            return (self.min_chars - len(text)) / self.min_chars
+        if len(text) > self.max_chars:
+            return (len(text) - self.max_chars) / self.max_chars
+        return 0.0
+
+    def score(self, text: str, headline_stems: set, recent_stems: Sequence[set]) -> RankedCandidate:
+        """Оценивает один вариант комментария."""
+        stems = normalize_text(text)
+        unique = set(stems)
+
+        overlap = len(unique & headline_stems) / len(unique) if unique else 0.0
+        penalties = {
+            'length': self._length_penalty(text),
+            # Пересказ заголовков вместо комментария
+            'headline_overlap': max(0.0, overlap - MAX_HEADLINE_OVERLAP),
+            # Доля повторяющихся слов
+            'repetition': 1.0 - len(unique) / len(stems) if stems else 1.0,
+            'formatting': float(len(BANNED_FORMATTING_RE.findall(text)) + len(EMOJI_RE.findall(text))),
+            'recent_similarity': max((jaccard(unique, recent) for recent in recent_stems), default=0.0)
+        }
+        return RankedCandidate(text, penalties)
+
+    def rank(self, candidates: Iterable[str], headlines: Iterable[str],
+             recent_posts: Iterable[str] = ()) -> List[RankedCandidate]:
+        """
+        Оценивает варианты и сортирует их от лучшего к худшему.
+
+        Args:
+            candidates: Варианты комментария
+            headlines: Заголовки новостей поста
+            recent_posts: Комментарии недавно опубликованных постов
+        """
+        headline_stems = set()
+        for headline in headlines:
+            headline_stems.update(normalize_text(headline))
+        recent_stems = [set(normalize_text(post)) for post in recent_posts]
+
+        ranked = [self.score(text, headline_stems, recent_stems) for text in candidates if text]
+        ranked.sort(key=lambda candidate: candidate.total)
+        return ranked
+
+    def best(self, candidates: Iterable[str], headlines: Iterable[str],
+             recent_posts: Iterable[str] = ()) -> Optional[str]:
+        """Возвращает лучший вариант комментария или None, если вариантов нет."""
+        ranked = self.rank(candidates, headlines, recent_posts)
+        if not ranked:
+            return None
+        if len(ranked) > 1:
+            logger.info(
+                f"Выбран вариант комментария из {len(ranked)}: {ranked[0]!r}; "
+                f"худший: {ranked[-1]!r}"
+            )
+        return ranked[0].text
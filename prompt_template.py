@@ -1,14 +1,53 @@
 """
-Этот файл содержит шаблон промпта для генерации постов с помощью DeepSeek API.
-Вы можете изменить его в соответствии с вашими потребностями.
+Этот файл содержит шаблоны промптов для генерации постов с помощью DeepSeek API.
+Вы можете изменить их в соответствии с вашими потребностями.
+
+Каждый шаблон состоит из неизменной системной части (инструкции и стиль)
+и переменной части с новостями. Системная часть идет первой и совпадает
+байт в байт между запросами, поэтому DeepSeek берет ее из кэша контекста:
+такие токены дешевле и обрабатываются быстрее.
 """
 
 import random
+import string
+from typing import Dict, List
 
-# Шаблон для генерации постов
-DEEPSEEK_PROMPT = """
-Вот 5 актуальных новостей:
-{headlines}
+
+class PromptTemplate:
+    """Шаблон промпта, разобранный один раз: статический префикс и подстановки."""
+
+    def __init__(self, system: str, user: str):
+        self.system = system.strip()
+        self.user = user.strip()
+
+        # Разбор шаблона при создании, а не при каждом запросе
+        self._parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(self.user):
+            if spec or conversion:
+                raise ValueError(f"Форматирование поля {field!r} в шаблоне промпта не поддерживается")
+            self._parts.append((literal, field))
+        self.fields = {field for _, field in self._parts if field}
+
+    def render(self, **values) -> str:
+        """Заполняет переменную часть шаблона."""
+        return ''.join(literal + (str(values[field]) if field else '') for literal, field in self._parts)
+
+    def messages(self, **values) -> List[Dict[str, str]]:
+        """Сообщения для API: системный префикс, затем переменная часть."""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.render(**values)}
+        ]
+
+
+def messages_text(messages: List[Dict[str, str]]) -> str:
+    """Текст сообщений одной строкой (для отладки и оценки токенов)."""
+    return "\n\n".join(message["content"] for message in messages)
+
+
+# Инструкции для генерации полного поста
+DEEPSEEK_SYSTEM_PROMPT = """
+Тебе присылают 5 актуальных новостей.
 
 Создай краткое философско-психологическое осмысление этих новостей.
 
@@ -47,6 +86,42 @@ DEEPSEEK_PROMPT = """
 Помни: канал без комментариев. Цель — дать пищу для размышлений, а не начать дискуссию.
 """
 
+# Шаблон для генерации постов
+DEEPSEEK_PROMPT = PromptTemplate(
+    system=DEEPSEEK_SYSTEM_PROMPT,
+    user="""
+Вот 5 актуальных новостей:
+{headlines}
+"""
+)
+
+# Шаблон комментария гибридного поста (заголовки форматируются кодом)
+HYBRID_PROMPT = PromptTemplate(
+    system="""
+Тебе присылают 5 новостей и вопрос к ним.
+В 2-3 предложениях (максимум 600 символов) найди общую нить между этими событиями и ответь на вопрос.
+НЕ ПОВТОРЯЙ заголовки, БЕЗ форматирования, КРАТКО.
+""",
+    user="""
+Вот 5 новостей:
+{headlines}
+
+{question}
+"""
+)
+
+# Шаблон комментария в экономном режиме (бюджет почти израсходован)
+ECONOMY_PROMPT = PromptTemplate(
+    system="""
+Тебе присылают 5 новостей.
+Одной-двумя фразами (до 300 символов) найди общую нить. БЕЗ форматирования.
+""",
+    user="""
+Вот 5 новостей:
+{headlines}
+"""
+)
+
 # Диапазоны параметров для API запроса
 DEEPSEEK_API_PARAM_RANGES = {
     "temperature": (0.7, 1.0),        # Диапазон температуры для разнообразия
@@ -59,5 +134,5 @@ DEEPSEEK_API_PARAM_RANGES = {
 DEEPSEEK_API_PARAMS = {
     "model": "deepseek-chat",  # Можно заменить на другую модель DeepSeek
     "max_tokens": 180,         # Достаточно для 600-700 символов комментария
-    "stream": False,           # Не использовать потоковую передачу для ответа
+    "stream": True,            # Потоковая передача (см. DEEPSEEK_STREAMING)
 }
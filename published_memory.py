@@ -0,0 +1,202 @@
+"""
+Модуль памяти опубликованных новостей.
+Хранит хэши уже опубликованных новостей, чтобы они не повторялись
+в соседних постах: точное множество за последние дни и фильтр Блума
+для длинной истории. Оба ограничены по размеру, поэтому проверка
+остается O(1) и после месяцев работы бота.
+В фильтр Блума попадают только ссылки: кластер почти одинаковых
+заголовков и заголовок помнятся лишь в окне последних дней, иначе новый
+сюжет того же кластера или повторяющийся заголовок ('Курс доллара на
+завтра') блокировался бы на все время жизни фильтра.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Iterable, List, Optional
+
+from near_duplicates import normalize_headline
+from news_store import link_hash
+
+logger = logging.getLogger('published_memory')
+
+# Сколько текстов последних постов помнить
+RECENT_POSTS = 20
+
+# Префикс ключей, которые хранятся и в фильтре Блума
+LONG_TERM_PREFIX = 'link:'
+
+
+class BloomFilter:
+    """Фильтр Блума фиксированного размера (двойное хэширование blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None and len(bits) == (self.num_bits + 7) // 8 \
+            else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def to_dict(self) -> dict:
+        return {'bits': base64.b64encode(bytes(self.bits)).decode('ascii'), 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data: dict, capacity: int, error_rate: float) -> 'BloomFilter':
+        return cls(capacity, error_rate, bytearray(base64.b64decode(data['bits'])), data.get('count', 0))
+
+
+class PublishedMemory:
+    """Память опубликованных новостей: недавние — точно, давние — фильтром Блума."""
+
+    def __init__(self, path: str = 'data/published_news.json', recent_days: int = 7,
+                 max_recent: int = 5000, bloom_capacity: int = 100000, error_rate: float = 0.01):
+        self.path = path
+        self.recent_ttl = recent_days * 86400
+        self.max_recent = max_recent
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+
+        # ключ -> время публикации (time.time()), старые первыми
+        self.recent: 'OrderedDict[str, float]' = OrderedDict()
+        # Два поколения фильтра: при заполнении текущего самое старое отбрасывается
+        self.bloom = BloomFilter(bloom_capacity, error_rate)
+        self.previous_bloom: Optional[BloomFilter] = None
+
+        # Новости заранее сгенерированных, но еще не отправленных постов
+        # (ключ -> число постов); в файл не сохраняются
+        self.reserved: Counter = Counter()
+
+        # Комментарии последних постов (для проверки, что новый пост не повторяет их)
+        self.recent_posts: deque = deque(maxlen=RECENT_POSTS)
+
+        self._load()
+
+    @staticmethod
+    def item_keys(item) -> List[str]:
+        """Ключи новости: ссылка, кластер почти одинаковых заголовков и заголовок."""
+        keys = []
+        link = getattr(item, 'link', None)
+        if link:
+            keys.append(f"link:{link_hash(link)}")
+        cluster_id = getattr(item, 'cluster_id', None)
+        if cluster_id:
+            keys.append(f"cluster:{cluster_id}")
+        title = item if isinstance(item, str) else item.title
+        keys.append("title:" + hashlib.sha1(normalize_headline(title).encode('utf-8')).hexdigest())
+        return keys
+
+    def _load(self):
+        """Загружает память с диска."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.recent = OrderedDict(sorted(data.get('recent', {}).items(), key=lambda kv: kv[1]))
+            if data.get('bloom'):
+                self.bloom = BloomFilter.from_dict(data['bloom'], self.bloom_capacity, self.error_rate)
+            if data.get('previous_bloom'):
+                self.previous_bloom = BloomFilter.from_dict(
+                    data['previous_bloom'], self.bloom_capacity, self.error_rate
+                )
+            self.recent_posts.extend(data.get('recent_posts', []))
+            self._expire()
+            logger.info(f"Загружена память публикаций: {len(self.recent)} недавних ключей")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки памяти публикаций {self.path}: {str(e)}")
+
+    def save(self):
+        """Атомарно сохраняет память на диск."""
+        data = {
+            'recent': dict(self.recent),
+            'bloom': self.bloom.to_dict(),
+            'previous_bloom': self.previous_bloom.to_dict() if self.previous_bloom else None,
+            'recent_posts': list(self.recent_posts)
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _expire(self):
+        """Удаляет из точного множества ключи старше окна и сверх лимита."""
+        cutoff = time.time() - self.recent_ttl
+        while self.recent:
+            key, published = next(iter(self.recent.items()))
+            if published >= cutoff and len(self.recent) <= self.max_recent:
+                break
+            self.recent.popitem(last=False)
+
+    def reserve(self, items: Iterable):
+        """Резервирует новости готового поста, чтобы следующие посты их не повторяли."""
+        for item in items:
+            self.reserved.update(self.item_keys(item))
+
+    def release(self, items: Iterable):
+        """Снимает резерв с новостей поста (пост отправлен или отброшен)."""
+        for item in items:
+            self.reserved.subtract(self.item_keys(item))
+        self.reserved = +self.reserved
+
+    def contains(self, item, include_reserved: bool = True) -> bool:
+        """Проверяет, публиковалась ли (или зарезервирована ли) новость или заголовок-строка."""
+        for key in self.item_keys(item):
+            if include_reserved and key in self.reserved:
+                return True
+            if key in self.recent:
+                return True
+            if not key.startswith(LONG_TERM_PREFIX):
+                continue
+            if key in self.bloom or (self.previous_bloom is not None and key in self.previous_bloom):
+                return True
+        return False
+
+    def mark_published(self, items: Iterable, commentary: Optional[str] = None):
+        """Запоминает опубликованные новости (и комментарий поста) и сохраняет память."""
+        if commentary:
+            self.recent_posts.append(commentary)
+        now = time.time()
+        count = 0
+        for item in items:
+            for key in self.item_keys(item):
+                self.recent[key] = now
+                self.recent.move_to_end(key)
+                if key.startswith(LONG_TERM_PREFIX) and key not in self.bloom:
+                    if self.bloom.is_full:
+                        self.previous_bloom = self.bloom
+                        self.bloom = BloomFilter(self.bloom_capacity, self.error_rate)
+                    self.bloom.add(key)
+            count += 1
+
+        self._expire()
+        self.save()
+        logger.info(f"Отмечено опубликованными {count} новостей")
@@ -0,0 +1,149 @@
+"""
+Модуль оценки релевантности заголовков по TF-IDF.
+Основы слов заголовка хэшируются в фиксированное пространство признаков,
+документные частоты накапливаются инкрементально по новостям из хранилища,
+а все кандидаты оцениваются одним векторизованным проходом NumPy против
+взвешенного профиля тем (позитивные ключевые слова и тематические профили).
+"""
+
+import logging
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from text_normalizer import normalize_text
+
+logger = logging.getLogger('relevance_scorer')
+
+# Размер пространства признаков (hashing trick)
+FEATURE_BITS = 18
+NUM_FEATURES = 1 << FEATURE_BITS
+
+# Сколько уже учтенных в частотах новостей помнить, чтобы не считать их дважды
+MAX_SEEN_DOCUMENTS = 50000
+
+# Тематические профили: основной вес темы и ее дополнительные слова.
+# Позитивные ключевые слова из фильтров входят в профиль с весом 1.
+DEFAULT_TOPIC_PROFILES = {
+    'наука': (1.5, ['ученые', 'исследование', 'открытие', 'телескоп', 'физика', 'биология',
+                    'генетика', 'астрономия', 'галактика', 'эксперимент']),
+    'технологии': (1.3, ['технология', 'стартап', 'нейросеть', 'робот', 'программирование',
+                         'ии', 'искусственный интеллект', 'разработка']),
+    'культура': (1.2, ['выставка', 'музей', 'театр', 'фестиваль', 'премьера', 'книга']),
+    'здоровье': (1.2, ['медицина', 'лечение', 'здоровье', 'вакцина', 'врачи'])
+}
+
+
+@lru_cache(maxsize=100000)
+def feature_index(term: str) -> int:
+    """Возвращает индекс признака для основы слова."""
+    return zlib.crc32(term.encode('utf-8')) & (NUM_FEATURES - 1)
+
+
+def term_ids(stems: Sequence[str]) -> np.ndarray:
+    """Возвращает отсортированные уникальные индексы признаков заголовка."""
+    return np.unique(np.fromiter((feature_index(s) for s in stems), dtype=np.int64, count=len(stems)))
+
+
+class RelevanceScorer:
+    """TF-IDF оценка заголовков против взвешенного профиля тем."""
+
+    def __init__(self, positive_keywords: Iterable[str] = (),
+                 topic_profiles: Optional[Dict[str, Tuple[float, List[str]]]] = None):
+        # Документные частоты признаков и число учтенных документов
+        self.doc_freq = np.zeros(NUM_FEATURES, dtype=np.float32)
+        self.num_docs = 0
+        self._seen: 'OrderedDict[str, None]' = OrderedDict()
+
+        # Индексы признаков по заголовку (заголовки повторяются между циклами)
+        self._ids_cache: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+
+        self.profile = np.zeros(NUM_FEATURES, dtype=np.float32)
+        self.set_profile(positive_keywords, topic_profiles)
+
+    def set_profile(self, positive_keywords: Iterable[str],
+                    topic_profiles: Optional[Dict[str, Tuple[float, List[str]]]] = None):
+        """Собирает плотный вектор весов профиля из ключевых слов и тем."""
+        if topic_profiles is None:
+            topic_profiles = DEFAULT_TOPIC_PROFILES
+
+        profile = np.zeros(NUM_FEATURES, dtype=np.float32)
+        weighted = [(1.0, list(positive_keywords))] + list(topic_profiles.values())
+        for weight, keywords in weighted:
+            for keyword in keywords:
+                for term in normalize_text(keyword):
+                    index = feature_index(term)
+                    profile[index] = max(profile[index], weight)
+
+        # Подмена одним присваиванием: идущая оценка видит целый профиль
+        self.profile = profile
+
+    def _ids(self, item) -> np.ndarray:
+        """Индексы признаков заголовка новости (с кэшем)."""
+        title = item.title
+        ids = self._ids_cache.get(title)
+        if ids is None:
+            stems = getattr(item, 'title_stems', None)
+            ids = term_ids(stems if stems is not None else normalize_text(title))
+            self._ids_cache[title] = ids
+            if len(self._ids_cache) > MAX_SEEN_DOCUMENTS:
+                self._ids_cache.popitem(last=False)
+        return ids
+
+    def partial_fit(self, items: Sequence) -> int:
+        """
+        Добавляет новости в документные частоты.
+
+        Новости, которые уже учитывались (по ссылке или заголовку), пропускаются.
+        Returns:
+            Количество новых учтенных новостей
+        """
+        batch = []
+        for item in items:
+            key = getattr(item, 'link', None) or item.title
+            if key in self._seen:
+                continue
+            self._seen[key] = None
+            if len(self._seen) > MAX_SEEN_DOCUMENTS:
+                self._seen.popitem(last=False)
+            batch.append(self._ids(item))
+
+        if batch:
+            np.add.at(self.doc_freq, np.concatenate(batch), 1.0)
+            self.num_docs += len(batch)
+        return len(batch)
+
+    def idf(self) -> np.ndarray:
+        """Сглаженный IDF по накопленным частотам."""
+        return np.log((1.0 + self.num_docs) / (1.0 + self.doc_freq)) + 1.0
+
+    def score(self, items: Sequence) -> np.ndarray:
+        """
+        Оценивает все новости одним проходом.
+
+        Строит разреженную матрицу TF-IDF с бинарной TF в виде плоских массивов
+        (строка, признак, вес), нормирует строки и умножает на вектор профиля.
+        """
+        if not items:
+            return np.zeros(0, dtype=np.float32)
+
+        # Частоты дополняются кандидатами, которых хранилище еще не видело
+        self.partial_fit(items)
+
+        rows = [self._ids(item) for item in items]
+        lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        indices = np.concatenate(rows) if lengths.sum() else np.zeros(0, dtype=np.int64)
+        row_of = np.repeat(np.arange(len(rows)), lengths)
+
+        data = self.idf()[indices]
+        norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(rows)))
+        raw = np.bincount(row_of, weights=data * self.profile[indices], minlength=len(rows))
+
+        return np.divide(raw, norms, out=np.zeros(len(rows)), where=norms > 0)
+
+    def __call__(self, items: Sequence) -> List[float]:
+        """Интерфейс функции ранжирования для SelectionEngine."""
+        return self.score(items).tolist()
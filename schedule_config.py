@@ -2,6 +2,9 @@
 Конфигурация расписания для автоматической публикации постов.
 """
 
+from datetime import datetime, timedelta
+from typing import List
+
 # Настройки расписания публикаций
 SCHEDULE_CONFIG = {
     # Включить или выключить автоматические публикации
@@ -29,3 +32,45 @@ SCHEDULE_CONFIG = {
     # Если указано, настройки interval_minutes, start_time и end_time игнорируются
     "specific_times": None
 }
+
+
+def upcoming_publication_times(now: datetime, count: int, config: dict = SCHEDULE_CONFIG) -> List[datetime]:
+    """
+    Возвращает ближайшие времена публикаций по расписанию (позже now).
+
+    Args:
+        now: Текущее время (в часовом поясе бота)
+        count: Сколько ближайших публикаций вернуть
+    """
+    if not config["enabled"] or count <= 0:
+        return []
+
+    times = []
+    # Неделя вперед покрывает любой набор дней публикаций
+    for days in range(8):
+        day = now + timedelta(days=days)
+        if day.weekday() not in config["days_of_week"]:
+            continue
+
+        if config["specific_times"]:
+            day_times = [
+                day.replace(hour=t["hour"], minute=t["minute"], second=0, microsecond=0)
+                for t in sorted(config["specific_times"], key=lambda t: (t["hour"], t["minute"]))
+            ]
+        else:
+            start = day.replace(hour=config["start_time"]["hour"], minute=config["start_time"]["minute"],
+                                second=0, microsecond=0)
+            end = day.replace(hour=config["end_time"]["hour"], minute=config["end_time"]["minute"],
+                              second=0, microsecond=0)
+            day_times = []
+            slot = start
+            while slot <= end:
+                day_times.append(slot)
+                slot += timedelta(minutes=config["interval_minutes"])
+
+        for slot in day_times:
+            if slot > now:
+                times.append(slot)
+                if len(times) >= count:
+                    return times
+    return times
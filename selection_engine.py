@@ -0,0 +1,277 @@
+"""
+Модуль отбора новостей для поста.
+Заголовки классифицируются за один проход (реклама, военные, позитивные,
+нейтральные), затем отбор идет по рангу с учетом квот: не больше
+max_per_source новостей от источника, max_per_topic новостей одной темы
+и positive_slots позитивных.
+Вся бухгалтерия — на словарях и множествах, поэтому отбор остается
+линейным и при тысячах кандидатов.
+"""
+
+import logging
+import random
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from keyword_matcher import KeywordMatcher
+from text_normalizer import normalize_text
+
+logger = logging.getLogger('selection_engine')
+
+SKIP = 'skip'
+MILITARY = 'military'
+POSITIVE = 'positive'
+NEUTRAL = 'neutral'
+
+# Сколько вердиктов классификации хранится между циклами генерации
+VERDICT_CACHE_SIZE = 20000
+
+# Функция ранжирования: по списку новостей возвращает их оценки (больше — лучше)
+Scorer = Callable[[Sequence], List[float]]
+
+# Функция тематической кластеризации: по списку новостей возвращает номера тем
+# (-1 — новость вне известных тем и квотой тем не ограничивается)
+TopicAssigner = Callable[[Sequence], List[int]]
+
+
+class SelectionRules:
+    """Квоты отбора новостей."""
+
+    def __init__(self, max_per_source: Optional[int] = 2, positive_slots: Optional[int] = None,
+                 max_per_topic: Optional[int] = None, min_title_length: int = 20):
+        # None — без ограничения
+        self.max_per_source = max_per_source
+        self.positive_slots = positive_slots
+        self.max_per_topic = max_per_topic
+        self.min_title_length = min_title_length
+
+
+class HeadlineItem:
+    """Заголовок-строка в виде новости без источника (для отбора строк)."""
+
+    __slots__ = ('title',)
+
+    def __init__(self, title: str):
+        self.title = title
+
+    source = None
+
+
+class Candidate:
+    """Новость, прошедшая фильтры, с категорией и оценкой."""
+
+    __slots__ = ('item', 'category', 'keywords', 'score', 'topic')
+
+    def __init__(self, item, category: str, keywords: Dict[str, List[str]], score: float = 0.0):
+        self.item = item
+        self.category = category
+        self.keywords = keywords
+        self.score = score
+        self.topic = -1
+
+
+class SelectionResult:
+    """Итог отбора и статистика для логов."""
+
+    def __init__(self, selected: List, candidates: List[Candidate], military_filtered: int,
+                 skipped: int, source_count: Dict[str, int]):
+        self.selected = selected
+        self.candidates = candidates
+        self.military_filtered = military_filtered
+        self.skipped = skipped
+        self.source_count = source_count
+        # Количество отобранных новостей по категориям
+        self.selected_counts: Dict[str, int] = {}
+
+
+class SelectionEngine:
+    """Однопроходный отбор новостей с ранжированием и квотами."""
+
+    def __init__(self, matcher: KeywordMatcher, scorer: Optional[Scorer] = None,
+                 topic_assigner: Optional[TopicAssigner] = None, seed: Optional[int] = None):
+        self.matcher = matcher
+        self.scorer = scorer
+        self.topic_assigner = topic_assigner
+        # Собственный генератор, чтобы тесты могли зафиксировать seed
+        self.random = random.Random(seed)
+
+        # (ссылка, заголовок) -> (категория, найденные ключевые слова);
+        # действителен, пока не изменились списки ключевых слов
+        self._verdicts: 'OrderedDict[Tuple[str, str], Tuple[str, Dict[str, List[str]]]]' = OrderedDict()
+        self._verdicts_fingerprint = matcher.fingerprint
+        self.verdict_hits = 0
+        self.verdict_misses = 0
+
+    def _title_stems(self, item):
+        """Основы заголовка: берутся из новости, если уже посчитаны."""
+        stems = getattr(item, 'title_stems', None)
+        return stems if stems is not None else normalize_text(item.title)
+
+    def verdict(self, item, matcher: Optional[KeywordMatcher] = None) -> Tuple[str, Dict[str, List[str]]]:
+        """Возвращает категорию новости и найденные ключевые слова (с кэшем)."""
+        matcher = matcher or self.matcher
+        if self._verdicts_fingerprint != matcher.fingerprint:
+            # Списки ключевых слов изменились — старые вердикты недействительны
+            self._verdicts.clear()
+            self._verdicts_fingerprint = matcher.fingerprint
+
+        key = (getattr(item, 'link', None) or '', item.title)
+        cached = self._verdicts.get(key)
+        if cached is not None:
+            self._verdicts.move_to_end(key)
+            self.verdict_hits += 1
+            return cached
+        self.verdict_misses += 1
+
+        matches = matcher.match(self._title_stems(item))
+        for category in (SKIP, MILITARY, POSITIVE):
+            if category in matches:
+                break
+        else:
+            category = NEUTRAL
+
+        verdict = (category, matches)
+        self._verdicts[key] = verdict
+        if len(self._verdicts) > VERDICT_CACHE_SIZE:
+            self._verdicts.popitem(last=False)
+        return verdict
+
+    def verdict_cache_info(self) -> dict:
+        """Возвращает статистику кэша вердиктов классификации."""
+        return {
+            'hits': self.verdict_hits,
+            'misses': self.verdict_misses,
+            'size': len(self._verdicts)
+        }
+
+    def classify(self, items: Sequence, rules: SelectionRules) -> SelectionResult:
+        """
+        Классифицирует новости за один проход и отбрасывает рекламу и военные.
+
+        Вердикты кэшируются, поэтому при повторном отборе из тех же новостей
+        (кэш новостей клиента) ключевые слова заново не ищутся.
+        """
+        # Весь отбор идет по одному снимку матчера, даже если его подменят
+        matcher = self.matcher
+        candidates = []
+        military_filtered = 0
+        skipped = 0
+
+        for item in items:
+            headline = item.title.strip()
+
+            # Пропускаем слишком короткие заголовки
+            if len(headline) < rules.min_title_length:
+                skipped += 1
+                continue
+
+            category, matches = self.verdict(item, matcher)
+
+            # Пропускаем заголовки с техническими терминами или рекламой
+            if category == SKIP:
+                skipped += 1
+                continue
+
+            # ГЛАВНЫЙ ФИЛЬТР: исключаем военные новости
+            if category == MILITARY:
+                military_filtered += 1
+                logger.debug(f"Отфильтрована военная новость: {headline[:50]}...")
+                continue
+
+            candidates.append(Candidate(item, category, matches))
+
+        return SelectionResult([], candidates, military_filtered, skipped, {})
+
+    def _rank(self, candidates: List[Candidate]) -> List[Candidate]:
+        """Упорядочивает кандидатов: по оценке, равные — в случайном порядке."""
+        ranked = list(candidates)
+        self.random.shuffle(ranked)
+        if self.scorer and ranked:
+            scores = self.scorer([candidate.item for candidate in ranked])
+            for candidate, score in zip(ranked, scores):
+                candidate.score = score
+            ranked.sort(key=lambda candidate: candidate.score, reverse=True)
+        if self.topic_assigner and ranked:
+            topics = self.topic_assigner([candidate.item for candidate in ranked])
+            for candidate, topic in zip(ranked, topics):
+                candidate.topic = topic
+        return ranked
+
+    def select(self, items: Sequence, limit: int, rules: Optional[SelectionRules] = None) -> SelectionResult:
+        """
+        Отбирает до limit новостей.
+
+        Сначала позитивные (не больше rules.positive_slots), затем нейтральные,
+        с ограничениями на источник и тему; если мест осталось, добираются
+        любые оставшиеся без учета этих ограничений.
+        """
+        rules = rules or SelectionRules()
+        result = self.classify(items, rules)
+        candidates = result.candidates
+
+        # Приоритизация: сначала позитивные, затем нейтральные
+        if len(candidates) <= limit:
+            ordered = [c for c in candidates if c.category == POSITIVE] + \
+                      [c for c in candidates if c.category == NEUTRAL]
+            self._finish(result, ordered, {})
+            return result
+
+        ranked = self._rank(candidates)
+        positive_slots = limit if rules.positive_slots is None else min(rules.positive_slots, limit)
+
+        selected: List[Candidate] = []
+        taken = set()
+        source_count: Dict[str, int] = {}
+        topic_count: Dict[int, int] = {}
+        positive_taken = 0
+
+        def take(candidate: Candidate):
+            selected.append(candidate)
+            taken.add(id(candidate))
+            source = getattr(candidate.item, 'source', None)
+            if source:
+                source_count[source] = source_count.get(source, 0) + 1
+            if candidate.topic >= 0:
+                topic_count[candidate.topic] = topic_count.get(candidate.topic, 0) + 1
+
+        def source_allows(candidate: Candidate) -> bool:
+            source = getattr(candidate.item, 'source', None)
+            if (rules.max_per_source is not None and source
+                    and source_count.get(source, 0) >= rules.max_per_source):
+                return False
+            # Не больше max_per_topic новостей одной темы — дайджест разнообразнее
+            return (rules.max_per_topic is None or candidate.topic < 0
+                    or topic_count.get(candidate.topic, 0) < rules.max_per_topic)
+
+        # Первый проход: позитивные в пределах квоты
+        for candidate in ranked:
+            if positive_taken >= positive_slots or len(selected) >= limit:
+                break
+            if candidate.category == POSITIVE and source_allows(candidate):
+                take(candidate)
+                positive_taken += 1
+
+        # Второй проход: добираем нейтральными
+        for candidate in ranked:
+            if len(selected) >= limit:
+                break
+            if candidate.category == NEUTRAL and source_allows(candidate):
+                take(candidate)
+
+        # Если все еще не набрали limit, берем любые оставшиеся (игнорируя квоты)
+        for candidate in ranked:
+            if len(selected) >= limit:
+                break
+            if id(candidate) not in taken:
+                take(candidate)
+
+        self._finish(result, selected, source_count)
+        return result
+
+    @staticmethod
+    def _finish(result: SelectionResult, selected: List[Candidate], source_count: Dict[str, int]):
+        """Заполняет итог отбора."""
+        result.selected = [candidate.item for candidate in selected]
+        result.source_count = source_count
+        for candidate in selected:
+            result.selected_counts[candidate.category] = result.selected_counts.get(candidate.category, 0) + 1
@@ -0,0 +1,51 @@
+"""
+Модуль объединения одновременных одинаковых вызовов (single flight).
+Если задача с тем же ключом уже выполняется, новый вызов не запускает
+ее повторно, а ждет общий результат. Отмена одного из ожидающих не
+прерывает общую задачу для остальных.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger('single_flight')
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Одна выполняющаяся задача на ключ, остальные вызовы ждут ее результата."""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {'calls': 0, 'executed': 0, 'coalesced': 0}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Ошибка передается ожидающим; здесь она только помечается полученной
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Общая задача {key!r} завершилась ошибкой: {task.exception()}")
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет func или присоединяется к уже выполняющемуся вызову с тем же ключом.
+
+        Returns:
+            Результат общего вызова
+        """
+        self.stats['calls'] += 1
+        task = self._tasks.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            logger.debug(f"Вызов {key!r} присоединен к уже выполняющемуся")
+        else:
+            self.stats['executed'] += 1
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
@@ -0,0 +1,134 @@
+"""
+Модуль для отслеживания здоровья источников новостей.
+Считает скользящие перцентили задержки и долю ошибок, а также
+реализует автоматический выключатель (circuit breaker), который
+временно пропускает неработающий источник.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger('source_health')
+
+
+class BreakerState:
+    CLOSED = "closed"        # Источник работает, запросы идут
+    OPEN = "open"            # Источник пропускается до конца паузы
+    HALF_OPEN = "half_open"  # Пробный запрос после паузы
+
+
+class SourceHealth:
+    """Статистика и автоматический выключатель одного источника."""
+
+    def __init__(self, source_name: str, window: int = 50, failure_threshold: int = 3,
+                 base_backoff: float = 60.0, max_backoff: float = 1800.0):
+        self.source_name = source_name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        # Скользящее окно последних запросов
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        self.backoff = base_backoff
+        self.open_until = 0.0  # time.monotonic()
+        self.skipped = 0
+        self.hedged = 0
+        self.last_error: Optional[str] = None
+
+    def allow_request(self) -> bool:
+        """Решает, можно ли сейчас обращаться к источнику."""
+        if self.state == BreakerState.CLOSED:
+            return True
+
+        if self.state == BreakerState.OPEN and time.monotonic() >= self.open_until:
+            # Пауза закончилась — пропускаем один пробный запрос
+            self.state = BreakerState.HALF_OPEN
+            logger.info(f"Источник {self.source_name}: пробный запрос после паузы")
+            return True
+
+        self.skipped += 1
+        return False
+
+    def record_success(self, latency: float):
+        """Учитывает успешный запрос."""
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+
+        if self.state != BreakerState.CLOSED:
+            logger.info(f"Источник {self.source_name} снова доступен")
+        self.state = BreakerState.CLOSED
+        self.backoff = self.base_backoff
+
+    def record_failure(self, latency: float, error: str):
+        """Учитывает неудачный запрос и при необходимости размыкает выключатель."""
+        self.latencies.append(latency)
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.last_error = error
+
+        if self.state == BreakerState.HALF_OPEN:
+            # Пробный запрос не прошел — увеличиваем паузу
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self._open()
+        elif self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        """Размыкает выключатель на время паузы."""
+        self.state = BreakerState.OPEN
+        self.open_until = time.monotonic() + self.backoff
+        logger.warning(f"Источник {self.source_name} отключен на {self.backoff:.0f} с "
+                       f"после {self.consecutive_failures} ошибок подряд: {self.last_error}")
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Возвращает перцентиль задержки (в секундах) по скользящему окну."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        """Доля неудачных запросов в скользящем окне."""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def hedge_delay(self, timeout: float, min_samples: int = 10) -> Optional[float]:
+        """
+        Возвращает задержку, после которой стоит отправить дублирующий запрос.
+
+        Дублирование имеет смысл только для стабильно быстрых источников:
+        если обычно (p95) ответ приходит быстро, а сейчас задерживается,
+        это скорее всплеск, чем медленный источник.
+        """
+        if len(self.latencies) < min_samples or self.error_rate > 0.5:
+            return None
+        p95 = self.percentile(0.95)
+        if p95 is None or p95 >= timeout / 2:
+            return None
+        return max(p95, 0.2)
+
+    def status(self) -> dict:
+        """Возвращает сводку состояния источника."""
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            'source': self.source_name,
+            'state': self.state,
+            'p50_ms': p50 * 1000 if p50 is not None else None,
+            'p95_ms': p95 * 1000 if p95 is not None else None,
+            'error_rate': self.error_rate,
+            'requests': len(self.outcomes),
+            'skipped': self.skipped,
+            'hedged': self.hedged,
+            'last_error': self.last_error
+        }
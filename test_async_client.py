@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки асинхронного клиента DeepSeek: медленный
+локальный сервер вместо API, при этом цикл событий должен продолжать
+обслуживать другие задачи, генерация — отменяться без ожидания ответа,
+а потоковый ответ — обрываться на границе предложения после нужной длины
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+SERVER_DELAY = 3.0
+HEARTBEAT_INTERVAL = 0.05
+TOKEN_DELAY = 0.01
+
+# Длинный ответ: около 1500 символов, генерация которых занимает несколько секунд
+LONG_ANSWER = " ".join(
+    f"Предложение номер {i} рассказывает о новости и ее последствиях." for i in range(25)
+)
+
+
+def free_port() -> int:
+    """Возвращает свободный локальный порт."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SlowCompletionServer:
+    """Локальная замена API: отвечает на chat/completions с задержкой."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.answer = "Тестовый пост от медленного сервера."
+        self.chunks_sent = 0
+        # Кэш контекста как у DeepSeek: совпавший с прошлыми запросами системный префикс
+        self.seen_prefixes = set()
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        await asyncio.sleep(self.delay)
+        if body.get('stream'):
+            return await self.handle_stream(request, self.usage(body['messages']))
+        return web.json_response({
+            "id": "test", "object": "chat.completion", "created": int(time.time()),
+            "model": "deepseek-chat",
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "Тестовый пост от медленного сервера."}
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 8, "total_tokens": 18}
+        })
+
+    def usage(self, messages: list) -> dict:
+        """Статистика токенов: ~2 символа на токен, системный префикс из кэша при повторе."""
+        prompt_tokens = sum(len(message['content']) for message in messages) // 2
+        prefix = messages[0]['content'] if messages[0]['role'] == 'system' else None
+        cached = len(prefix) // 2 if prefix in self.seen_prefixes else 0
+        if prefix:
+            self.seen_prefixes.add(prefix)
+        return {
+            "prompt_tokens": prompt_tokens, "completion_tokens": len(self.answer.split(' ')),
+            "total_tokens": prompt_tokens + len(self.answer.split(' ')),
+            "prompt_cache_hit_tokens": cached, "prompt_cache_miss_tokens": prompt_tokens - cached
+        }
+
+    async def handle_stream(self, request: web.Request, usage: dict) -> web.StreamResponse:
+        """Отдает ответ по словам в формате SSE, как потоковый API."""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        self.chunks_sent = 0
+        try:
+            await response.prepare(request)
+            for word in self.answer.split(' '):
+                chunk = {
+                    "id": "test", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": "deepseek-chat",
+                    "choices": [{"index": 0, "delta": {"content": word + ' '}, "finish_reason": None}]
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.chunks_sent += 1
+                await asyncio.sleep(TOKEN_DELAY)
+            # Последний фрагмент со статистикой (stream_options.include_usage)
+            chunk = {
+                "id": "test", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": "deepseek-chat", "choices": [], "usage": usage
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            # Клиент закрыл поток (остановка генерации или отмена)
+            pass
+        return response
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    """Имитирует другие обработчики: тикает и записывает опоздания."""
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def test_async_client():
+    """Проверяет, что генерация не блокирует цикл событий и отменяется"""
+    runner = None
+    client = None
+    try:
+        print("🔌 ТЕСТ АСИНХРОННОГО КЛИЕНТА DEEPSEEK")
+        print("=" * 45)
+
+        port = free_port()
+        os.environ.setdefault('DEEPSEEK_API_KEY', 'test-key')
+        os.environ['DEEPSEEK_BASE_URL'] = f"http://127.0.0.1:{port}"
+        os.environ['NEWS_ENABLED'] = 'false'
+        os.environ['DEEPSEEK_USAGE_PATH'] = os.path.join(tempfile.mkdtemp(), 'usage.json')
+
+        server = SlowCompletionServer(SERVER_DELAY)
+        app = web.Application()
+        app.router.add_post('/chat/completions', server.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+
+        from deepseek_client import DeepSeekClient
+        client = DeepSeekClient()
+
+        # Тест 1: другие задачи продолжают работать во время генерации
+        stop = asyncio.Event()
+        lags = []
+        ticker = asyncio.create_task(heartbeat(stop, lags))
+        start = time.perf_counter()
+        post_text, _, _ = await client.generate_post()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await ticker
+
+        max_lag = max(lags) * 1000 if lags else 0.0
+        print(f"\n1️⃣ Генерация заняла {elapsed:.1f} с, ответ: {post_text}")
+        print(f"   Тиков других задач: {len(lags)}, максимальное опоздание: {max_lag:.0f} мс")
+        print(f"{'✅' if max_lag < 100 and len(lags) > SERVER_DELAY / HEARTBEAT_INTERVAL / 2 else '❌'} "
+              f"Цикл событий не блокировался")
+
+        # Тест 2: отмена генерации прерывает запрос
+        task = asyncio.create_task(client.generate_post())
+        await asyncio.sleep(0.5)
+        start = time.perf_counter()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        cancel_ms = (time.perf_counter() - start) * 1000
+        print(f"\n2️⃣ Отмена за {cancel_ms:.0f} мс (ответ сервера через {SERVER_DELAY:.0f} с)")
+        print(f"{'✅' if task.cancelled() and cancel_ms < 500 else '❌'} Генерация отменена без ожидания ответа")
+
+        # Тест 3: потоковая генерация останавливается после целевой длины
+        from deepseek_client import COMMENTARY_MAX_CHARS, COMMENTARY_TARGET_CHARS
+        server.delay = 0.2
+        server.answer = LONG_ANSWER
+        total_words = len(LONG_ANSWER.split(' '))
+        commentary, stats = await client._complete(
+            [{"role": "user", "content": "Тест"}], client._get_random_api_params(),
+            target_chars=COMMENTARY_TARGET_CHARS, max_chars=COMMENTARY_MAX_CHARS
+        )
+        print(f"\n3️⃣ Комментарий {len(commentary)} символов, первый токен через {stats['ttft_ms']:.0f} мс, "
+              f"всего {stats['total_ms']:.0f} мс")
+        print(f"   Сервер отдал {server.chunks_sent} из {total_words} фрагментов")
+        stopped = (stats['stopped_early'] and commentary.endswith('.')
+                   and COMMENTARY_TARGET_CHARS <= len(commentary) <= COMMENTARY_MAX_CHARS)
+        print(f"{'✅' if stopped else '❌'} Генерация остановлена на конце предложения")
+        print(f"{'✅' if server.chunks_sent < total_words else '❌'} Лишние токены не генерировались")
+
+        print("\n🎉 ТЕСТ ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if client:
+            await client.close()
+        if runner:
+            await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(test_async_client())
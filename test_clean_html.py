@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк очистки HTML: новая реализация clean_html против BeautifulSoup
+на заголовках и описаниях из записанных русскоязычных фидов
+"""
+
+import asyncio
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import feedparser
+
+from feed_parser import clean_html, clean_html_cache_info
+from test_parse_modes import load_recorded_feeds
+
+ROUNDS = 3
+
+
+def clean_html_bs4(html_text: str) -> str:
+    """Прежняя реализация очистки через BeautifulSoup (эталон)."""
+    from bs4 import BeautifulSoup
+
+    if not html_text:
+        return ""
+    text = BeautifulSoup(html_text, 'html.parser').get_text()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def collect_corpus(feeds: dict) -> list:
+    """Собирает сырые заголовки и описания из записанных фидов."""
+    corpus = []
+    for content in feeds.values():
+        for entry in feedparser.parse(content).entries:
+            corpus.append(entry.get('title', ''))
+            corpus.append(entry.get('summary', ''))
+    return corpus
+
+
+def run(func, corpus: list) -> float:
+    """Возвращает время одного прохода функции по корпусу."""
+    start = time.perf_counter()
+    for text in corpus:
+        func(text)
+    return time.perf_counter() - start
+
+
+async def test_clean_html():
+    """Сравнивает скорость и результат очистки HTML"""
+    try:
+        print("🧹 МИКРО-БЕНЧМАРК ОЧИСТКИ HTML")
+        print("=" * 45)
+
+        corpus = collect_corpus(await load_recorded_feeds())
+        if not corpus:
+            print("❌ Нет записанных фидов для бенчмарка")
+            return
+
+        with_markup = sum(1 for text in corpus if '<' in text or '&' in text)
+        print(f"\n📄 Строк: {len(corpus)}, с разметкой или сущностями: {with_markup}")
+
+        try:
+            reference_time = min(run(clean_html_bs4, corpus) for _ in range(ROUNDS))
+            print(f"\n🐢 BeautifulSoup: {reference_time * 1000:.1f} мс")
+        except ImportError:
+            reference_time = None
+            print("\n⚠️ beautifulsoup4 не установлен, сравнение пропущено")
+
+        cold_time = run(clean_html, corpus)
+        warm_time = min(run(clean_html, corpus) for _ in range(ROUNDS))
+        print(f"🚀 clean_html (холодный кэш): {cold_time * 1000:.1f} мс")
+        print(f"🚀 clean_html (теплый кэш): {warm_time * 1000:.1f} мс")
+        print(f"📊 Кэш: {clean_html_cache_info()}")
+
+        if reference_time:
+            print(f"\n⚡ Ускорение: x{reference_time / cold_time:.1f} (холодный), "
+                  f"x{reference_time / warm_time:.1f} (теплый)")
+
+            # Отличия допустимы только в пробелах между блочными тегами
+            differences = [
+                text for text in corpus
+                if clean_html(text).replace(' ', '') != clean_html_bs4(text).replace(' ', '')
+            ]
+            print(f"{'✅' if not differences else '⚠️'} Расхождений с эталоном: {len(differences)}")
+            for text in differences[:3]:
+                print(f"  • {text[:80]}...")
+
+        print("\n🎉 БЕНЧМАРК ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    asyncio.run(test_clean_html())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Тест ранней остановки чтения фида: закрывающие теги записей внутри CDATA
+и комментариев не должны считаться границами записей
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from news_collector import NewsCollector
+from feed_parser import find_entries_end, parse_feed
+
+ITEMS_IN_FEED = 7
+
+
+def build_fixture_feed() -> bytes:
+    """Фид, в описаниях которого встречаются '</item>' внутри CDATA и комментариев."""
+    published = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0300')
+    items = []
+    for i in range(1, ITEMS_IN_FEED + 1):
+        if i % 2:
+            description = (f"<![CDATA[<p>Пример разметки: <code></item></item></code> "
+                           f"и </entry> в тексте новости {i}</p>]]>")
+        else:
+            description = f"Описание &lt;/item&gt; новости {i}<!-- </item> -->"
+        items.append(
+            f"<item><title>Новость {i}</title>"
+            f"<link>https://example.com/news/{i}</link>"
+            f"<description>{description}</description>"
+            f"<pubDate>{published}</pubDate></item>"
+        )
+    feed = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            '<title>Фикстура</title>' + ''.join(items) + '</channel></rss>')
+    return feed.encode('utf-8')
+
+
+class FakeContent:
+    """Тело ответа, которое отдается частями заданного размера."""
+
+    def __init__(self, data: bytes, part_size: int):
+        self.data = data
+        self.part_size = part_size
+
+    async def iter_chunked(self, _chunk_size: int):
+        for offset in range(0, len(self.data), self.part_size):
+            yield self.data[offset:offset + self.part_size]
+
+
+class FakeResponse:
+    def __init__(self, data: bytes, part_size: int):
+        self.content = FakeContent(data, part_size)
+
+
+async def main():
+    try:
+        feed = build_fixture_feed()
+        collector = NewsCollector()
+        needed = collector.max_items_per_source
+
+        # Тест 1: поиск по целому буферу считает только настоящие записи
+        found, end, _ = find_entries_end(bytearray(feed), 0, ITEMS_IN_FEED + 10)
+        if found == ITEMS_IN_FEED:
+            print(f"✅ Найдено {found} записей, теги внутри CDATA и комментариев пропущены")
+        else:
+            print(f"❌ Найдено {found} записей вместо {ITEMS_IN_FEED}")
+
+        # Тест 2: чтение частями разного размера (секции разрезаны между частями)
+        for part_size in (1, 7, 50, 64 * 1024):
+            response = FakeResponse(feed, part_size)
+            body = await collector._read_feed_body('fixture', response)
+            items = parse_feed(body, 'fixture', needed)
+            titles = [item['title'] for item in items]
+            expected = [f"Новость {i}" for i in range(1, needed + 1)]
+            stopped_early = len(body) < len(feed)
+            if titles == expected and stopped_early:
+                print(f"✅ Части по {part_size} байт: {len(items)} записей, "
+                      f"прочитано {len(body)} из {len(feed)} байт")
+            else:
+                print(f"❌ Части по {part_size} байт: {titles}, "
+                      f"прочитано {len(body)} из {len(feed)} байт")
+
+        # Тест 3: обрезанное тело заканчивается границей последней нужной записи
+        response = FakeResponse(feed, 7)
+        body = await collector._read_feed_body('fixture', response)
+        if body.endswith(b'</item>') and body.count(b'<item>') == needed:
+            print("✅ Чтение остановлено на границе записи")
+        else:
+            print(f"❌ Чтение остановлено не на границе записи: ...{body[-40:]!r}")
+
+        await collector.close()
+
+    except Exception as e:
+        print(f"❌ Ошибка при тестировании: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк фильтрации заголовков: точность и скорость поиска ключевых слов
+по основам слов против прежнего поиска подстрок на размеченной выборке
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from context_processor import ContextProcessor
+from text_normalizer import normalize_text, stem, stem_cache_info
+
+ROUNDS = 3
+THROUGHPUT_HEADLINES = 20000
+
+# Размеченная выборка: заголовок -> ожидаемый класс
+LABELLED_HEADLINES = [
+    ("Ракетой поражен склад боеприпасов под Харьковом", 'military'),
+    ("ВСУ нанесли удар по Белгородской области", 'military'),
+    ("Беспилотники атаковали нефтебазу ночью", 'military'),
+    ("Минобороны сообщило о перехвате дронов над Курском", 'military'),
+    ("Танки и артиллерию перебросили к линии фронта", 'military'),
+    ("Генштаб объявил о начале учений флота", 'military'),
+    ("Лавров прокомментировал новые санкции против России", 'military'),
+    ("Глава МИДа встретился с послом Франции", 'military'),
+    ("Украинские военные отступили от Херсона", 'military'),
+    ("Взрывы прогремели в Одессе", 'military'),
+    ("Расследование подрыва Северных потоков зашло в тупик", 'military'),
+    ("Мобилизованных солдат отправили на ротацию", 'military'),
+    ("Корабли НАТО вошли в Черное море", 'military'),
+    ("Крымский мост закрыли для движения из-за атаки", 'military'),
+    ("Ученые открыли новый способ лечения диабета", 'positive'),
+    ("Российский стартап привлек инвестиции в разработку ИИ", 'positive'),
+    ("В Москве открылась выставка современного искусства", 'positive'),
+    ("Сбербанк сообщил о росте прибыли за квартал", 'positive'),
+    ("Исследования показали пользу прогулок для здоровья", 'positive'),
+    ("Университеты расширят прием студентов на инженерные программы", 'positive'),
+    ("Команда школьников победила на чемпионате по программированию", 'positive'),
+    ("Фестиваль уличного кино пройдет в Петербурге", 'positive'),
+    ("Вакцину от гриппа начали выпускать в новой лаборатории", 'positive'),
+    ("Компании вложат миллиарды в производство электромобилей", 'positive'),
+    ("Театры Москвы покажут премьеры в новом сезоне", 'positive'),
+    ("Космический телескоп сделал снимки далекой галактики", 'positive'),
+    ("Благотворительный забег собрал средства для детей", 'positive'),
+    ("Экологи призвали сохранить природу Байкала", 'positive'),
+    ("Работа метро изменится в праздничные дни", 'neutral'),
+    ("Погода на выходных будет переменчивой", 'neutral'),
+    ("Оборот розничных сетей снизился в сентябре", 'neutral'),
+    ("Цены на бензин выросли за неделю", 'neutral'),
+    ("Пробки в Москве достигли восьми баллов", 'neutral'),
+    ("Энергетики восстановили подачу света после урагана", 'neutral'),
+    ("Власти обсудили новые правила парковки", 'neutral'),
+    ("Рабочие завершили ремонт моста через реку", 'neutral'),
+    ("Операторы связи повысят тарифы с января", 'neutral'),
+    ("Жители пожаловались на шум стройки", 'neutral'),
+    ("Реклама нового смартфона вызвала споры", 'skip'),
+    ("Партнерский материал: как выбрать ипотеку", 'skip'),
+    ("Промо-акция сети кофеен стартует в пятницу", 'skip'),
+]
+
+# Заголовки, которые прежний поиск подстрок классифицировал верно:
+# производные слова ('танковый', 'промокод'), совпадение основ разных
+# слов ('учения' и 'ученые') и формы 'свой', дающие основу 'сво'
+# короткого ключевого слова; слова, лишь начинающиеся с ключевого
+# ('танкер', 'ротация'), не совпадают с ним
+REGRESSION_HEADLINES = [
+    ("Донбасский уголь подорожал на бирже", 'military'),
+    ("Танковый биатлон пройдет в августе", 'military'),
+    ("Войска обстреляли позиции у границы", 'military'),
+    ("Партнерский материал: как выбрать ипотеку", 'skip'),
+    ("Промокод на доставку продуктов", 'skip'),
+    ("Спонсорский контракт клуба продлен", 'skip'),
+    ("Вооруженные силы провели учения", 'neutral'),
+    ("Промышленность нарастила выпуск станков", 'positive'),
+    ("Свобода выбора тарифа для абонентов", 'neutral'),
+    ("Компания представила свою новую разработку", 'positive'),
+    ("Своя игра вернулась на экраны", 'neutral'),
+    ("Жители отстояли свои дворы от застройки", 'neutral'),
+    ("Танкер с нефтью прибыл в порт", 'neutral'),
+    ("Ученые нашли лекарство от ротавируса", 'positive'),
+    ("Ротация кадров в правительстве", 'neutral'),
+]
+
+
+def classify(matches: dict) -> str:
+    """Переводит найденные категории в итоговый класс с приоритетом фильтров."""
+    for category in ('skip', 'military', 'positive'):
+        if category in matches:
+            return category
+    return 'neutral'
+
+
+def substring_matches(processor: ContextProcessor, headline: str) -> dict:
+    """Прежний поиск ключевых слов как подстрок заголовка (эталон для сравнения)."""
+    headline_lower = headline.lower()
+    matches = {}
+    for category, keywords in processor.matcher.categories.items():
+        found = [keyword for keyword in keywords if keyword in headline_lower]
+        if found:
+            matches[category] = found
+    return matches
+
+
+def evaluate(match_func) -> tuple:
+    """Возвращает долю верных ответов и список ошибок на размеченной выборке."""
+    errors = []
+    for headline, label in LABELLED_HEADLINES:
+        predicted = classify(match_func(headline))
+        if predicted != label:
+            errors.append((headline, label, predicted))
+    return 1 - len(errors) / len(LABELLED_HEADLINES), errors
+
+
+def throughput(match_func, headlines: list) -> float:
+    """Возвращает количество заголовков в секунду за лучший из ROUNDS проходов."""
+    best = min(_run(match_func, headlines) for _ in range(ROUNDS))
+    return len(headlines) / best
+
+
+def _run(match_func, headlines: list) -> float:
+    start = time.perf_counter()
+    for headline in headlines:
+        match_func(headline)
+    return time.perf_counter() - start
+
+
+async def test_keyword_matching():
+    """Сравнивает точность и скорость двух способов поиска ключевых слов"""
+    try:
+        print("🔤 БЕНЧМАРК ПОИСКА КЛЮЧЕВЫХ СЛОВ")
+        print("=" * 45)
+
+        processor = ContextProcessor()
+        methods = {
+            'Подстроки': lambda headline: substring_matches(processor, headline),
+            'Основы слов': processor.matcher.match
+        }
+
+        print(f"\n🏷️ Размеченных заголовков: {len(LABELLED_HEADLINES)}")
+        for name, match_func in methods.items():
+            accuracy, errors = evaluate(match_func)
+            print(f"\n{name}: точность {accuracy:.0%}")
+            for headline, label, predicted in errors:
+                print(f"  ❌ {headline} (ожидалось {label}, получено {predicted})")
+
+        print(f"\n🔁 Производные слова и совпадения основ:")
+        for headline, label in REGRESSION_HEADLINES:
+            predicted = classify(processor.matcher.match(headline))
+            print(f"  {'✅' if predicted == label else '❌'} {headline} "
+                  f"(ожидалось {label}, получено {predicted})")
+
+        # Скорость на многократно повторенной выборке, как между опросами
+        headlines = [h for h, _ in LABELLED_HEADLINES] * (THROUGHPUT_HEADLINES // len(LABELLED_HEADLINES))
+        print(f"\n⏱️ Скорость на {len(headlines)} заголовках:")
+
+        stem.cache_clear()
+        start = time.perf_counter()
+        for headline in headlines[:len(LABELLED_HEADLINES)]:
+            normalize_text(headline)
+        print(f"  Нормализация (холодный кэш): "
+              f"{(time.perf_counter() - start) * 1000:.1f} мс на {len(LABELLED_HEADLINES)} заголовков")
+
+        for name, match_func in methods.items():
+            print(f"  {name}: {throughput(match_func, headlines):,.0f} заголовков/с")
+
+        # Основы считаются один раз при получении новости (NewsItem.title_stems)
+        stems = [normalize_text(headline) for headline in headlines]
+        print(f"  Основы слов (готовые основы): "
+              f"{throughput(processor.matcher.match, stems):,.0f} заголовков/с")
+        print(f"📊 Кэш стемминга: {stem_cache_info()}")
+
+        print("\n🎉 БЕНЧМАРК ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    asyncio.run(test_keyword_matching())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк режимов парсинга фидов: задержка event loop и пропускная способность
+для inline, thread и process на записанном наборе фидов
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from news_collector import NewsCollector
+from feed_parser import PARSE_MODES, ParserPool, parse_feed
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+
+RECORDED_FEEDS_DIR = os.path.join('data', 'recorded_feeds')
+ROUNDS = 5
+
+
+async def record_feeds(directory: str = RECORDED_FEEDS_DIR):
+    """Скачивает текущие фиды всех источников и сохраняет их на диск."""
+    os.makedirs(directory, exist_ok=True)
+    collector = NewsCollector()
+    session = await collector._get_session()
+
+    for source_name, url in collector.sources.items():
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    print(f"  ⚠️ {source_name}: HTTP {response.status}")
+                    continue
+                content = await response.read()
+            with open(os.path.join(directory, f"{source_name}.xml"), 'wb') as f:
+                f.write(content)
+            print(f"  💾 {source_name}: {len(content) // 1024} КБ")
+        except Exception as e:
+            print(f"  ❌ {source_name}: {str(e)}")
+
+    await collector.close()
+
+
+async def load_recorded_feeds(directory: str = RECORDED_FEEDS_DIR) -> dict:
+    """Загружает записанные фиды, при необходимости записывая их заново."""
+    if not os.path.isdir(directory) or not os.listdir(directory):
+        print(f"📥 Записываем фиды в {directory}")
+        await record_feeds(directory)
+
+    feeds = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.xml'):
+            with open(os.path.join(directory, filename), 'rb') as f:
+                feeds[filename[:-4]] = f.read()
+    return feeds
+
+
+async def measure_loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.005):
+    """Замеряет, насколько event loop опаздывает с пробуждением таймера."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def benchmark_mode(mode: str, feeds: dict) -> dict:
+    """Прогоняет парсинг всех фидов ROUNDS раз в заданном режиме."""
+    pool = ParserPool(mode=mode, workers=2, max_pending=8)
+
+    # Прогрев пула (создание потоков/процессов не входит в замер)
+    name, content = next(iter(feeds.items()))
+    await pool.run(parse_feed, content, name, 5)
+
+    lag_samples = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_loop_lag(lag_samples, stop))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    tasks = [
+        pool.run(parse_feed, content, name, 5)
+        for _ in range(ROUNDS)
+        for name, content in feeds.items()
+    ]
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await monitor
+    pool.shutdown()
+
+    lag_samples.sort()
+    return {
+        'elapsed': elapsed,
+        'throughput': len(tasks) / elapsed,
+        'lag_max': lag_samples[-1] * 1000 if lag_samples else 0.0,
+        'lag_p95': lag_samples[int(len(lag_samples) * 0.95)] * 1000 if lag_samples else 0.0
+    }
+
+
+async def test_parse_modes():
+    """Сравнивает режимы парсинга фидов"""
+    try:
+        print("⏱️ БЕНЧМАРК РЕЖИМОВ ПАРСИНГА ФИДОВ")
+        print("=" * 50)
+
+        feeds = await load_recorded_feeds()
+        if not feeds:
+            print("❌ Нет записанных фидов для бенчмарка")
+            return
+
+        total_kb = sum(len(content) for content in feeds.values()) // 1024
+        print(f"\n📡 Фидов: {len(feeds)}, общий объем: {total_kb} КБ, прогонов: {ROUNDS}")
+
+        for mode in PARSE_MODES:
+            result = await benchmark_mode(mode, feeds)
+            print(f"\n🔧 Режим {mode}:")
+            print(f"  ⏳ Время: {result['elapsed']:.2f} с")
+            print(f"  🚀 Пропускная способность: {result['throughput']:.1f} фидов/с")
+            print(f"  🐢 Задержка loop: p95 {result['lag_p95']:.1f} мс, максимум {result['lag_max']:.1f} мс")
+
+        print("\n🎉 БЕНЧМАРК ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    asyncio.run(test_parse_modes())
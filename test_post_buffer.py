@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки буфера готовых постов: мгновенная выдача
+заранее сгенерированного поста, разные новости в соседних постах,
+сохранение на диск, перегенерация устаревших постов и подготовка
+постов только к ближайшим слотам расписания
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from news_collector import NewsItem
+from post_buffer import PostBuffer
+from published_memory import PublishedMemory
+from schedule_config import SCHEDULE_CONFIG, upcoming_publication_times
+from test_keyword_matching import LABELLED_HEADLINES
+
+GENERATION_DELAY = 0.5
+
+
+class SlowClient:
+    """Замена DeepSeekClient: отбирает 5 неопубликованных новостей и долго «думает»."""
+
+    def __init__(self, memory: PublishedMemory):
+        self.published_memory = memory
+        self.items = [
+            NewsItem(title=title, summary="", link=f"https://example.com/news/{i}",
+                     published=datetime.now(), source=f"Источник {i % 5}")
+            for i, (title, _) in enumerate(LABELLED_HEADLINES)
+        ]
+        self.by_title = {item.title: item for item in self.items}
+        self.generated = 0
+
+    async def generate_hybrid_parts(self, command: str = 'hybrid_post'):
+        selected = [item for item in self.items if not self.published_memory.contains(item)][:5]
+        await asyncio.sleep(GENERATION_DELAY)
+        self.generated += 1
+        section = "\n".join(f"• {item.title}" for item in selected)
+        return section, f"Комментарий {self.generated}.", "prompt", [item.title for item in selected]
+
+    @staticmethod
+    def compose_post(headlines_section, commentary):
+        return f"{headlines_section}\n\n{commentary}" if commentary else headlines_section
+
+    def selected_items(self, headlines):
+        return [self.by_title.get(headline, headline) for headline in headlines]
+
+    def mark_published(self, headlines):
+        self.published_memory.mark_published(self.selected_items(headlines))
+
+
+async def test_post_buffer():
+    """Проверяет буфер готовых постов"""
+    buffer = None
+    try:
+        print("📦 ТЕСТ БУФЕРА ГОТОВЫХ ПОСТОВ")
+        print("=" * 45)
+
+        tmp_dir = tempfile.mkdtemp()
+        buffer_path = os.path.join(tmp_dir, 'post_buffer.json')
+        memory = PublishedMemory(path=os.path.join(tmp_dir, 'published.json'))
+        client = SlowClient(memory)
+
+        # Тест 1: производитель заполняет буфер постами с разными новостями
+        buffer = PostBuffer(client, path=buffer_path, size=2)
+        await buffer.start()
+        await asyncio.sleep(GENERATION_DELAY * 2 + 0.3)
+        headlines = [set(post.headlines) for post in buffer.posts]
+        overlap = set.intersection(*headlines) if len(headlines) == 2 else {'?'}
+        print(f"\n1️⃣ В буфере {len(buffer.posts)} поста, общих новостей: {len(overlap)}")
+        print(f"{'✅' if len(buffer.posts) == 2 and not overlap else '❌'} Соседние посты не повторяют новости")
+
+        # Тест 2: публикация берет готовый пост без ожидания генерации
+        start = time.perf_counter()
+        post = await buffer.take()
+        take_ms = (time.perf_counter() - start) * 1000
+        client.mark_published(post.headlines)
+        print(f"\n2️⃣ Пост выдан за {take_ms:.1f} мс (генерация {GENERATION_DELAY * 1000:.0f} мс)")
+        print(f"{'✅' if take_ms < 50 else '❌'} Публикация не ждет DeepSeek")
+
+        # Тест 3: буфер переживает перезапуск
+        await buffer.stop()
+        restored = PostBuffer(client, path=buffer_path, size=2)
+        restored._load()
+        print(f"\n3️⃣ После перезапуска в буфере {len(restored.posts)} пост(а)")
+        print(f"{'✅' if restored.posts and restored.posts[0].text == buffer.posts[0].text else '❌'} "
+              f"Готовые посты сохранены на диск")
+        print(f"{'✅' if restored.posts and restored.posts[0].commentary == buffer.posts[0].commentary else '❌'} "
+              f"Комментарий поста сохранен отдельно от текста")
+
+        # Тест 4: пост, новости которого уже опубликованы, генерируется заново
+        buffer = restored
+        memory.mark_published(buffer.posts[0].items)
+        stale_text = buffer.posts[0].text
+        start = time.perf_counter()
+        post = await buffer.take()
+        take_ms = (time.perf_counter() - start) * 1000
+        print(f"\n4️⃣ Устаревший пост заменен новым за {take_ms:.0f} мс, статистика: {buffer.stats}")
+        print(f"{'✅' if post and post.text != stale_text and buffer.stats['stale'] == 1 else '❌'} "
+              f"Устаревший пост перегенерирован перед отправкой")
+
+        # Тест 5: слишком старый пост тоже считается устаревшим
+        post.created_at -= (buffer.max_age_minutes + 1) * 60
+        print(f"\n5️⃣ {'✅' if buffer.stale_reason(post) else '❌'} Пост старше "
+              f"{buffer.max_age_minutes:.0f} мин устарел: {buffer.stale_reason(post)}")
+
+        # Тест 6: ночью, когда до слота дальше предельного возраста, посты не генерируются
+        night = datetime(2026, 10, 19, 2, 0)
+        slots = upcoming_publication_times(night, 3)
+        print(f"\n6️⃣ Ближайшие слоты после 02:00: {', '.join(slot.strftime('%H:%M') for slot in slots)}")
+        print(f"{'✅' if [s.hour for s in slots] == [13, 17, 21] else '❌'} "
+              f"Слоты по расписанию {SCHEDULE_CONFIG['interval_minutes']} мин")
+
+        await buffer.stop()
+        slot_time = time.time() + (buffer.max_age_minutes + 60) * 60
+        scheduled = PostBuffer(client, path=os.path.join(tmp_dir, 'scheduled.json'), size=2,
+                               next_slots=lambda count: [slot_time, slot_time + 4 * 3600][:count])
+        generated = client.generated
+        far_added = await scheduled.fill()
+        slot_time = time.time() + 30 * 60
+        near_added = await scheduled.fill()
+        print(f"\n7️⃣ Слот через {buffer.max_age_minutes + 60:.0f} мин: сгенерировано {far_added}, "
+              f"слот через 30 мин: {near_added} (всего вызовов {client.generated - generated})")
+        print(f"{'✅' if far_added == 0 and near_added == 1 else '❌'} "
+              f"Посты готовятся только к ближайшему слоту")
+
+        # Тест 8: пост, который не удалось отправить, возвращается в начало буфера
+        post = await scheduled.take()
+        scheduled.put_back(post)
+        print(f"\n8️⃣ {'✅' if scheduled.posts and scheduled.posts[0] is post else '❌'} "
+              f"Неотправленный пост возвращен в буфер")
+
+        print("\n🎉 ТЕСТ ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if buffer:
+            await buffer.stop()
+
+if __name__ == "__main__":
+    asyncio.run(test_post_buffer())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки локального выбора лучшего варианта комментария:
+длина, пересказ заголовков, повторы, форматирование и сходство с недавними постами
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from post_ranker import CandidateRanker
+
+HEADLINES = [
+    "Ученые открыли новый вид глубоководных рыб у берегов Камчатки",
+    "В Москве открылась выставка современного искусства",
+    "Российский стартап привлек инвестиции в разработку нейросети",
+    "Врачи представили новый метод лечения диабета",
+    "Телескоп Джеймс Уэбб сфотографировал далекую галактику"
+]
+
+GOOD = (
+    "Любопытство остается главным двигателем человека: одни спускаются в океанские глубины, "
+    "другие смотрят на край Вселенной, третьи ищут язык для искусства и лечения. "
+    "Мы по-прежнему исследуем мир быстрее, чем успеваем его понять, и в этом есть надежда. "
+    "Возможно, самое ценное в таких новостях то, что они напоминают о масштабе неизвестного."
+)
+
+CANDIDATES = {
+    'хороший': GOOD,
+    'короткий': "Мир полон открытий.",
+    'пересказ заголовков': (
+        "Ученые открыли новый вид глубоководных рыб у берегов Камчатки, в Москве открылась выставка "
+        "современного искусства, российский стартап привлек инвестиции в разработку нейросети, "
+        "врачи представили новый метод лечения диабета, а телескоп сфотографировал далекую галактику."
+    ),
+    'повторы': (
+        "Открытия, открытия и снова открытия: открытия в науке, открытия в искусстве, открытия "
+        "в медицине. Открытия делают открытия, и открытия ведут к новым открытиям, потому что "
+        "открытия — это открытия, а открытия всегда остаются открытиями для тех, кто ищет открытия."
+    ),
+    'форматирование': "**Главное:** " + GOOD + " <b>Вывод</b> 🎯",
+}
+
+RECENT_POST = (
+    "Любопытство остается главным двигателем человека: одни спускаются в глубины океана, "
+    "другие смотрят на край Вселенной. Мы исследуем мир быстрее, чем успеваем его понять."
+)
+
+
+async def test_post_ranking():
+    """Проверяет ранжирование вариантов комментария"""
+    try:
+        print("🏆 ТЕСТ ВЫБОРА ЛУЧШЕГО КОММЕНТАРИЯ")
+        print("=" * 45)
+
+        ranker = CandidateRanker()
+
+        # Тест 1: явные дефекты получают штрафы, лучшим выбирается чистый вариант
+        names = {text: name for name, text in CANDIDATES.items()}
+        ranked = ranker.rank(CANDIDATES.values(), HEADLINES)
+        print("\n1️⃣ Рейтинг вариантов:")
+        for candidate in ranked:
+            print(f"  {names[candidate.text]:<20} {candidate!r}")
+        print(f"{'✅' if names[ranked[0].text] == 'хороший' else '❌'} Выбран вариант без дефектов")
+
+        # Тест 2: вариант, похожий на недавний пост, уступает новому
+        fresh = (
+            "Все эти события объединяет терпение: годы наблюдений, проб и ошибок стоят за каждым "
+            "результатом, о котором мы узнаем за минуту. Настоящий прогресс редко бывает громким, "
+            "и тем важнее замечать его в потоке тревожных новостей."
+        )
+        best = ranker.best([GOOD, fresh], HEADLINES, recent_posts=[RECENT_POST])
+        print(f"\n2️⃣ {'✅' if best == fresh else '❌'} Вариант, похожий на недавний пост, отклонен")
+
+        # Тест 3: ранжирование дешевле любого запроса к API
+        many = list(CANDIDATES.values()) * 20
+        start = time.perf_counter()
+        ranker.rank(many, HEADLINES, recent_posts=[RECENT_POST] * 20)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n3️⃣ {len(many)} вариантов оценено за {elapsed:.1f} мс")
+
+        print("\n🎉 ТЕСТ ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    asyncio.run(test_post_ranking())
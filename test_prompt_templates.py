@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки шаблонов промптов: неизменный системный
+префикс для кэша контекста DeepSeek, заранее разобранные шаблоны и
+учет токенов, взятых из кэша
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+from test_async_client import SlowCompletionServer, free_port
+
+# Клиент обращается к локальному серверу; config читает окружение при импорте
+PORT = free_port()
+os.environ.setdefault('DEEPSEEK_API_KEY', 'test-key')
+os.environ['DEEPSEEK_BASE_URL'] = f"http://127.0.0.1:{PORT}"
+os.environ['NEWS_ENABLED'] = 'false'
+os.environ['DEEPSEEK_USAGE_PATH'] = os.path.join(tempfile.mkdtemp(), 'usage.json')
+
+from prompt_template import HYBRID_PROMPT, DEEPSEEK_PROMPT
+from test_keyword_matching import LABELLED_HEADLINES
+
+QUESTIONS = ["Что это говорит о нашем времени?", "Какую тенденцию это отражает?"]
+
+
+def random_headlines() -> str:
+    """Пять случайных заголовков в формате промпта."""
+    return "\n".join(f"• {headline}" for headline, _ in random.sample(LABELLED_HEADLINES, 5))
+
+
+async def test_prompt_templates():
+    """Проверяет шаблоны промптов и попадания в кэш контекста"""
+    runner = None
+    client = None
+    try:
+        print("🧩 ТЕСТ ШАБЛОНОВ ПРОМПТОВ")
+        print("=" * 45)
+
+        # Тест 1: системная часть одинакова байт в байт при разных новостях и вопросах
+        prefixes = {
+            HYBRID_PROMPT.messages(headlines=random_headlines(), question=random.choice(QUESTIONS))[0]['content']
+            for _ in range(20)
+        }
+        messages = DEEPSEEK_PROMPT.messages(headlines=random_headlines())
+        print(f"\n1️⃣ Разных системных префиксов на 20 запросов: {len(prefixes)}")
+        print(f"{'✅' if len(prefixes) == 1 and messages[0]['role'] == 'system' else '❌'} "
+              f"Статический префикс идет первым и не меняется")
+
+        # Тест 2: заранее разобранный шаблон дает тот же текст, что и format
+        headlines = random_headlines()
+        rendered = HYBRID_PROMPT.render(headlines=headlines, question=QUESTIONS[0])
+        formatted = HYBRID_PROMPT.user.format(headlines=headlines, question=QUESTIONS[0])
+        start = time.perf_counter()
+        for _ in range(10000):
+            HYBRID_PROMPT.messages(headlines=headlines, question=QUESTIONS[0])
+        elapsed_us = (time.perf_counter() - start) * 100
+        print(f"\n2️⃣ {'✅' if rendered == formatted else '❌'} Подстановка совпадает с str.format, "
+              f"{elapsed_us:.1f} мкс на промпт")
+
+        # Тест 3: повторные запросы берут системный префикс из кэша контекста
+        server = SlowCompletionServer(0.05)
+        app = web.Application()
+        app.router.add_post('/chat/completions', server.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', PORT).start()
+
+        from deepseek_client import DeepSeekClient
+        client = DeepSeekClient()
+        cached = []
+        for _ in range(3):
+            messages = HYBRID_PROMPT.messages(headlines=random_headlines(), question=random.choice(QUESTIONS))
+            _, stats = await client._complete(messages, client._get_random_api_params(), command='test')
+            cached.append(stats['cached_tokens'])
+        totals = client.usage_meter.report()['today']
+        print(f"\n3️⃣ Токенов из кэша по запросам: {cached}, "
+              f"сэкономлено ${client.usage_meter.cache_savings(totals['cached_tokens']):.6f}")
+        print(f"{'✅' if cached[0] == 0 and all(cached[1:]) and totals['cache_hit_calls'] == 2 else '❌'} "
+              f"Попадания в кэш учтены")
+
+        print("\n🎉 ТЕСТ ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if client:
+            await client.close()
+        if runner:
+            await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(test_prompt_templates())
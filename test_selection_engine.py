@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки единого отбора новостей: квоты источников
+и тем, приоритет позитивных, воспроизводимость по seed и линейное время
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from context_processor import ContextProcessor
+from news_collector import NewsItem
+from selection_engine import POSITIVE, SelectionRules
+from test_keyword_matching import LABELLED_HEADLINES
+
+
+def make_items(count: int, sources: int = 7) -> list:
+    """Создает новости из размеченной выборки с уникальными ссылками."""
+    return [
+        NewsItem(
+            title=f"{LABELLED_HEADLINES[i % len(LABELLED_HEADLINES)][0]} ({i})",
+            summary="", link=f"https://example.com/news/{i}",
+            published=datetime.now(), source=f"Источник {i % sources}"
+        )
+        for i in range(count)
+    ]
+
+
+async def test_selection_engine():
+    """Проверяет отбор новостей и заголовков"""
+    try:
+        print("🎯 ТЕСТ ОТБОРА НОВОСТЕЙ")
+        print("=" * 45)
+
+        items = make_items(200)
+
+        # Тест 1: квота источников и приоритет позитивных
+        engine = ContextProcessor(seed=42).selection_engine
+        result = engine.select(items, limit=5, rules=SelectionRules(max_per_source=2))
+        per_source = max(result.source_count.values())
+        print(f"\n1️⃣ Отобрано {len(result.selected)}, максимум от источника: {per_source}, "
+              f"позитивных: {result.selected_counts.get(POSITIVE, 0)}")
+        print(f"{'✅' if per_source <= 2 and result.selected_counts.get(POSITIVE) == 5 else '❌'} Квоты соблюдены")
+
+        # Тест 2: одинаковый seed — одинаковый результат
+        first = await ContextProcessor(seed=7).select_top_headlines([h for h, _ in LABELLED_HEADLINES])
+        second = await ContextProcessor(seed=7).select_top_headlines([h for h, _ in LABELLED_HEADLINES])
+        print(f"\n2️⃣ {'✅' if first == second else '❌'} Отбор воспроизводим при фиксированном seed")
+        for headline in first:
+            print(f"  • {headline}")
+
+        # Тест 3: однотипные экономические новости не заполняют весь дайджест
+        economics = [
+            "Банк России сохранил ключевую ставку на уровне 16%",
+            "ЦБ сохранил ключевую ставку и ухудшил прогноз инфляции",
+            "Аналитики ждут снижения ключевой ставки банка в декабре",
+            "Рынок акций вырос после решения банка по ставке",
+            "Курс рубля укрепился после решения по ключевой ставке"
+        ]
+        sources = ['vedomosti_main', 'rbc_business', 'kommersant_economics']
+        digest_items = [
+            NewsItem(title=title, summary="", link=f"https://example.com/economics/{i}",
+                     published=datetime.now(), source=sources[i % len(sources)])
+            for i, title in enumerate(economics)
+        ] + [
+            NewsItem(title=title, summary="", link=f"https://example.com/other/{i}",
+                     published=datetime.now(), source=f"Источник {i}")
+            for i, (title, label) in enumerate(LABELLED_HEADLINES) if label == 'neutral'
+        ]
+        engine = ContextProcessor(seed=3).selection_engine
+        economics_counts = {}
+        for max_per_topic in (None, 1):
+            result = engine.select(digest_items, limit=5, rules=SelectionRules(max_per_topic=max_per_topic))
+            economics_counts[max_per_topic] = sum(1 for item in result.selected if item.title in economics)
+            print(f"\n3️⃣ Ограничение тем {max_per_topic}: "
+                  f"экономических новостей {economics_counts[max_per_topic]} из 5")
+            for item in result.selected:
+                print(f"  • {item.title}")
+        print(f"{'✅' if economics_counts[None] > 1 and economics_counts[1] == 1 else '❌'} "
+              f"Новости о ключевой ставке — одна тема, в дайджест попадает одна")
+
+        # Тест 4: время растет линейно с числом кандидатов
+        engine = ContextProcessor(seed=42).selection_engine
+        print("\n4️⃣ Время отбора:")
+        for count in (200, 2000, 20000):
+            candidates = make_items(count)
+            start = time.perf_counter()
+            engine.select(candidates, limit=5)
+            print(f"  {count:>6} кандидатов: {(time.perf_counter() - start) * 1000:.1f} мс")
+
+        print("\n🎉 ТЕСТ ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    asyncio.run(test_selection_engine())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки объединения одновременных сборов новостей:
+одновременные вызовы ждут один общий сбор, отмена одного вызова не мешает
+остальным, а принудительное обновление ограничено по частоте
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Клиент создается без сети и файлов новостей; config читает окружение при импорте
+os.environ.setdefault('DEEPSEEK_API_KEY', 'test-key')
+os.environ['NEWS_ENABLED'] = 'false'
+os.environ['DEEPSEEK_USAGE_PATH'] = os.path.join(tempfile.mkdtemp(), 'usage.json')
+
+from context_processor import ContextProcessor
+from news_collector import NewsItem
+from single_flight import SingleFlight
+from test_keyword_matching import LABELLED_HEADLINES
+
+COLLECT_DELAY = 0.3
+
+
+class SlowCollector:
+    """Замена NewsCollector: каждый сбор «опрашивает все источники» COLLECT_DELAY секунд."""
+
+    def __init__(self):
+        self.collections = 0
+
+    async def get_recent_news_items(self, limit: int = 20, deadline=None):
+        self.collections += 1
+        await asyncio.sleep(COLLECT_DELAY)
+        return [
+            NewsItem(title=title, summary="", link=f"https://example.com/news/{i}",
+                     published=datetime.now(), source=f"Источник {i % 5}")
+            for i, (title, _) in enumerate(LABELLED_HEADLINES[:limit])
+        ]
+
+
+class MemoryStore:
+    """Замена NewsStore без записи на диск."""
+
+    def upsert_many(self, items):
+        return len(items)
+
+
+async def test_single_flight():
+    """Проверяет объединение одновременных сборов новостей"""
+    client = None
+    try:
+        print("🔄 ТЕСТ ОБЪЕДИНЕНИЯ СБОРОВ НОВОСТЕЙ")
+        print("=" * 45)
+
+        # Тест 1: десять одновременных вызовов — одно выполнение
+        flight = SingleFlight()
+        executions = []
+
+        async def slow_refresh():
+            executions.append(1)
+            await asyncio.sleep(COLLECT_DELAY)
+            return len(executions)
+
+        results = await asyncio.gather(*(flight.do('news', slow_refresh) for _ in range(10)))
+        print(f"\n1️⃣ Результаты: {set(results)}, счетчики: {flight.stats}")
+        print(f"{'✅' if len(executions) == 1 and flight.stats['coalesced'] == 9 else '❌'} "
+              f"Одновременные вызовы объединены")
+
+        # Тест 2: отмена первого вызова не отменяет общий сбор для остальных
+        leader = asyncio.create_task(flight.do('news', slow_refresh))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do('news', slow_refresh))
+        await asyncio.sleep(COLLECT_DELAY / 3)
+        leader.cancel()
+        result = await follower
+        print(f"\n2️⃣ {'✅' if leader.cancelled() and result == 2 else '❌'} "
+              f"Отмена одного вызова не прерывает сбор для остальных")
+
+        # Тест 3: ошибка передается всем ожидающим, следующий вызов выполняется заново
+        async def failing_refresh():
+            await asyncio.sleep(0.05)
+            raise ConnectionError("источники недоступны")
+
+        errors = await asyncio.gather(*(flight.do('news', failing_refresh) for _ in range(3)),
+                                      return_exceptions=True)
+        retry = await flight.do('news', slow_refresh)
+        print(f"\n3️⃣ {'✅' if all(isinstance(e, ConnectionError) for e in errors) and retry == 3 else '❌'} "
+              f"Ошибка получена всеми, повторный вызов выполнен заново")
+
+        # Тест 4: планировщик и /debug_post одновременно — один опрос источников
+        from deepseek_client import DeepSeekClient
+        client = DeepSeekClient()
+        collector = SlowCollector()
+        client.news_enabled = True
+        client.news_collector = collector
+        client.news_store = MemoryStore()
+        client.context_processor = ContextProcessor(seed=1)
+
+        await asyncio.gather(
+            client._get_news_items(force_refresh=True),
+            client._get_news_items(force_refresh=True),
+            client._get_headlines(force_refresh=True),
+            client._get_news_items()
+        )
+        print(f"\n4️⃣ Сборов новостей: {collector.collections}, счетчики: {client.news_refresh_stats()}")
+        print(f"{'✅' if collector.collections == 1 else '❌'} Одновременные обновления объединены в один сбор")
+
+        # Тест 5: повторное принудительное обновление сразу после сбора не опрашивает источники
+        await client._get_news_items(force_refresh=True)
+        stats = client.news_refresh_stats()
+        print(f"\n5️⃣ Сборов новостей: {collector.collections}, ограничено по частоте: {stats['rate_limited']}")
+        print(f"{'✅' if collector.collections == 1 and stats['rate_limited'] == 1 else '❌'} "
+              f"Принудительное обновление ограничено по частоте")
+
+        print("\n🎉 ТЕСТ ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if client:
+            await client.client.close()
+
+if __name__ == "__main__":
+    asyncio.run(test_single_flight())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки учета токенов DeepSeek: счетчики по дням и
+командам, стоимость с учетом кэша, локальная оценка токенов и бюджеты
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_keyword_matching import LABELLED_HEADLINES
+from usage_meter import BUDGET_ECONOMY, BUDGET_EXHAUSTED, BUDGET_OK, UsageMeter
+
+PROMPT = "Вот 5 новостей:\n" + "\n".join(f"• {headline}" for headline, _ in LABELLED_HEADLINES[:5]) + (
+    "\n\nВ 2-3 предложениях (максимум 600 символов) найди общую нить между этими событиями. "
+    "НЕ ПОВТОРЯЙ заголовки, БЕЗ форматирования, КРАТКО."
+)
+
+
+async def test_usage_meter():
+    """Проверяет учет использования API"""
+    try:
+        print("💰 ТЕСТ УЧЕТА ТОКЕНОВ DEEPSEEK")
+        print("=" * 45)
+
+        path = os.path.join(tempfile.mkdtemp(), 'usage.json')
+
+        # Тест 1: счетчики по командам и стоимость с учетом кэша
+        meter = UsageMeter(path=path)
+        meter.record('scheduled', prompt_tokens=200, completion_tokens=150, cached_tokens=128, latency_ms=900)
+        meter.record('scheduled', prompt_tokens=200, completion_tokens=150, cached_tokens=0, latency_ms=1100)
+        meter.record('publish_now', prompt_tokens=200, completion_tokens=90, latency_ms=700, estimated=True)
+        today = meter.report()['today']
+        commands = meter.report()['commands']
+        expected = meter.cost(200, 150, 128) + meter.cost(200, 150) + meter.cost(200, 90)
+        print(f"\n1️⃣ Сегодня: {today['calls']} запросов, ${today['cost']:.6f}; "
+              f"scheduled: {commands['scheduled']['calls']}, publish_now: {commands['publish_now']['calls']}")
+        print(f"{'✅' if abs(today['cost'] - expected) < 1e-12 and today['cached_tokens'] == 128 else '❌'} "
+              f"Стоимость учитывает токены из кэша")
+
+        # Тест 2: счетчики сохраняются на диск
+        restored = UsageMeter(path=path)
+        print(f"\n2️⃣ {'✅' if restored.report()['today'] == today else '❌'} Счетчики восстановлены после перезапуска")
+
+        # Тест 3: оценка токенов подстраивается под фактические ответы API
+        actual_tokens = 240
+        before = meter.estimate_tokens(PROMPT)
+        for _ in range(30):
+            meter.record('calibration', prompt_tokens=actual_tokens, completion_tokens=0, prompt=PROMPT)
+        after = meter.estimate_tokens(PROMPT)
+        print(f"\n3️⃣ Оценка промпта: {before} → {after} токенов (фактически {actual_tokens})")
+        print(f"{'✅' if abs(after - actual_tokens) < abs(before - actual_tokens) else '❌'} "
+              f"Оценка уточняется по статистике API")
+
+        # Тест 4: уровни бюджета
+        spent = meter.report()['today']['cost']
+        planned = meter.cost(meter.estimate_tokens(PROMPT), 180)
+        levels = [
+            UsageMeter(path=path, daily_budget=spent * 10).preflight(PROMPT, 180),
+            UsageMeter(path=path, daily_budget=spent + planned * 1.1).preflight(PROMPT, 180),
+            UsageMeter(path=path, daily_budget=spent + planned * 3).preflight(PROMPT, 180, requests=3),
+            UsageMeter(path=path, monthly_budget=spent / 2).preflight(PROMPT, 180),
+        ]
+        print(f"\n4️⃣ Уровни бюджета: {levels}")
+        print(f"{'✅' if levels == [BUDGET_OK, BUDGET_ECONOMY, BUDGET_EXHAUSTED, BUDGET_EXHAUSTED] else '❌'} "
+              f"Бюджеты переключают режимы")
+
+        print("\n🎉 ТЕСТ ЗАВЕРШЕН")
+
+    except Exception as e:
+        print(f"❌ Ошибка: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    asyncio.run(test_usage_meter())
@@ -0,0 +1,155 @@
+"""
+Модуль морфологической нормализации русских заголовков.
+Слова приводятся к основе стеммером Портера (Snowball) для русского
+языка, поэтому 'ракетой', 'ракеты' и 'ракета' дают одну основу 'ракет'.
+Словарь заголовков сильно повторяется между опросами, поэтому результаты
+стемминга кэшируются в ограниченном LRU-кэше.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+# Слова короче этой длины не стеммируются ('ии', 'сво', 'мид', 'pr'),
+# иначе 'ии' превращается в союз 'и'. Основа более длинного слова тоже не
+# короче этой длины ('свою' -> 'свою', а не 'сво'), поэтому короткая основа
+# бывает только у самого короткого слова и не совпадает с сокращениями
+MIN_STEM_LENGTH = 4
+
+# Размер кэша слово -> основа
+STEM_CACHE_SIZE = 50000
+
+_TOKEN_RE = re.compile(r'\w+')
+
+_VOWELS = 'аеиоуыэюя'
+
+# Окончания Snowball для русского языка. Окончания из первых групп
+# удаляются, только если перед ними стоит 'а' или 'я'.
+_PERFECTIVE_GERUND_1 = ('в', 'вши', 'вшись')
+_PERFECTIVE_GERUND_2 = ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')
+_ADJECTIVE = ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым',
+              'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+_PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+_PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+_REFLEXIVE = ('ся', 'сь')
+_VERB_1 = ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют',
+           'ны', 'ть', 'ешь', 'нно')
+_VERB_2 = ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил',
+           'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт',
+           'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю')
+_NOUN = ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией',
+         'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах',
+         'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я')
+_SUPERLATIVE = ('ейше', 'ейш')
+_DERIVATIONAL = ('ость', 'ост')
+
+# Формы, которые Snowball сводит к основе другого слова: 'учения' (военные)
+# и 'ученые' дают одну основу 'учен'. Таким формам задается своя основа.
+_EXCEPTIONS = {
+    f'учени{ending}': 'учени' for ending in ('е', 'я', 'ю', 'ем', 'и', 'й', 'ям', 'ями', 'ях')
+}
+
+
+def _longest_suffix(word: str, group_1: Tuple[str, ...] = (), group_2: Tuple[str, ...] = ()) -> int:
+    """
+    Возвращает длину самого длинного подходящего окончания (0 — нет окончания).
+
+    Как и в Snowball, выбирается самое длинное окончание из обеих групп;
+    если это окончание первой группы без 'а'/'я' перед ним, удаления нет.
+    """
+    best = ''
+    for suffix in group_1 + group_2:
+        if len(suffix) > len(best) and word.endswith(suffix):
+            best = suffix
+
+    if not best:
+        return 0
+    if best in group_2:
+        return len(best)
+    if len(word) > len(best) and word[-len(best) - 1] in 'ая':
+        return len(best)
+    return 0
+
+
+def _region_start(word: str, start: int) -> int:
+    """Начало области после первой согласной, следующей за гласной (R1/R2)."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word: str) -> str:
+    """Возвращает основу слова (ожидается слово в нижнем регистре)."""
+    word = word.replace('ё', 'е')
+    if len(word) < MIN_STEM_LENGTH:
+        return word
+    if word in _EXCEPTIONS:
+        return _EXCEPTIONS[word]
+
+    # RV — часть слова после первой гласной
+    rv_start = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+    r2_start = _region_start(word, _region_start(word, 0) - 1) - rv_start
+
+    # Шаг 1: деепричастие, иначе возвратность + прилагательное/глагол/существительное
+    removed = _longest_suffix(rv, _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2)
+    if removed:
+        rv = rv[:-removed]
+    else:
+        removed = _longest_suffix(rv, group_2=_REFLEXIVE)
+        if removed:
+            rv = rv[:-removed]
+
+        removed = _longest_suffix(rv, group_2=_ADJECTIVE)
+        if removed:
+            rv = rv[:-removed]
+            participle = _longest_suffix(rv, _PARTICIPLE_1, _PARTICIPLE_2)
+            if participle:
+                rv = rv[:-participle]
+        else:
+            removed = _longest_suffix(rv, _VERB_1, _VERB_2)
+            if not removed:
+                removed = _longest_suffix(rv, group_2=_NOUN)
+            if removed:
+                rv = rv[:-removed]
+
+    # Шаг 2: конечная 'и'
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание в R2
+    removed = _longest_suffix(rv, group_2=_DERIVATIONAL)
+    if removed and len(rv) - removed >= r2_start:
+        rv = rv[:-removed]
+
+    # Шаг 4: превосходная степень, удвоенная 'н' и мягкий знак
+    removed = _longest_suffix(rv, group_2=_SUPERLATIVE)
+    if removed:
+        rv = rv[:-removed]
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif rv.endswith('ь'):
+        rv = rv[:-1]
+
+    stemmed = prefix + rv
+    if len(stemmed) < MIN_STEM_LENGTH:
+        # Окончание срезается только до минимальной длины основы
+        return word[:MIN_STEM_LENGTH]
+    return stemmed
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на слова в нижнем регистре."""
+    return _TOKEN_RE.findall(text.lower().replace('ё', 'е'))
+
+
+def normalize_text(text: str) -> Tuple[str, ...]:
+    """Возвращает основы слов текста в исходном порядке."""
+    return tuple(stem(token) for token in tokenize(text))
+
+
+def stem_cache_info():
+    """Возвращает статистику кэша стемминга."""
+    return stem.cache_info()
@@ -0,0 +1,239 @@
+"""
+Модуль тематической кластеризации заголовков для разнообразного дайджеста.
+Заголовки векторизуются хэшированием основ слов (с весами IDF из оценки
+релевантности), а темы находятся мини-пакетным сферическим k-means:
+центроиды обновляются инкрементально по мере поступления новых новостей
+и не пересчитываются с нуля в каждом цикле.
+Новые темы заводятся пакетом: когда накопится достаточно новостей вне
+известных тем, центры выбираются k-means++ по этому пулу и уточняются
+несколькими итерациями Ллойда. Поэтому на маленьком или свежем пуле
+каждый заголовок не становится отдельной темой.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from relevance_scorer import RelevanceScorer
+
+logger = logging.getLogger('topic_clusters')
+
+# Размерность векторов для кластеризации (свертка признаков оценщика)
+CLUSTER_FEATURE_BITS = 14
+CLUSTER_FEATURES = 1 << CLUSTER_FEATURE_BITS
+
+# Новость, далекая от всех центроидов, ждет в пуле для новых тем,
+# пока тем меньше NUM_TOPICS
+NUM_TOPICS = 16
+NEW_TOPIC_SIMILARITY = 0.2
+
+# Новые темы заводятся, когда в пуле накопилось MIN_SEED_POOL новостей,
+# по одной теме на TOPIC_POOL_SHARE новостей пула
+MIN_SEED_POOL = 8
+TOPIC_POOL_SHARE = 4
+
+# Итерации Ллойда после выбора центров и зерно выбора (темы воспроизводимы)
+LLOYD_ITERATIONS = 5
+SEED_RANDOM_STATE = 0
+
+# Новость с меньшим сходством со всеми темами считается вне тем
+MIN_TOPIC_SIMILARITY = 0.05
+
+# Ограничение счетчика центроида: шаг обучения не опускается ниже 1/MAX_TOPIC_WEIGHT,
+# поэтому темы продолжают следовать за новостной повесткой
+MAX_TOPIC_WEIGHT = 200
+
+MAX_SEEN_DOCUMENTS = 50000
+
+
+class TopicClusterer:
+    """Инкрементальный мини-пакетный k-means по заголовкам."""
+
+    def __init__(self, scorer: RelevanceScorer, num_topics: int = NUM_TOPICS):
+        self.scorer = scorer
+        self.num_topics = num_topics
+
+        self.centroids = np.zeros((0, CLUSTER_FEATURES), dtype=np.float32)
+        self.counts = np.zeros(0, dtype=np.float32)
+        self._seen: 'OrderedDict[str, None]' = OrderedDict()
+        # Новости вне известных тем — из них пакетом заводятся новые темы
+        self._pool: List = []
+        self._random = np.random.default_rng(SEED_RANDOM_STATE)
+
+    def _vectors(self, items: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Разреженные нормированные векторы новостей.
+
+        Returns:
+            (индексы признаков, веса, начала строк, длины строк)
+        """
+        rows = [self.scorer._ids(item) for item in items]
+        lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        if not lengths.sum():
+            return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32),
+                    np.zeros(len(rows), dtype=np.int64), lengths)
+
+        indices = np.concatenate(rows)
+        weights = self.scorer.idf()[indices].astype(np.float32)
+        row_of = np.repeat(np.arange(len(rows)), lengths)
+        norms = np.sqrt(np.bincount(row_of, weights=weights * weights, minlength=len(rows)))
+        weights /= np.maximum(norms[row_of], 1e-9).astype(np.float32)
+
+        starts = np.zeros(len(rows), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        return indices & (CLUSTER_FEATURES - 1), weights, starts, lengths
+
+    def _similarities(self, indices: np.ndarray, weights: np.ndarray,
+                      starts: np.ndarray, lengths: np.ndarray,
+                      centroids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Косинусные сходства всех новостей со всеми центроидами (новости x темы)."""
+        if centroids is None:
+            centroids = self.centroids
+        n = len(lengths)
+        sims = np.zeros((n, len(centroids)), dtype=np.float32)
+        nonempty = lengths > 0
+        if not len(centroids) or not nonempty.any():
+            return sims
+
+        # Центроид x признаки новостей -> сумма по строкам одним reduceat
+        products = centroids[:, indices] * weights
+        sums = np.add.reduceat(products, starts[nonempty], axis=1)
+        sims[nonempty] = sums.T
+        return sims
+
+    @staticmethod
+    def _row(indices: np.ndarray, weights: np.ndarray, starts: np.ndarray,
+             lengths: np.ndarray, row: int) -> np.ndarray:
+        """Плотный вектор одной новости."""
+        vector = np.zeros(CLUSTER_FEATURES, dtype=np.float32)
+        np.add.at(vector, indices[starts[row]:starts[row] + lengths[row]],
+                  weights[starts[row]:starts[row] + lengths[row]])
+        return vector
+
+    def _seed_topics(self, items: Sequence, num_topics: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Находит темы пула новостей: центры k-means++ и итерации Ллойда.
+
+        Returns:
+            (центроиды, количество новостей в каждой теме)
+        """
+        vectors = self._vectors(items)
+        indices, weights, starts, lengths = vectors
+        rows = np.flatnonzero(lengths)
+        num_topics = min(num_topics, len(rows))
+        if not num_topics:
+            return np.zeros((0, CLUSTER_FEATURES), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+        # k-means++: следующий центр выбирается с вероятностью, пропорциональной
+        # квадрату расстояния до ближайшего центра; из нескольких кандидатов
+        # берется тот, что сильнее всего уменьшает суммарное расстояние
+        trials = 2 + int(np.log(num_topics))
+        centers = [self._row(*vectors, int(self._random.choice(rows)))]
+        distances = np.maximum(2.0 - 2.0 * self._similarities(*vectors, centers[0][None])[:, 0], 0.0)
+        distances[lengths == 0] = 0.0
+        for _ in range(1, num_topics):
+            total = float(distances.sum())
+            if total <= 0:
+                break
+            candidates = self._random.choice(len(items), size=trials, p=distances / total)
+            candidate_vectors = np.stack([self._row(*vectors, int(row)) for row in candidates])
+            candidate_distances = np.minimum(
+                distances[:, None],
+                np.maximum(2.0 - 2.0 * self._similarities(*vectors, candidate_vectors), 0.0)
+            )
+            best = int(candidate_distances.sum(axis=0).argmin())
+            centers.append(candidate_vectors[best])
+            distances = candidate_distances[:, best]
+        centroids = np.stack(centers)
+
+        row_of = np.repeat(np.arange(len(items)), lengths)
+        counts = np.zeros(len(centroids), dtype=np.float32)
+        for _ in range(LLOYD_ITERATIONS):
+            sims = self._similarities(*vectors, centroids)
+            labels = sims.argmax(axis=1)
+            labels[(sims.max(axis=1) < NEW_TOPIC_SIMILARITY) | (lengths == 0)] = -1
+
+            # Центроид — нормированная сумма векторов его новостей; далекие
+            # от всех центров новости не размывают темы
+            assigned = labels[row_of] >= 0
+            updated = np.zeros_like(centroids)
+            np.add.at(updated, (labels[row_of][assigned], indices[assigned]), weights[assigned])
+            counts = np.bincount(labels[labels >= 0], minlength=len(centroids)).astype(np.float32)
+            filled = counts > 0
+            norms = np.linalg.norm(updated[filled], axis=1, keepdims=True)
+            centroids[filled] = updated[filled] / np.maximum(norms, 1e-9)
+
+        return centroids[counts > 0], counts[counts > 0]
+
+    def partial_fit(self, items: Sequence) -> int:
+        """
+        Обновляет центроиды по новостям, которые еще не учитывались.
+
+        Returns:
+            Количество учтенных новостей
+        """
+        batch = []
+        for item in items:
+            key = getattr(item, 'link', None) or item.title
+            if key in self._seen:
+                continue
+            self._seen[key] = None
+            if len(self._seen) > MAX_SEEN_DOCUMENTS:
+                self._seen.popitem(last=False)
+            batch.append(item)
+
+        if not batch:
+            return 0
+
+        indices, weights, starts, lengths = self._vectors(batch)
+        sims = self._similarities(indices, weights, starts, lengths)
+        topics_full = len(self.centroids) >= self.num_topics
+
+        for row in range(len(batch)):
+            if not lengths[row]:
+                continue
+
+            best = int(sims[row].argmax()) if sims.shape[1] else -1
+            if best < 0 or (sims[row, best] < NEW_TOPIC_SIMILARITY and not topics_full):
+                # Далекая от всех тем новость ждет пакетного заведения новых тем
+                self._pool.append(batch[row])
+                continue
+
+            # Шаг мини-пакетного k-means с затухающим шагом 1/n
+            row_indices = indices[starts[row]:starts[row] + lengths[row]]
+            row_weights = weights[starts[row]:starts[row] + lengths[row]]
+            self.counts[best] = min(self.counts[best] + 1, MAX_TOPIC_WEIGHT)
+            eta = 1.0 / self.counts[best]
+            centroid = self.centroids[best]
+            centroid *= (1.0 - eta)
+            np.add.at(centroid, row_indices, eta * row_weights)
+            centroid /= max(float(np.linalg.norm(centroid)), 1e-9)
+
+        free = self.num_topics - len(self.centroids)
+        if free > 0 and len(self._pool) >= MIN_SEED_POOL:
+            num_topics = min(free, len(self._pool) // TOPIC_POOL_SHARE)
+            centroids, counts = self._seed_topics(self._pool, num_topics)
+            self.centroids = np.vstack([self.centroids, centroids])
+            self.counts = np.concatenate([self.counts, np.minimum(counts, MAX_TOPIC_WEIGHT)])
+            logger.debug(f"Заведено {len(centroids)} тем по пулу из {len(self._pool)} новостей")
+            self._pool = []
+
+        return len(batch)
+
+    def predict(self, items: Sequence) -> List[int]:
+        """Возвращает номер темы каждой новости (-1 — новость вне известных тем)."""
+        if not items or not len(self.centroids):
+            return [-1] * len(items)
+
+        indices, weights, starts, lengths = self._vectors(items)
+        sims = self._similarities(indices, weights, starts, lengths)
+        labels = sims.argmax(axis=1)
+        labels[sims.max(axis=1) < MIN_TOPIC_SIMILARITY] = -1
+        return labels.tolist()
+
+    def __call__(self, items: Sequence) -> List[int]:
+        """Учитывает новые новости и возвращает темы (интерфейс SelectionEngine)."""
+        self.partial_fit(items)
+        return self.predict(items)
@@ -0,0 +1,198 @@
+"""
+Модуль учета токенов и стоимости запросов к DeepSeek.
+Каждый ответ API записывается в счетчики по дням и командам (токены запроса,
+ответа, из кэша контекста, задержка и стоимость) в data/usage.json.
+Локальная оценка числа токенов позволяет проверить запрос до отправки,
+а дневной и месячный бюджеты переводят бота в экономный режим.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger('usage_meter')
+
+# Цены DeepSeek за 1 млн токенов (USD): запрос из кэша, запрос без кэша, ответ
+DEFAULT_PRICES = {'input_cache_hit': 0.028, 'input_cache_miss': 0.28, 'output': 0.42}
+
+# Сколько дней истории хранить в файле
+HISTORY_DAYS = 62
+
+# При такой доле израсходованного бюджета включается экономный режим
+ECONOMY_SHARE = 0.8
+
+# Уровни бюджета
+BUDGET_OK = 'ok'
+BUDGET_ECONOMY = 'economy'
+BUDGET_EXHAUSTED = 'exhausted'
+
+# Токенов на символ (по оценкам DeepSeek: латиница ~0.3, иероглифы ~0.6)
+ASCII_TOKENS_PER_CHAR = 0.3
+CYRILLIC_TOKENS_PER_CHAR = 0.45
+OTHER_TOKENS_PER_CHAR = 0.6
+
+COUNTER_FIELDS = ('calls', 'prompt_tokens', 'completion_tokens', 'cached_tokens',
+                  'estimated_calls', 'latency_ms', 'cost',
+                  'cache_hit_calls', 'cache_hit_latency_ms')
+
+
+def raw_token_estimate(text: str) -> float:
+    """Оценивает число токенов текста по классам символов."""
+    ascii_chars = cyrillic_chars = other_chars = 0
+    for char in text:
+        code = ord(char)
+        if code < 128:
+            ascii_chars += 1
+        elif 0x400 <= code <= 0x4FF:
+            cyrillic_chars += 1
+        else:
+            other_chars += 1
+    return (ascii_chars * ASCII_TOKENS_PER_CHAR + cyrillic_chars * CYRILLIC_TOKENS_PER_CHAR
+            + other_chars * OTHER_TOKENS_PER_CHAR)
+
+
+class UsageMeter:
+    """Счетчики использования API по дням и командам с контролем бюджета."""
+
+    def __init__(self, path: str = 'data/usage.json', daily_budget: float = 0.0,
+                 monthly_budget: float = 0.0, prices: Optional[Dict[str, float]] = None):
+        self.path = path
+        # Бюджеты в USD; 0 — без ограничения
+        self.daily_budget = daily_budget
+        self.monthly_budget = monthly_budget
+        self.prices = prices or DEFAULT_PRICES
+
+        # день (YYYY-MM-DD) -> команда -> счетчики
+        self.days: Dict[str, Dict[str, Dict[str, float]]] = {}
+        # Поправка локальной оценки токенов по фактическим ответам API
+        self.calibration = 1.0
+
+        self._load()
+
+    def _load(self):
+        """Загружает счетчики с диска."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.days = data.get('days', {})
+            self.calibration = data.get('calibration', 1.0)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки учета использования {self.path}: {str(e)}")
+
+    def save(self):
+        """Атомарно сохраняет счетчики на диск."""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'days': self.days, 'calibration': self.calibration}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения учета использования {self.path}: {str(e)}")
+
+    def estimate_tokens(self, text: str) -> int:
+        """Локальная оценка числа токенов (без обращения к API)."""
+        return max(1, round(raw_token_estimate(text) * self.calibration))
+
+    def cost(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        """Стоимость запроса в USD."""
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        return (cached_tokens * self.prices['input_cache_hit']
+                + (prompt_tokens - cached_tokens) * self.prices['input_cache_miss']
+                + completion_tokens * self.prices['output']) / 1_000_000
+
+    def cache_savings(self, cached_tokens: int) -> float:
+        """Сколько USD сэкономлено на токенах запроса, взятых из кэша контекста."""
+        return cached_tokens * (self.prices['input_cache_miss'] - self.prices['input_cache_hit']) / 1_000_000
+
+    def record(self, command: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0,
+               latency_ms: float = 0.0, estimated: bool = False, prompt: Optional[str] = None):
+        """
+        Записывает один ответ API.
+
+        Args:
+            command: Команда или задача, для которой выполнялся запрос
+            estimated: Токены оценены локально (поток остановлен до статистики API)
+            prompt: Текст запроса; по фактическим токенам уточняется локальная оценка
+        """
+        if prompt and not estimated and prompt_tokens:
+            raw = raw_token_estimate(prompt)
+            if raw:
+                self.calibration = 0.9 * self.calibration + 0.1 * (prompt_tokens / raw)
+
+        day = self.days.setdefault(datetime.now().strftime('%Y-%m-%d'), {})
+        counters = day.setdefault(command, {})
+        for field in COUNTER_FIELDS:
+            counters.setdefault(field, 0)
+        counters['calls'] += 1
+        counters['prompt_tokens'] += prompt_tokens
+        counters['completion_tokens'] += completion_tokens
+        counters['cached_tokens'] += cached_tokens
+        counters['estimated_calls'] += int(estimated)
+        counters['latency_ms'] += latency_ms
+        counters['cost'] += self.cost(prompt_tokens, completion_tokens, cached_tokens)
+        if cached_tokens:
+            # Задержка запросов с попаданием в кэш контекста — для сравнения с остальными
+            counters['cache_hit_calls'] += 1
+            counters['cache_hit_latency_ms'] += latency_ms
+
+        # Старые дни отбрасываются
+        for old_day in sorted(self.days)[:-HISTORY_DAYS]:
+            del self.days[old_day]
+        self.save()
+
+    def totals(self, prefix: str) -> Dict[str, float]:
+        """Суммы счетчиков за дни, начинающиеся с prefix (день 'YYYY-MM-DD' или месяц 'YYYY-MM')."""
+        totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        for day, commands in self.days.items():
+            if not day.startswith(prefix):
+                continue
+            for counters in commands.values():
+                for field in COUNTER_FIELDS:
+                    totals[field] += counters.get(field, 0)
+        return totals
+
+    def budget_level(self, planned_cost: float = 0.0) -> str:
+        """
+        Уровень бюджета с учетом планируемого запроса.
+
+        Returns:
+            BUDGET_OK, BUDGET_ECONOMY или BUDGET_EXHAUSTED
+        """
+        now = datetime.now()
+        level = BUDGET_OK
+        for budget, prefix in ((self.daily_budget, now.strftime('%Y-%m-%d')),
+                               (self.monthly_budget, now.strftime('%Y-%m'))):
+            if not budget:
+                continue
+            spent = self.totals(prefix)['cost'] + planned_cost
+            if spent >= budget:
+                return BUDGET_EXHAUSTED
+            if spent >= budget * ECONOMY_SHARE:
+                level = BUDGET_ECONOMY
+        return level
+
+    def preflight(self, prompt: str, max_tokens: int, requests: int = 1) -> str:
+        """Уровень бюджета, если отправить запрос(ы) с этим промптом (худший случай по ответу)."""
+        planned = self.cost(self.estimate_tokens(prompt), max_tokens) * requests
+        return self.budget_level(planned)
+
+    def report(self) -> dict:
+        """Сводка для команды /usage."""
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        return {
+            'today': self.totals(today),
+            'month': self.totals(now.strftime('%Y-%m')),
+            'commands': self.days.get(today, {}),
+            'daily_budget': self.daily_budget,
+            'monthly_budget': self.monthly_budget,
+            'budget_level': self.budget_level(),
+            'calibration': self.calibration
+        }